@@ -13,27 +13,55 @@
 # limitations under the License.
 
 import inspect
+import math
 import random
+import re
 import string
+import sys
+import warnings
+from array import array
+from bisect import bisect
 from datetime import datetime, timezone, timedelta, MINYEAR, MAXYEAR
-from itertools import cycle
+from functools import partial
+from itertools import accumulate, chain, cycle, islice, repeat
+from operator import itemgetter
 
 from .dsl.compiler import PairBasedCompatibility, AnyType, SimpleType
+from .engine import CSV_SPECIAL_CHARACTERS
 from .library import Library
 from .producer import Producer
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
 __all__ = [
     'Producer',
     'IntProducer', 'FloatProducer',
     'StringProducer', 'AlphaProducer', 'AlphaNumericProducer',
-    'DateProducer',
-    'FixedProducer', 'CyclingProducer', 'RepeaterProducer',
+    'DATE_FORMATS', 'DateProducer',
+    'FixedProducer', 'CyclingProducer', 'RepeaterProducer', 'CategoricalProducer',
+    'PowerLawProducer', 'ZipfProducer', 'UniqueIntProducer',
+    'NumpyIntProducer', 'NumpyFloatProducer',
+    'NumpyStringProducer', 'NumpyAlphaProducer', 'NumpyAlphaNumericProducer',
+    'NumpyDateProducer',
     'BuiltInLibrary', 'BuiltInCompatibility', 'PairBasedCompatibility',
     'fmt_function',
     'create_library',
 ]
 
 
+# the names of the formats of the dates that can be used instead of a `strftime` format.
+DATE_FORMATS = {
+    'iso': '%Y-%m-%dT%H:%M:%S',
+    'iso_date': '%Y-%m-%d',
+}
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# the power-law producers draw from a cumulative table up to this number of ranks, by rejection-inversion above it.
+_POWER_LAW_TABLE_LIMIT = 2 ** 16
+
+
 class IntProducer(Producer):
     def __init__(self, random_funcs, config=None):
         super().__init__(random_funcs, 'int', config)
@@ -41,6 +69,10 @@ class IntProducer(Producer):
     def __call__(self):
         return self._random_funcs.randint(self.config.min, self.config.max)
 
+    def produce_batch(self, n):
+        randint, min_value, max_value = self._random_funcs.randint, self.config.min, self.config.max
+        return [randint(min_value, max_value) for _ in repeat(None, n)]
+
     @classmethod
     def default_config(cls):
         return {'min': 0, 'max': 1_000_000}
@@ -88,6 +120,10 @@ class FloatProducer(Producer):
     def __call__(self):
         return self._distribution(**self._kwargs)
 
+    def produce_batch(self, n):
+        distribution, kwargs = self._distribution, self._kwargs
+        return [distribution(**kwargs) for _ in repeat(None, n)]
+
     @classmethod
     def default_config(cls):
         return {
@@ -101,23 +137,142 @@ class FloatProducer(Producer):
 
 
 class StringProducer(Producer):
+    """Produce random strings of the `characters`, drawn with the given `weights`, of length between
+    `min_len` and `max_len`, or of exactly `len` characters.
+
+    Batches of strings are generated all at once: the characters of the whole batch are obtained translating a
+    block of random bytes through a `_CharacterTable` and the result is sliced in strings of the drawn lengths.
+    Hence a batch contains different strings than the same number of calls.
+
+    """
+
     def __init__(self, random_funcs, config=None):
         super().__init__(random_funcs, 'string', config)
         if not isinstance(self.config.characters, str):
             self.config.characters = ''.join(self.config.characters)
+        self._characters = self.config.characters
+        self._min_len = getattr(self.config, 'min_len', self.config.len)
+        self._max_len = getattr(self.config, 'max_len', self.config.len)
+        self._weights = getattr(self.config, 'weights', None)
+        self._cum_weights = None if self._weights is None else list(accumulate(self._weights))
+        self._table = _CharacterTable.build(self._characters, self._weights)
 
     def __call__(self):
-        min_len = getattr(self.config, 'min_len', self.config.len)
-        max_len = getattr(self.config, 'max_len', self.config.len)
-        string_length = self._random_funcs.randint(min_len, max_len)
-        weights = getattr(self.config, 'weights', None)
-        return ''.join(self._random_funcs.choices(self.config.characters, weights, k=string_length))
+        random_funcs = self._random_funcs
+        string_length = random_funcs.randint(self._min_len, self._max_len)
+        return ''.join(random_funcs.choices(self._characters, cum_weights=self._cum_weights, k=string_length))
+
+    def produce_batch(self, n):
+        min_len, max_len = self._min_len, self._max_len
+        if self._table is None:
+            randint, choices, join = self._random_funcs.randint, self._random_funcs.choices, ''.join
+            characters, cum_weights = self._characters, self._cum_weights
+            return [join(choices(characters, cum_weights=cum_weights, k=randint(min_len, max_len)))
+                    for _ in repeat(None, n)]
+        if min_len == max_len:
+            text = self._table.draw(self._random_funcs, min_len * n)
+            if min_len == 0:
+                return [''] * n
+            return [text[start:start + min_len] for start in range(0, min_len * n, min_len)]
+        randint = self._random_funcs.randint
+        ends = list(accumulate(randint(min_len, max_len) for _ in repeat(None, n)))
+        text = self._table.draw(self._random_funcs, ends[-1] if ends else 0)
+        return [text[start:end] for start, end in zip(chain((0,), ends), ends)]
 
     @classmethod
     def default_config(cls):
         return {'len': 10, 'characters': string.ascii_letters + string.digits + string.punctuation + ' \t'}
 
 
+class _CharacterTable:
+    """Translate random bytes into the characters of an alphabet, each one drawn with probability proportional to
+    its weight.
+
+    Each character is mapped to a number of the values of a byte, or of two bytes for large alphabets and for
+    weights that are not small integers, proportional to its weight. The values left over are discarded, so the
+    characters are drawn exactly with the given weights when they are integers, while other weights are rounded
+    to multiples of 1/65536.
+
+        >>> table = _CharacterTable.build('ab', [3, 1])
+        >>> table.draw(random.Random(0), 8)
+        'baabaaaa'
+
+    """
+
+    def __init__(self, width, counts, characters):
+        self._width = width
+        self._size = 1 << (8 * width)
+        self._accepted = sum(counts)
+        indices = [index for index, count in enumerate(counts) for _ in repeat(None, count)]
+        if width == 1:
+            if all(ord(character) < 256 for character in characters):
+                self._table = bytes(ord(characters[index]) for index in indices).ljust(256, b'\0')
+                self._characters = None
+            else:
+                # the bytes are translated into the indices of the characters, which are then translated again.
+                self._table = bytes(indices).ljust(256, b'\0')
+                self._characters = characters
+            self._rejected = bytes(range(self._accepted, 256))
+        else:
+            self._table = [characters[index] for index in indices] + [''] * (self._size - self._accepted)
+
+    @classmethod
+    def build(cls, characters, weights=None):
+        """Return the table of the `characters` with the given `weights`, or `None` when there is none.
+
+        There is no table when the `characters` cannot be drawn through a table, such as when they are more than
+        65536 or when they have no weight at all.
+        """
+        if weights is None:
+            weights = [1] * len(characters)
+        else:
+            weights = list(weights)
+        if len(weights) != len(characters) or len(characters) > 65536 or any(weight < 0 for weight in weights):
+            return None
+        total = sum(weights)
+        if total <= 0 or not math.isfinite(total):
+            return None
+        if all(isinstance(weight, int) for weight in weights):
+            width = 1 if total <= 256 else 2
+            if total <= 1 << (8 * width):
+                scale = (1 << (8 * width)) // total
+                return cls(width, [weight * scale for weight in weights], characters)
+        return cls(2, _round_counts(weights, 65536), characters)
+
+    def draw(self, random_funcs, n):
+        """Return a string of `n` characters, drawn using the `getrandbits` function of `random_funcs`."""
+        parts = []
+        missing = n
+        while missing > 0:
+            # draw a few more values than needed on average, so that drawing again is rare.
+            count = self._width * (missing * self._size // self._accepted + 8)
+            part = self._translate(random_funcs.getrandbits(8 * count).to_bytes(count, 'little'))
+            parts.append(part)
+            missing -= len(part)
+        text = ''.join(parts)
+        return text if len(text) == n else text[:n]
+
+    def _translate(self, data):
+        if self._width == 2:
+            values = array('H', data)
+            if sys.byteorder == 'big':
+                values.byteswap()
+            return ''.join(map(self._table.__getitem__, values))
+        text = data.translate(self._table, self._rejected).decode('latin-1')
+        return text if self._characters is None else text.translate(self._characters)
+
+
+def _round_counts(weights, total):
+    """Split `total` into integer counts proportional to the `weights`, rounding by the largest remainders."""
+    weight_sum = sum(weights)
+    exact = [weight * total / weight_sum for weight in weights]
+    counts = [int(value) for value in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda index: counts[index] - exact[index])
+    for index in by_remainder[:total - sum(counts)]:
+        counts[index] += 1
+    return counts
+
+
 class AlphaProducer(StringProducer):
     def __init__(self, random_funcs, config=None):
         config = config or {}
@@ -141,6 +296,16 @@ class AlphaNumericProducer(StringProducer):
 
 
 class DateProducer(Producer):
+    """Produce random dates between the minimum and maximum ones given by the config.
+
+    In `'interval'` mode the dates are uniformly distributed in the interval, while in `'slice'` mode the day and
+    each component of the time are drawn independently. The dates are `datetime` objects, unless the config
+    specifies a `format`: either a `strftime` format or one of the `DATE_FORMATS`, in which case the producer
+    renders them into strings through a `_DateFormatter`. Since dates never need quoting in a CSV file, the
+    `format` cannot contain the characters that would need it.
+
+    """
+
     def __init__(self, random_funcs, config=None):
         super().__init__(random_funcs, 'date', config)
         self._mode = self.config.get_mode('interval')
@@ -179,21 +344,147 @@ class DateProducer(Producer):
             max_second = self.config.get_max_second(59)
             self._end_date = datetime(max_year, max_month, max_day, max_hour, max_minute, max_second, tzinfo=utc)
 
+        self._start_ts = int(self._start_date.timestamp())
+        self._end_ts = int(self._end_date.timestamp())
+        self._max_days_difference = (self._end_date - self._start_date).days
+        date_format = self.config.get_format(None)
+        self._formatter = None
+        if date_format is not None:
+            date_format = DATE_FORMATS.get(date_format, date_format)
+            if any(character in date_format for character in CSV_SPECIAL_CHARACTERS):
+                raise ValueError('Invalid date format {!r}: it cannot contain commas, quotes or newlines.'.format(
+                    date_format))
+            self._formatter = _DateFormatter(date_format)
+
     def __call__(self):
         if self._mode == 'interval':
-            start_ts = self._start_date.timestamp()
-            end_ts = self._end_date.timestamp()
-            timestamp = self._random_funcs.randint(start_ts, end_ts)
-            return datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=timestamp)
+            timestamp = self._random_funcs.randint(self._start_ts, self._end_ts)
+            if self._formatter is not None:
+                return self._formatter.format_timestamp(timestamp)
+            return _EPOCH + timedelta(seconds=timestamp)
         else:
-            max_days_difference = (self._end_date - self._start_date).days
-            num_day = self._random_funcs.randint(0, max_days_difference)
-            date = self._start_date + timedelta(days=num_day)
-            hour = self._random_funcs.randint(self._start_date.hour, self._end_date.hour)
-            minute = self._random_funcs.randint(self._start_date.minute, self._end_date.minute)
-            second = self._random_funcs.randint(self._start_date.second, self._end_date.second)
+            randint = self._random_funcs.randint
+            start_date, end_date = self._start_date, self._end_date
+            num_day = randint(0, self._max_days_difference)
+            hour = randint(start_date.hour, end_date.hour)
+            minute = randint(start_date.minute, end_date.minute)
+            second = randint(start_date.second, end_date.second)
+            if self._formatter is not None:
+                day = self._start_ts // 86400 + num_day
+                return self._formatter.format_timestamp(day * 86400 + hour * 3600 + minute * 60 + second)
+            date = start_date + timedelta(days=num_day)
             return datetime(date.year, date.month, date.day, hour, minute, second)
 
+    def produce_batch(self, n):
+        if self._mode != 'interval':
+            return super().produce_batch(n)
+        randint, start_ts, end_ts = self._random_funcs.randint, self._start_ts, self._end_ts
+        return self._from_timestamps([randint(start_ts, end_ts) for _ in repeat(None, n)])
+
+    def _from_timestamps(self, timestamps):
+        """Convert a list of timestamps into the values of the producer."""
+        if self._formatter is not None:
+            return self._formatter.format_timestamps(timestamps)
+        epoch = _EPOCH
+        return [epoch + timedelta(seconds=timestamp) for timestamp in timestamps]
+
+
+class _DateFormatter:
+    """Render timestamps, in seconds since the epoch in UTC, with the `strftime` format `date_format`.
+
+    The parts of the format that depend only on the day are rendered once per day into a template, which is
+    cached, in which the hours, minutes and seconds are then formatted as integers. The formats containing
+    other directives that depend on the time of the day, such as `%p` or `%z`, are always rendered by
+    `datetime.strftime`.
+
+        >>> _DateFormatter('%d/%m/%Y %H:%M').format_timestamp(1_500_000_000)
+        '14/07/2017 02:40'
+
+    """
+
+    # the days whose templates are kept: the cache is emptied when it grows larger.
+    _max_cached_days = 4096
+
+    def __init__(self, date_format):
+        self._format = date_format
+        self._day_formats, time_fields = _split_date_format(date_format)
+        # the templates take the hour, the minute and the second, unless they are used in another order.
+        self._pick_fields = None if not time_fields or time_fields == [0, 1, 2] else _tuple_getter(time_fields)
+        self._time_fields = time_fields
+        self._templates = {}
+
+    @property
+    def format(self):
+        return self._format
+
+    def format_timestamp(self, timestamp):
+        """Render the date of the `timestamp`."""
+        if self._day_formats is None:
+            return (_EPOCH + timedelta(seconds=timestamp)).strftime(self._format)
+        day, seconds = divmod(timestamp, 86400)
+        try:
+            template = self._templates[day]
+        except KeyError:
+            template = self._make_template(day)
+        if not self._time_fields:
+            return template
+        minutes, second = divmod(seconds, 60)
+        hour, minute = divmod(minutes, 60)
+        if self._pick_fields is None:
+            return template % (hour, minute, second)
+        return template % self._pick_fields((hour, minute, second))
+
+    def format_timestamps(self, timestamps):
+        """Render the dates of all the `timestamps`."""
+        return list(map(self.format_timestamp, timestamps))
+
+    def _make_template(self, day):
+        if len(self._templates) >= self._max_cached_days:
+            self._templates.clear()
+        date = _EPOCH.date() + timedelta(days=day)
+        parts = [date.strftime(day_format).replace('%', '%%') for day_format in self._day_formats]
+        template = self._templates[day] = '%02d'.join(parts)
+        return template
+
+
+def _tuple_getter(indices):
+    """Return a function that takes the items at `indices` of a sequence, always returning a tuple."""
+    getter = itemgetter(*indices)
+    return getter if len(indices) > 1 else lambda values: (getter(values),)
+
+
+# the indices of the hour, minute and second in the arguments of the templates of `_DateFormatter`.
+_TIME_DIRECTIVES = {'H': 0, 'M': 1, 'S': 2}
+# the directives that only depend on the day.
+_DAY_DIRECTIVES = frozenset('aAwdbBmyYjUWGuVCDFxegh%')
+_DIRECTIVE_RE = re.compile('%(.)', re.DOTALL)
+
+
+def _split_date_format(date_format):
+    """Split `date_format` around its `%H`, `%M` and `%S` directives.
+
+    Return the parts of the format and the indices of the time directives among them, or `(None, None)` if the
+    format has other directives that depend on the time of the day.
+
+        >>> _split_date_format('%Y-%m-%dT%H:%M:%S')
+        (['%Y-%m-%dT', ':', ':', ''], [0, 1, 2])
+        >>> _split_date_format('%I %p')
+        (None, None)
+
+    """
+    day_formats, time_fields = [], []
+    start = 0
+    for match in _DIRECTIVE_RE.finditer(date_format):
+        directive = match.group(1)
+        if directive in _TIME_DIRECTIVES:
+            day_formats.append(date_format[start:match.start()])
+            time_fields.append(_TIME_DIRECTIVES[directive])
+            start = match.end()
+        elif directive not in _DAY_DIRECTIVES:
+            return None, None
+    day_formats.append(date_format[start:])
+    return day_formats, time_fields
+
 
 class RepeaterProducer(Producer):
     """An producer that returns for `num_repeats` time the value generated by
@@ -208,6 +499,19 @@ class RepeaterProducer(Producer):
         self._sentinel = object()
         self._last_value = self._sentinel
 
+    def seek(self, row):
+        self._producer.seek(row // self.config.num_repeats)
+        self._last_value = self._sentinel
+
+    def get_state(self):
+        has_value = self._last_value is not self._sentinel
+        return self._current_count, has_value, self._last_value if has_value else None, self._producer.get_state()
+
+    def set_state(self, state):
+        self._current_count, has_value, last_value, producer_state = state
+        self._last_value = last_value if has_value else self._sentinel
+        self._producer.set_state(producer_state)
+
     def __call__(self):
         if self._last_value is self._sentinel or self._current_count >= self.config.num_repeats:
             self._last_value = self._producer()
@@ -229,6 +533,13 @@ class FixedProducer(Producer):
     def __call__(self):
         return self.config.value
 
+    def produce_batch(self, n):
+        return [self.config.value] * n
+
+    @property
+    def is_constant(self):
+        return True
+
     @classmethod
     def required_config_keys(cls):
         return {'value'}
@@ -237,23 +548,470 @@ class FixedProducer(Producer):
 class CyclingProducer(Producer):
     def __init__(self, random_funcs, config):
         super().__init__(random_funcs, 'cycle', config)
-        self._values = cycle(self.config.values)
+        self._all_values = list(self.config.values)
+        self._values = cycle(self._all_values)
+        self._position = 0
 
     def __call__(self):
+        self._position += 1
         return next(self._values)
 
+    def produce_batch(self, n):
+        self._position += n
+        return list(islice(self._values, n))
+
+    def seek(self, row):
+        self._position = row
+        if self._all_values:
+            self._values = islice(cycle(self._all_values), row % len(self._all_values), None)
+
+    def get_state(self):
+        return self._position % len(self._all_values) if self._all_values else 0
+
+    def set_state(self, state):
+        self.seek(state)
+
     @classmethod
     def required_config_keys(cls):
         return {'values'}
 
 
+class CategoricalProducer(Producer):
+    """Produce one of the `values`, each one drawn with probability proportional to its weight in `weights`.
+
+    The values are equally likely when there are no `weights`. The values are drawn with the alias method, using
+    a table built once by `_make_alias_table`, which takes a single random number per value however many values
+    there are.
+
+    """
+
+    def __init__(self, random_funcs, config):
+        super().__init__(random_funcs, 'categorical', config)
+        self._values = list(self.config.values)
+        if not self._values:
+            raise ValueError('The categorical producer needs at least one value.')
+        weights = getattr(self.config, 'weights', None)
+        if weights is None:
+            weights = [1] * len(self._values)
+        else:
+            weights = list(weights)
+        if len(weights) != len(self._values):
+            msg = 'The categorical producer got {} weights for {} values.'
+            raise ValueError(msg.format(len(weights), len(self._values)))
+        if any(not weight >= 0 or math.isinf(weight) for weight in weights) or sum(weights) <= 0:
+            raise ValueError('The weights must be finite, non-negative and not all zero. Got {} instead.'.format(
+                weights))
+        self._probabilities, aliases = _make_alias_table(weights)
+        self._aliased_values = [self._values[alias] for alias in aliases]
+
+    def __call__(self):
+        position = self._random_funcs.random() * len(self._values)
+        index = int(position)
+        if position - index < self._probabilities[index]:
+            return self._values[index]
+        return self._aliased_values[index]
+
+    def produce_batch(self, n):
+        random, size = self._random_funcs.random, len(self._values)
+        values, probabilities, aliased_values = self._values, self._probabilities, self._aliased_values
+        positions = [random() * size for _ in repeat(None, n)]
+        return [
+            values[index] if position - index < probabilities[index] else aliased_values[index]
+            for position, index in zip(positions, map(int, positions))
+        ]
+
+    @classmethod
+    def required_config_keys(cls):
+        return {'values'}
+
+
+def _make_alias_table(weights):
+    """Build the table of the alias method for the given `weights`, using Vose's algorithm.
+
+    Return the probabilities and the aliases of the table. The `i`-th value is drawn choosing a column `i` at
+    random and then taking the `i`-th value with probability `probabilities[i]` and the `aliases[i]`-th value
+    otherwise.
+
+        >>> _make_alias_table([7, 2, 1])
+        ([1.0, 0.6, 0.3], [0, 0, 0])
+
+    """
+    size = len(weights)
+    total = sum(weights)
+    probabilities = [weight * size / total for weight in weights]
+    aliases = list(range(size))
+    small = [index for index, probability in enumerate(probabilities) if probability < 1]
+    large = [index for index, probability in enumerate(probabilities) if probability >= 1]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        aliases[less] = more
+        probabilities[more] -= 1 - probabilities[less]
+        (small if probabilities[more] < 1 else large).append(more)
+    # the columns left are full, up to rounding errors.
+    for index in chain(small, large):
+        probabilities[index] = 1.0
+    return probabilities, aliases
+
+
+class PowerLawProducer(Producer):
+    """Produce the ranks from 1 to `n`, each one drawn with probability proportional to `(rank + q) ** -s`.
+
+    When the config specifies the `values` the producer returns the `rank`-th value instead of the rank, and `n`
+    defaults to the number of values. Up to `_POWER_LAW_TABLE_LIMIT` ranks, they are drawn by bisecting a
+    cumulative table of the weights. For more ranks, and up to billions of them, they are drawn with a
+    `_RejectionInversion`, which does not use memory for each rank.
+
+    """
+
+    def __init__(self, random_funcs, config=None, type_name='powerlaw'):
+        super().__init__(random_funcs, type_name, config)
+        self._values = self.config.get_values()
+        if self._values is not None:
+            self._values = list(self._values)
+        n = self.config.get_n(None if self._values is None else len(self._values))
+        if n is None:
+            raise ValueError('Type {} requires either the number of ranks `n` or the `values`.'.format(type_name))
+        if not isinstance(n, int) or isinstance(n, bool) or n < 1:
+            raise ValueError('The number of ranks must be a positive integer. Got {!r} instead.'.format(n))
+        if self._values is not None and len(self._values) != n:
+            raise ValueError('Type {} got {} values for {} ranks.'.format(type_name, len(self._values), n))
+        for name in ('s', 'q'):
+            value = getattr(self.config, name)
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or not 0 <= value < math.inf:
+                msg = 'The `{}` of a power-law must be a finite non-negative number. Got {!r} instead.'
+                raise ValueError(msg.format(name, value))
+        self._n = n
+        if n <= _POWER_LAW_TABLE_LIMIT:
+            s, q = self.config.s, self.config.q
+            self._cum_weights = list(accumulate((rank + q) ** -s for rank in range(1, n + 1)))
+            self._sampler = None
+        else:
+            self._cum_weights = None
+            self._sampler = _RejectionInversion(n, self.config.s, self.config.q)
+
+    def __call__(self):
+        return self.produce_batch(1)[0]
+
+    def produce_batch(self, n):
+        random = self._random_funcs.random
+        if self._sampler is None:
+            cum_weights, last = self._cum_weights, self._n - 1
+            total = cum_weights[-1]
+            # like `random.choices`, the bisection is bounded in case `random() * total` rounds up to `total`.
+            indexes = [bisect(cum_weights, random() * total, 0, last) for _ in repeat(None, n)]
+        else:
+            draw = self._sampler.draw
+            indexes = [draw(random) - 1 for _ in repeat(None, n)]
+        if self._values is None:
+            return [index + 1 for index in indexes]
+        return list(map(self._values.__getitem__, indexes))
+
+    @classmethod
+    def default_config(cls):
+        return {'q': 0.0}
+
+    @classmethod
+    def required_config_keys(cls):
+        return {'s'}
+
+
+class ZipfProducer(PowerLawProducer):
+    """Produce the ranks from 1 to `n` following Zipf's law, the power-law with exponent `s` and no offset."""
+
+    def __init__(self, random_funcs, config=None):
+        config = dict(config or {})
+        config['q'] = 0.0
+        super().__init__(random_funcs, config, type_name='zipf')
+
+    @classmethod
+    def default_config(cls):
+        return {'s': 1.0}
+
+
+class _RejectionInversion:
+    """Draw the ranks from 1 to `n` with probability proportional to `(rank + q) ** -s`.
+
+    This is the rejection-inversion method of Hörmann and Derflinger: a real number is drawn by inverting the
+    integral of the density `h(x) = (x + q) ** -s`, which bounds the weights of the ranks from above, and it is
+    rounded to the nearest rank, rejecting it when it falls outside of the area of the weight of the rank. The
+    draws take constant memory and expected time whatever `n` is.
+
+        >>> sampler = _RejectionInversion(10 ** 9, 1.0, 0.0)
+        >>> rand = random.Random(0)
+        >>> [sampler.draw(rand.random) for _ in range(8)]
+        [15, 96, 127721, 4007708, 18472, 178253, 55, 1555497]
+
+    """
+
+    def __init__(self, n, s, q):
+        self._n, self._s, self._q = n, s, q
+        self._h_integral_x1 = self._h_integral(1.5) - self._h(1)
+        self._h_integral_n = self._h_integral(n + 0.5)
+        # the rounded numbers this close to their rank are always in the area of its weight.
+        self._threshold = 2 - self._h_integral_inverse(self._h_integral(2.5) - self._h(2))
+
+    def draw(self, random):
+        h, h_integral, h_integral_inverse = self._h, self._h_integral, self._h_integral_inverse
+        low, width, n, threshold = self._h_integral_n, self._h_integral_x1 - self._h_integral_n, self._n, self._threshold
+        while True:
+            u = low + random() * width
+            x = h_integral_inverse(u)
+            rank = min(max(int(x + 0.5), 1), n)
+            if rank - x <= threshold or u >= h_integral(rank + 0.5) - h(rank):
+                return rank
+
+    def _h(self, x):
+        return math.exp(-self._s * math.log(x + self._q))
+
+    def _h_integral(self, x):
+        log_x = math.log(x + self._q)
+        return _expm1_ratio((1 - self._s) * log_x) * log_x
+
+    def _h_integral_inverse(self, y):
+        t = y * (1 - self._s)
+        if t <= -1:
+            # the inverse of the integral tends to zero.
+            return -self._q
+        return math.exp(_log1p_ratio(t) * y) - self._q
+
+
+def _expm1_ratio(x):
+    """Return `expm1(x) / x`, which tends to 1 when `x` tends to 0.
+
+        >>> _expm1_ratio(0.0)
+        1.0
+
+    """
+    if abs(x) > 1e-8:
+        return math.expm1(x) / x
+    return 1 + x / 2 * (1 + x / 3 * (1 + x / 4))
+
+
+def _log1p_ratio(x):
+    """Return `log1p(x) / x`, which tends to 1 when `x` tends to 0.
+
+        >>> _log1p_ratio(0.0)
+        1.0
+
+    """
+    if abs(x) > 1e-8:
+        return math.log1p(x) / x
+    return 1 - x * (1 / 2 - x * (1 / 3 - x / 4))
+
+
+class UniqueIntProducer(Producer):
+    """Produce distinct integers between `min` and `max`, in a random order.
+
+    The `row`-th value is the `row`-th integer of the range shuffled by a `_FeistelPermutation`, hence the values
+    are unique without remembering the ones already produced. The keys of the permutation are drawn when the
+    producer is created and they are kept when it is re-seeded, so the shards of a parallel generation, which
+    seek to their first row, produce disjoint parts of the same permutation.
+
+    """
+
+    def __init__(self, random_funcs, config=None):
+        super().__init__(random_funcs, 'unique_int', config)
+        min_value, max_value = self.config.min, self.config.max
+        if not all(isinstance(value, int) and not isinstance(value, bool) for value in (min_value, max_value)):
+            raise ValueError('The bounds of unique_int must be integers. Got {!r} and {!r} instead.'.format(
+                min_value, max_value))
+        size = max_value - min_value + 1
+        if not 1 <= size <= _FeistelPermutation.max_size:
+            raise ValueError('The range of unique_int must contain between 1 and {} integers. Got [{}, {}].'.format(
+                _FeistelPermutation.max_size, min_value, max_value))
+        self._permutation = _FeistelPermutation.random(size, self._random_funcs)
+        self._next_index = 0
+
+    def __call__(self):
+        return self.produce_batch(1)[0]
+
+    def produce_batch(self, n):
+        start = self._next_index
+        if start + n > self._permutation.size:
+            msg = 'The unique_int producer has run out of values: [{}, {}] contains only {} integers.'
+            raise ValueError(msg.format(self.config.min, self.config.max, self._permutation.size))
+        self._next_index += n
+        min_value = self.config.min
+        return [min_value + index for index in map(self._permutation, range(start, start + n))]
+
+    def seek(self, row):
+        self._next_index = row
+
+    def get_state(self):
+        return self._next_index, self._permutation.keys
+
+    def set_state(self, state):
+        self._next_index, keys = state
+        self._permutation = _FeistelPermutation(self._permutation.size, keys)
+
+    @classmethod
+    def default_config(cls):
+        return {'min': 0, 'max': 1_000_000}
+
+
+class _FeistelPermutation:
+    """A permutation of the integers in `range(size)`, determined by the round `keys`.
+
+    The integers are split in two halves of bits that go through a Feistel network, whose round function mixes
+    one half with the round key using the finalizer of SplitMix64. The network permutes all the integers with as
+    many bits as `size - 1`. Those outside of the range are permuted again until they fall inside it
+    (cycle-walking), which takes less than two passes through the network on average.
+
+        >>> permutation = _FeistelPermutation(10, (1, 2, 3, 4))
+        >>> [permutation(index) for index in range(10)]
+        [2, 3, 5, 8, 4, 0, 6, 7, 9, 1]
+
+    """
+
+    # the halves of the integers are mixed as 64 bits integers.
+    max_size = 2 ** 64
+    rounds = 4
+
+    def __init__(self, size, keys):
+        self.size = size
+        self.keys = tuple(keys)
+        bits = max((size - 1).bit_length(), 2)
+        self._low_bits = bits // 2
+        self._high_bits = bits - self._low_bits
+
+    @classmethod
+    def random(cls, size, random_funcs):
+        return cls(size, [random_funcs.getrandbits(64) for _ in range(cls.rounds)])
+
+    def __call__(self, index):
+        size = self.size
+        index = self._permute(index)
+        while index >= size:
+            index = self._permute(index)
+        return index
+
+    def _permute(self, value):
+        high_bits, low_bits = self._high_bits, self._low_bits
+        high, low = value >> low_bits, value & ((1 << low_bits) - 1)
+        for key in self.keys:
+            mixed = (low ^ key) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF
+            mixed = (mixed ^ (mixed >> 31)) * 0x94D049BB133111EB & 0xFFFFFFFFFFFFFFFF
+            mixed ^= mixed >> 29
+            # the halves are swapped at each round, hence they can have a different number of bits.
+            high, low = low, high ^ (mixed & ((1 << high_bits) - 1))
+            high_bits, low_bits = low_bits, high_bits
+        return (high << low_bits) | low
+
+
+class NumpyProducerMixin:
+    """Mixin for the producers of the NumPy backend.
+
+    These producers behave exactly as the pure-python ones when called, but they generate batches of values
+    using a `numpy.random.Generator`. The generator is seeded using `random_funcs`, so the output is still
+    reproducible when specifying a random seed. The batches are lists of python values, since the transformers
+    compute on them with python arithmetic, which would overflow on fixed-size NumPy integers.
+
+    """
+
+    def __init__(self, random_funcs, config=None):
+        super().__init__(random_funcs, config)
+        self.reseed()
+
+    def reseed(self):
+        self._generator = numpy.random.default_rng(self._random_funcs.randint(0, 2 ** 64 - 1))
+
+    def get_state(self):
+        return self._generator.bit_generator.state
+
+    def set_state(self, state):
+        self._generator.bit_generator.state = state
+
+
+class NumpyIntProducer(NumpyProducerMixin, IntProducer):
+    def produce_batch(self, n):
+        min_value, max_value = self.config.min, self.config.max
+        int64_info = numpy.iinfo(numpy.int64)
+        if min_value < int64_info.min or max_value > int64_info.max:
+            return super().produce_batch(n)
+        return self._generator.integers(min_value, max_value, size=n, endpoint=True).tolist()
+
+
+_NUMPY_DISTRIBUTIONS = {
+    'random': lambda gen, n: gen.random(n),
+    'uniform': lambda gen, n, a, b: gen.uniform(a, b, n),
+    'triangular': lambda gen, n, low=0.0, high=1.0, mode=None: gen.triangular(
+        low, (low + high) / 2 if mode is None else mode, high, n),
+    'betavariate': lambda gen, n, alpha, beta: gen.beta(alpha, beta, n),
+    'expovariate': lambda gen, n, lambd=1.0: gen.exponential(1 / lambd, n),
+    'gammavariate': lambda gen, n, alpha, beta: gen.gamma(alpha, beta, n),
+    'gauss': lambda gen, n, mu=0.0, sigma=1.0: gen.normal(mu, sigma, n),
+    'lognormvariate': lambda gen, n, mu, sigma: gen.lognormal(mu, sigma, n),
+    'normalvariate': lambda gen, n, mu=0.0, sigma=1.0: gen.normal(mu, sigma, n),
+    'vonmisesvariate': lambda gen, n, mu, kappa: gen.vonmises(mu, kappa, n) % (2 * math.pi),
+    'paretovariate': lambda gen, n, alpha: gen.pareto(alpha, n) + 1,
+    'weibullvariate': lambda gen, n, alpha, beta: alpha * gen.weibull(beta, n),
+}
+
+
+class NumpyFloatProducer(NumpyProducerMixin, FloatProducer):
+    def __init__(self, random_funcs, config=None):
+        super().__init__(random_funcs, config)
+        self._numpy_distribution = _NUMPY_DISTRIBUTIONS[self.config.distribution]
+
+    def produce_batch(self, n):
+        return self._numpy_distribution(self._generator, n, **self._kwargs).tolist()
+
+
+class NumpyStringMixin(NumpyProducerMixin):
+    def __init__(self, random_funcs, config=None):
+        super().__init__(random_funcs, config)
+        self._alphabet = numpy.array(list(self.config.characters))
+        weights = getattr(self.config, 'weights', None)
+        self._probabilities = None if weights is None else numpy.asarray(weights, dtype=float) / sum(weights)
+
+    def produce_batch(self, n):
+        min_len = getattr(self.config, 'min_len', self.config.len)
+        max_len = getattr(self.config, 'max_len', self.config.len)
+        lengths = self._generator.integers(min_len, max_len, size=n, endpoint=True)
+        total_length = int(lengths.sum())
+        if self._probabilities is None:
+            indices = self._generator.integers(0, len(self._alphabet), size=total_length)
+        else:
+            indices = self._generator.choice(len(self._alphabet), size=total_length, p=self._probabilities)
+        text = ''.join(self._alphabet[indices].tolist())
+        ends = numpy.cumsum(lengths).tolist()
+        return [text[start:end] for start, end in zip([0] + ends, ends)]
+
+
+class NumpyStringProducer(NumpyStringMixin, StringProducer):
+    pass
+
+
+class NumpyAlphaProducer(NumpyStringMixin, AlphaProducer):
+    pass
+
+
+class NumpyAlphaNumericProducer(NumpyStringMixin, AlphaNumericProducer):
+    pass
+
+
+class NumpyDateProducer(NumpyProducerMixin, DateProducer):
+    def produce_batch(self, n):
+        if self._mode != 'interval':
+            return super().produce_batch(n)
+        timestamps = self._generator.integers(self._start_ts, self._end_ts, size=n, endpoint=True).tolist()
+        if self._formatter is not None:
+            return self._formatter.format_timestamps(timestamps)
+        return list(map(partial(datetime.fromtimestamp, tz=timezone.utc), timestamps))
+
+
 def fmt_function(value, fmt_string):
     return fmt_string.format(value)
 
 
 class BuiltInLibrary(Library):
-    def __init__(self, global_configuration, random_funcs=random):
+    def __init__(self, global_configuration, random_funcs=random, backend='python'):
         super().__init__(global_configuration, random_funcs)
+        if backend not in ('python', 'numpy'):
+            raise ValueError('Invalid backend {!r}'.format(backend))
+        if backend == 'numpy' and numpy is None:
+            warnings.warn('NumPy is not available. Using the python backend instead.')
+            backend = 'python'
         factories = {
             'int': IntProducer,
             'float': FloatProducer,
@@ -263,16 +1021,38 @@ class BuiltInLibrary(Library):
             'date': DateProducer,
             'fixed': FixedProducer,
             'cycle': CyclingProducer,
+            'categorical': CategoricalProducer,
+            'powerlaw': PowerLawProducer,
+            'zipf': ZipfProducer,
+            'unique_int': UniqueIntProducer,
         }
+        if backend == 'numpy':
+            factories.update({
+                'int': NumpyIntProducer,
+                'float': NumpyFloatProducer,
+                'string': NumpyStringProducer,
+                'alpha': NumpyAlphaProducer,
+                'alnum': NumpyAlphaNumericProducer,
+                'date': NumpyDateProducer,
+            })
+        self._backend = backend
         self._func_env_types = {
             'fmt': ([AnyType(), SimpleType('string')], SimpleType('string'))
         }
         self._func_env = {
             'fmt': fmt_function,
             '::types::': self._func_env_types,
+            '::pure::': {'fmt'},
         }
         self.register_factories(factories)
 
+    @property
+    def backend(self):
+        return self._backend
+
+    def unquoted_types(self):
+        return {'int', 'float', 'date', 'alpha', 'alnum'}
+
     def compatibility(self):
         return BuiltInCompatibility()
 
@@ -293,9 +1073,9 @@ class BuiltInCompatibility(PairBasedCompatibility):
         })
 
 
-def create_library(global_configuration, definitions, random_funcs):
+def create_library(global_configuration, definitions, random_funcs, backend='python'):
     """Entry-point for the producer library."""
-    library = BuiltInLibrary(global_configuration, random_funcs)
+    library = BuiltInLibrary(global_configuration, random_funcs, backend=backend)
     if definitions:
         library.register_definitions(definitions)
     return library
@@ -0,0 +1,161 @@
+# Copyright 2018 Giacomo Alzetta <giacomo.alzetta+feanor@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import pickle
+import time
+
+from .writer import WriteBarrier
+
+__all__ = [
+    'DEFAULT_CHECKPOINT_INTERVAL', 'Checkpoint', 'Checkpointer', 'load_checkpoint', 'save_checkpoint',
+    'restore_output',
+]
+
+DEFAULT_CHECKPOINT_INTERVAL = 60.0
+_CHECKPOINT_VERSION = 1
+
+
+class Checkpoint:
+    """The progress of a generation: the `rows` written, the `offset` of the output and the `state` to resume from.
+
+    The `offset` is `None` when the output cannot tell its position, such as a sink. The `state` is the one
+    returned by `Engine.get_state`, or the seed and the next row of the parallel generation, and it is `None`
+    before the first row. The `columns` identify the schema that generated the data.
+
+    """
+
+    def __init__(self, columns, rows=0, offset=0, state=None):
+        self.columns = list(columns)
+        self.rows = rows
+        self.offset = offset
+        self.state = state
+
+    def __eq__(self, other):
+        return isinstance(other, Checkpoint) and vars(self) == vars(other)
+
+    def __repr__(self):
+        return 'Checkpoint(columns={!r}, rows={!r}, offset={!r}, state={!r})'.format(
+            self.columns, self.rows, self.offset, self.state,
+        )
+
+
+def save_checkpoint(path, checkpoint):
+    """Write the `checkpoint` into the file at `path`, atomically replacing the previous one."""
+    temporary_path = '{}.tmp'.format(path)
+    data = {'version': _CHECKPOINT_VERSION, **vars(checkpoint)}
+    with open(temporary_path, 'wb') as checkpoint_file:
+        pickle.dump(data, checkpoint_file, protocol=pickle.HIGHEST_PROTOCOL)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path, columns):
+    """Read the checkpoint at `path`, which must have been written generating the given `columns`.
+
+    When there is no file at `path` the returned checkpoint is the start of the generation.
+
+    :raises ValueError: when the file is not a checkpoint or it was written by another schema.
+
+    """
+    try:
+        with open(path, 'rb') as checkpoint_file:
+            data = pickle.load(checkpoint_file)
+    except FileNotFoundError:
+        return Checkpoint(columns)
+    except (pickle.UnpicklingError, EOFError) as e:
+        raise ValueError('{!r} is not a valid checkpoint: {}'.format(path, e)) from None
+    if not isinstance(data, dict) or data.pop('version', None) != _CHECKPOINT_VERSION:
+        raise ValueError('{!r} is not a valid checkpoint.'.format(path))
+    checkpoint = Checkpoint(**data)
+    if checkpoint.columns != list(columns):
+        msg = 'The checkpoint {!r} was written with the columns {}, not {}.'
+        raise ValueError(msg.format(path, ','.join(checkpoint.columns), ','.join(columns)))
+    return checkpoint
+
+
+def restore_output(output_file, checkpoint):
+    """Discard the data that `output_file` received after the `checkpoint`, if it can.
+
+    The outputs that cannot seek, such as the sinks, receive again the rows written after the checkpoint.
+
+    :raises ValueError: when `output_file` is shorter than the offset of the checkpoint, for example because it
+        was removed or recreated after the checkpoint was saved.
+
+    """
+    if checkpoint.offset is None or not _is_seekable(output_file):
+        return
+    size = output_file.seek(0, io.SEEK_END)
+    if size < checkpoint.offset:
+        msg = 'The output has {} bytes, but the checkpoint was saved after {} bytes: it is not the same output.'
+        raise ValueError(msg.format(size, checkpoint.offset))
+    output_file.seek(checkpoint.offset)
+    output_file.truncate()
+
+
+class Checkpointer:
+    """Save the checkpoints of a generation into the file at `path`, at most once every `interval` seconds.
+
+    The checkpoints are saved through `WriteBarrier`s, so they are saved only after the data before them has
+    been written into `output_file`, which is synced to disk. When the data is compressed, `compressed_file` is
+    the `feanor.compression.SegmentedCompressedFile` that writes into `output_file` and its current compressed
+    stream is ended before saving, so that the generation can be resumed after it.
+
+    """
+
+    def __init__(self, path, output_file, columns, *, interval=DEFAULT_CHECKPOINT_INTERVAL, compressed_file=None,
+                 clock=None):
+        if interval < 0:
+            raise ValueError('The checkpoint interval cannot be negative. Got {} instead.'.format(interval))
+        self._path = path
+        self._output_file = output_file
+        self._columns = list(columns)
+        self._interval = interval
+        self._compressed_file = compressed_file
+        self._clock = clock if clock is not None else time.monotonic
+        self._last_time = self._clock()
+
+    @property
+    def path(self):
+        return self._path
+
+    def is_due(self):
+        """Whether `interval` seconds have passed since the last checkpoint."""
+        return self._clock() - self._last_time >= self._interval
+
+    def barrier(self, rows, state):
+        """Return the `WriteBarrier` that saves the checkpoint after `rows` rows, to be resumed from `state`."""
+        self._last_time = self._clock()
+        # the state is pickled right away, since the engine keeps changing it while the data is being written.
+        pickled_state = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        return WriteBarrier(lambda: self._save(rows, pickled_state))
+
+    def _save(self, rows, pickled_state):
+        if self._compressed_file is not None:
+            self._compressed_file.end_segment()
+        offset = None
+        if _is_seekable(self._output_file):
+            self._output_file.flush()
+            os.fsync(self._output_file.fileno())
+            offset = self._output_file.tell()
+        save_checkpoint(self._path, Checkpoint(self._columns, rows, offset, pickle.loads(pickled_state)))
+
+
+def _is_seekable(output_file):
+    try:
+        return output_file.seekable() and output_file.fileno() >= 0
+    except (AttributeError, ValueError, io.UnsupportedOperation):
+        return False
@@ -0,0 +1,195 @@
+# Copyright 2018 Giacomo Alzetta <giacomo.alzetta+feanor@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bz2
+import gzip
+import io
+import lzma
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+__all__ = [
+    'COMPRESSION_METHODS', 'DEFAULT_GZIP_BLOCK_SIZE', 'ParallelGzipFile', 'SegmentedCompressedFile', 'open_compressed',
+]
+
+COMPRESSION_METHODS = ('gzip', 'bz2', 'xz') + (('zstd',) if zstandard is not None else ())
+DEFAULT_GZIP_BLOCK_SIZE = 1 << 20
+
+
+def open_compressed(output_file, method, *, threads=1):
+    """Return a binary file that writes into `output_file` the data compressed with `method`.
+
+    Closing the returned file writes the end of the compressed stream, but it does not close `output_file`.
+    Only `gzip` and `zstd` can use more than one thread.
+
+    :raises ValueError: when the `method` is unknown or it does not support the number of `threads`.
+
+    """
+    if method not in COMPRESSION_METHODS:
+        msg = 'Invalid compression method: {!r}. Available methods are: {}.'
+        raise ValueError(msg.format(method, ', '.join(COMPRESSION_METHODS)))
+    if threads < 1:
+        raise ValueError('The number of threads must be positive. Got {} instead.'.format(threads))
+    if threads > 1 and method not in ('gzip', 'zstd'):
+        raise ValueError('The {!r} compression cannot use more than one thread.'.format(method))
+
+    if method == 'gzip':
+        if threads > 1:
+            return ParallelGzipFile(output_file, threads=threads)
+        return gzip.GzipFile(fileobj=output_file, mode='wb', mtime=0)
+    elif method == 'bz2':
+        return bz2.BZ2File(output_file, mode='wb')
+    elif method == 'xz':
+        return lzma.LZMAFile(output_file, mode='wb')
+    else:
+        compressor = zstandard.ZstdCompressor(threads=threads if threads > 1 else 0)
+        return compressor.stream_writer(output_file, closefd=False)
+
+
+class ParallelGzipFile(io.BufferedIOBase):
+    """A binary file that compresses blocks of `block_size` bytes as independent gzip members in a thread pool.
+
+    The members are written into `output_file` in order, so the output is a valid gzip file that can be
+    decompressed by any gzip implementation, just like the output of `pigz`. Since `zlib` releases the GIL
+    while compressing, the blocks are compressed in parallel by the `threads` threads.
+
+        >>> output = io.BytesIO()
+        >>> with ParallelGzipFile(output, threads=2, block_size=4) as compressed:
+        ...     _ = compressed.write(b'hello world')
+        >>> gzip.decompress(output.getvalue())
+        b'hello world'
+
+    """
+
+    def __init__(self, output_file, *, threads, block_size=DEFAULT_GZIP_BLOCK_SIZE, compresslevel=6):
+        if block_size <= 0:
+            raise ValueError('The size of the blocks must be positive. Got {} instead.'.format(block_size))
+        self._output_file = output_file
+        self._block_size = block_size
+        self._compresslevel = compresslevel
+        self._max_pending = 2 * threads
+        self._executor = ThreadPoolExecutor(max_workers=threads)
+        self._pending = deque()
+        self._block = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError('write to closed file')
+        self._block += data
+        while len(self._block) >= self._block_size:
+            self._submit(bytes(self._block[:self._block_size]))
+            del self._block[:self._block_size]
+        return len(data)
+
+    def flush(self):
+        """Compress the data written up to now, even if it does not fill a block, and write it into the output.
+
+        The partial block becomes a gzip member of its own, so that a reader can decompress all the data flushed,
+        for example when the data is written at a given rate.
+
+        """
+        if self.closed:
+            raise ValueError('flush of closed file')
+        self._write_pending()
+        flush = getattr(self._output_file, 'flush', None)
+        if flush is not None:
+            flush()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._write_pending()
+        finally:
+            self._executor.shutdown()
+            super().close()
+
+    def _write_pending(self):
+        if self._block:
+            self._submit(bytes(self._block))
+            self._block.clear()
+        while self._pending:
+            self._output_file.write(self._pending.popleft().result())
+
+    def _submit(self, block):
+        self._pending.append(self._executor.submit(_compress_member, block, self._compresslevel))
+        while len(self._pending) > self._max_pending:
+            self._output_file.write(self._pending.popleft().result())
+
+
+class SegmentedCompressedFile(io.BufferedIOBase):
+    """A binary file that writes into `output_file` a sequence of streams compressed with `method`.
+
+    Calling `end_segment` ends the current compressed stream and the following data starts a new one. All the
+    compression methods decompress concatenated streams as a single one, so the output can be cut after any
+    segment and new segments can be appended to it, which is how the generation is resumed from a checkpoint.
+
+        >>> output = io.BytesIO()
+        >>> with SegmentedCompressedFile(output, 'gzip') as compressed:
+        ...     _ = compressed.write(b'hello ')
+        ...     compressed.end_segment()
+        ...     _ = compressed.write(b'world')
+        >>> gzip.decompress(output.getvalue())
+        b'hello world'
+
+    """
+
+    def __init__(self, output_file, method, *, threads=1):
+        self._output_file = output_file
+        self._method = method
+        self._threads = threads
+        self._segment = open_compressed(output_file, method, threads=threads)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError('write to closed file')
+        if self._segment is None:
+            self._segment = open_compressed(self._output_file, self._method, threads=self._threads)
+        return self._segment.write(data)
+
+    def flush(self):
+        if self._segment is not None:
+            self._segment.flush()
+
+    def end_segment(self):
+        """Write the end of the current compressed stream into the output file."""
+        if self._segment is not None:
+            segment, self._segment = self._segment, None
+            segment.close()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.end_segment()
+        finally:
+            super().close()
+
+
+def _compress_member(block, compresslevel):
+    # a window of 31 bits makes zlib write the gzip header and trailer, with a zero modification time.
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 31)
+    return compressor.compress(block) + compressor.flush()
@@ -0,0 +1,169 @@
+# Copyright 2018 Giacomo Alzetta <giacomo.alzetta+feanor@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Counter-based random functions, whose values depend only on the seed, the stream and the row.
+
+This module has the same interface as the `random` module, hence it can be used as the random module of
+feanor (`-r feanor.counter_random`). The `n`-th random number drawn by a stream in a given row is computed
+hashing the seed, the key of the stream, the row and `n`, so every row can be generated on its own: the
+engines use one stream for each producer and call `seek` before generating each row. This makes skipping
+rows take constant time and it makes the parallel generation produce the same data as the serial one.
+
+    >>> first = CounterRandom(42)
+    >>> first.seek(1000)
+    >>> second = CounterRandom(42)
+    >>> for row in range(1001):
+    ...     second.seek(row)
+    ...     value = second.random()
+    >>> first.random() == value
+    True
+
+"""
+
+import hashlib
+import os
+import random as _random
+from types import SimpleNamespace
+
+__all__ = ['CounterRandom', 'is_counter_based']
+
+_MASK = (1 << 64) - 1
+_GOLDEN_GAMMA = 0x9e3779b97f4a7c15
+_RECIP_BPF = 2 ** -53
+
+
+def is_counter_based(random_funcs):
+    """Whether `random_funcs` are counter-based random functions, with the `seek` and `stream` functions."""
+    return callable(getattr(random_funcs, 'seek', None)) and callable(getattr(random_funcs, 'stream', None))
+
+
+class CounterRandom(_random.Random):
+    """A `random.Random` whose numbers are computed from a counter, like SplitMix64.
+
+    The `n`-th number of a row is the SplitMix64 mixing function applied to the key of the row plus `n + 1` times
+    the golden gamma. The key of the row mixes the row with the key of the stream, which is the BLAKE2b hash of the
+    seed and of the name of the stream. The streams created by `stream` share the seed and the row with this
+    instance, so re-seeding or seeking it applies to all of them.
+
+    """
+
+    def __init__(self, x=None, *, _shared=None, _stream_name=b''):
+        self._stream_name = _stream_name
+        # the position is replaced by every call to `seed` and `seek`, so that the streams notice it at once.
+        self._position = None
+        self._stream_key = self._state = 0
+        if _shared is None:
+            self._shared = SimpleNamespace(key=b'', position=(0, 0))
+            super().__init__(x)
+        else:
+            self._shared = _shared
+            self.gauss_next = None
+
+    def seed(self, a=None, version=2):
+        material = os.urandom(16) if a is None else repr(a).encode()
+        self._shared.key = hashlib.blake2b(material, digest_size=16).digest()
+        self._shared.position = (self._shared.position[0] + 1, 0)
+        self.gauss_next = None
+
+    def seek(self, row):
+        """Make the following random numbers, of this instance and of all its streams, those of the `row`-th row."""
+        self._shared.position = (self._shared.position[0], row)
+
+    def stream(self, key):
+        """Return the random functions of the stream called `key`, which are independent from the others."""
+        return CounterRandom(_shared=self._shared, _stream_name=str(key).encode())
+
+    def getstate(self):
+        if self._position is not self._shared.position:
+            self._start_row()
+        return self._shared.key, self._shared.position[1], self._stream_name, self._state, self.gauss_next
+
+    def setstate(self, state):
+        key, row, self._stream_name, counter_state, gauss_next = state
+        self._shared.key = key
+        self._shared.position = (self._shared.position[0] + 1, row)
+        self._start_row()
+        self._state = counter_state
+        self.gauss_next = gauss_next
+
+    def random(self):
+        return (self._next_block() >> 11) * _RECIP_BPF
+
+    def getrandbits(self, k):
+        if k < 0:
+            raise ValueError('number of bits must be non-negative')
+        if k <= 64:
+            return self._next_block() >> (64 - k)
+        bits = 0
+        for _ in range((k + 63) // 64):
+            bits = (bits << 64) | self._next_block()
+        return bits >> (-k % 64)
+
+    def gauss(self, mu=0.0, sigma=1.0):
+        # the second value computed by `gauss` is kept for the next call, but only within the same row.
+        if self._position is not self._shared.position:
+            self.gauss_next = None
+        return super().gauss(mu, sigma)
+
+    def _next_block(self):
+        if self._position is not self._shared.position:
+            self._start_row()
+        # the mixing function is inlined, since this is called for every random number.
+        self._state = z = (self._state + _GOLDEN_GAMMA) & _MASK
+        z = ((z ^ (z >> 30)) * 0xbf58476d1ce4e5b9) & _MASK
+        z = ((z ^ (z >> 27)) * 0x94d049bb133111eb) & _MASK
+        return z ^ (z >> 31)
+
+    def _start_row(self):
+        generation, row = position = self._shared.position
+        if self._position is None or self._position[0] != generation:
+            digest = hashlib.blake2b(self._stream_name, key=self._shared.key, digest_size=8).digest()
+            self._stream_key = int.from_bytes(digest, 'little')
+        self._position = position
+        self._state = _mix(self._stream_key ^ _mix(row & _MASK))
+
+
+def _mix(z):
+    """The mixing function of SplitMix64, which turns consecutive numbers into uncorrelated ones."""
+    z = ((z ^ (z >> 30)) * 0xbf58476d1ce4e5b9) & _MASK
+    z = ((z ^ (z >> 27)) * 0x94d049bb133111eb) & _MASK
+    return z ^ (z >> 31)
+
+
+# the module level functions, bound to a shared instance just like those of the `random` module.
+_inst = CounterRandom()
+seed = _inst.seed
+seek = _inst.seek
+stream = _inst.stream
+random = _inst.random
+uniform = _inst.uniform
+triangular = _inst.triangular
+randint = _inst.randint
+choice = _inst.choice
+randrange = _inst.randrange
+sample = _inst.sample
+shuffle = _inst.shuffle
+choices = _inst.choices
+normalvariate = _inst.normalvariate
+lognormvariate = _inst.lognormvariate
+expovariate = _inst.expovariate
+vonmisesvariate = _inst.vonmisesvariate
+gammavariate = _inst.gammavariate
+gauss = _inst.gauss
+betavariate = _inst.betavariate
+paretovariate = _inst.paretovariate
+weibullvariate = _inst.weibullvariate
+getstate = _inst.getstate
+setstate = _inst.setstate
+getrandbits = _inst.getrandbits
@@ -36,7 +36,8 @@ def _word_regex(word):
 t_LET = _word_regex('let')
 t_IN = _word_regex('in')
 
-t_IDENTIFIER = r'[a-zA-Z][a-zA-Z0-9]*'
+# an underscore followed by a digit or a parenthesis is a projection, as in `@a_1`, hence it is not part of the name.
+t_IDENTIFIER = r'[a-zA-Z][a-zA-Z0-9]*(?:_[a-zA-Z][a-zA-Z0-9]*)*'
 
 
 
@@ -92,7 +93,8 @@ def t_string_QUOTE(t):
         return
     t.type = 'STRING'
     t.value = t.lexer.lexdata[t.lexer.string_start_position + len(t.lexer.string_start_quote):t.lexpos]
-    t.value = t.value.encode('utf-8').decode('unicode_escape')
+    # unicode_escape decodes the bytes as latin-1, so the other characters are passed as escape sequences.
+    t.value = t.value.encode('latin-1', 'backslashreplace').decode('unicode_escape')
     t.lexpos = t.lexer.string_start_position
     t.lexer.lineno += t.lexer.string_num_newlines
     t.lexer.string_start_quote = t.lexer.string_start_position = t.lexer.string_num_newlines = None
@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import math
 from itertools import starmap
+from operator import add
 
 from .ast import *
 from .types import *
@@ -286,6 +288,10 @@ class Compiler:
         self._cur_producer_id = 0
         self._cur_transformer_id = 0
         self._compiled_expressions = []
+        self._pure_functions = self._func_env.get('::pure::', set())
+        self._shared_outputs = {}
+        self._constant_values = {}
+        self._choices = {}
 
     def compile(self, expr: ExprNode, column_names: List[str] = None) -> Schema:
         self._inferencer.infer(expr)
@@ -355,6 +361,9 @@ class Compiler:
         result, name = children_values
         res_outputs = result.info['out_names']
         self._env[name] = res_outputs
+        if all(output in self._constant_values for output in res_outputs):
+            names = [name] if len(res_outputs) == 1 else ['{}#{}'.format(name, i) for i in range(len(res_outputs))]
+            self._constant_values.update(zip(names, (self._constant_values[output] for output in res_outputs)))
         if len(res_outputs) == 1:
             self._schema.add_transformer(self._new_transformer_name(), inputs=res_outputs, outputs=[name],
                                          transformer=IdentityTransformer(1))
@@ -379,22 +388,46 @@ class Compiler:
             cur_node.info['out_names'] = all_in_names
             return cur_node
         elif operator == '|':
+            # the configurations were already visited, hence they are plain numbers here.
+            if left_config is None and right_config is None:
+                left_config = right_config = 0.5
+            elif left_config is None:
+                left_config = 1 - right_config
+            elif right_config is None:
+                right_config = 1 - left_config
+            branches, chances = [], []
+            for child, chance in ((left, left_config), (right, right_config)):
+                child_branches, child_chances = self._take_choice_branches(child)
+                branches.extend(child_branches)
+                chances.extend(chance * child_chance for child_chance in child_chances)
+            in_names = list(chain.from_iterable(branches))
             transformer_name = self._new_transformer_name()
-            left_config = left_config.literal if left_config is not None else 0.5
-            right_config = right_config.literal if right_config is not None else 0.5
-            transformer = ChoiceTransformer(len(all_in_names), left_config, right_config)
-            self._schema.add_transformer(transformer_name, inputs=all_in_names, outputs=[transformer_name],
-                                         transformer=transformer)
+            transformer = ChoiceTransformer(len(in_names), *chances)
+            if transformer.num_outputs == 1:
+                outputs = [transformer_name]
+            else:
+                outputs = ['{}#{}'.format(transformer_name, i) for i in range(transformer.num_outputs)]
+            self._schema.add_transformer(transformer_name, inputs=in_names, outputs=outputs, transformer=transformer)
+            self._choices[tuple(outputs)] = (transformer_name, branches, chances)
             cur_node.info['assigned_name'] = None
-            cur_node.info['in_names'] = all_in_names
-            cur_node.info['out_names'] = [transformer_name]
+            cur_node.info['in_names'] = in_names
+            cur_node.info['out_names'] = outputs
             return cur_node
         elif operator == '+':
-            transformer_name = self._new_transformer_name()
-            transformer = MergeTransformer(len(all_in_names))
-            outputs = ['{}#{}'.format(transformer_name, i) for i in range(transformer.num_outputs)]
-            self._schema.add_transformer(transformer_name, inputs=all_in_names, outputs=outputs,
-                                         transformer=transformer)
+            def add_merge():
+                transformer_name = self._new_transformer_name()
+                transformer = MergeTransformer(len(all_in_names))
+                outputs = ['{}#{}'.format(transformer_name, i) for i in range(transformer.num_outputs)]
+                self._schema.add_transformer(transformer_name, inputs=all_in_names, outputs=outputs,
+                                             transformer=transformer)
+                return outputs
+
+            num_outputs = len(all_in_names) // 2
+            outputs = self._fold_constants(
+                all_in_names, lambda *values: list(map(add, values[:num_outputs], values[num_outputs:]))
+            )
+            if outputs is None:
+                outputs = self._hash_cons(('+', tuple(all_in_names)), add_merge)
             cur_node.info['assigned_name'] = None
             cur_node.info['in_names'] = all_in_names
             cur_node.info['out_names'] = outputs
@@ -410,10 +443,8 @@ class Compiler:
         try:
             cur_node.info['out_names'] = self._env[name]
         except KeyError:
-            producer_name = self._new_producer_name()
-            self._schema.add_producer(producer_name, type='fixed', config={'value': self._env['::constants::'][name]})
-            self._env[name] = [producer_name]
-            cur_node.info['out_names'] = [producer_name]
+            self._env[name] = self._add_fixed_producer(self._env['::constants::'][name])
+            cur_node.info['out_names'] = self._env[name]
         return cur_node
 
     @visitor.register(ProjectionNode)
@@ -437,24 +468,94 @@ class Compiler:
     def _(self, cur_node: CallNode, *children_values):
         name, *arguments = children_values
         all_in_names = list(chain.from_iterable(arg.info['out_names'] for arg in arguments))
-        transformer_name = self._new_transformer_name()
-        transformer = FunctionalTransformer(self._func_env[name])
-        self._schema.add_transformer(transformer_name, inputs=all_in_names, outputs=[transformer_name], transformer=transformer)
+        function = self._func_env[name]
+
+        def add_call():
+            transformer_name = self._new_transformer_name()
+            self._schema.add_transformer(transformer_name, inputs=all_in_names, outputs=[transformer_name],
+                                         transformer=FunctionalTransformer(function))
+            return [transformer_name]
+
+        # calls to impure functions must be evaluated separately, even when their arguments are the same.
+        if name in self._pure_functions:
+            outputs = self._fold_constants(all_in_names, lambda *values: [function(*values)])
+            if outputs is None:
+                outputs = self._hash_cons(('call', function, tuple(all_in_names)), add_call)
+        else:
+            outputs = add_call()
         cur_node.info['assigned_name'] = None
         cur_node.info['in_names'] = all_in_names
-        cur_node.info['out_names'] = [transformer_name]
+        cur_node.info['out_names'] = outputs
         return cur_node
 
     @visitor.register(SimpleExprNode)
     def _(self, cur_node: SimpleExprNode, *children_values):
         expr_value, = children_values
-        name = self._new_producer_name()
-        self._schema.add_producer(name, type='fixed', config={'value': expr_value})
         cur_node.info['assigned_name'] = None
         cur_node.info['in_names'] = []
-        cur_node.info['out_names'] = [name]
+        cur_node.info['out_names'] = self._add_fixed_producer(expr_value)
         return cur_node
 
+    def _take_choice_branches(self, node):
+        """Return the branches of `node` and their chances, to use them as branches of the choice containing it.
+
+        When `node` is itself a choice, such as the inner choices of `a | b | c`, its transformer is removed from
+        the schema and its branches are returned, so that the whole chain becomes a single choice that draws
+        one random number. Otherwise `node` is the only branch. Only the choices written directly inside another
+        choice are flattened: the ones that have a name can be used elsewhere.
+        """
+        is_choice = isinstance(node, BinaryOpNode) and node.children[0].name == '|'
+        if not is_choice:
+            return [node.info['out_names']], [1]
+        transformer_name, branches, chances = self._choices.pop(tuple(node.info['out_names']))
+        self._schema.remove_transformer(transformer_name)
+        return branches, chances
+
+    def _add_fixed_producer(self, value):
+        def add_producer():
+            name = self._new_producer_name()
+            self._schema.add_producer(name, type='fixed', config={'value': value})
+            self._constant_values[name] = value
+            return [name]
+
+        # the type and the sign of floats are part of the key because 1, 1.0 and True or 0.0 and -0.0 are equal
+        # but are written differently.
+        sign = math.copysign(1, value) if isinstance(value, float) else None
+        return self._hash_cons(('fixed', type(value), value, sign), add_producer)
+
+    def _fold_constants(self, in_names, compute):
+        """Return the names of the constants computed by `compute` when all the `in_names` are constants.
+
+        Return `None` when some input is not a constant or the computation fails, in which case the error is
+        raised when the data is generated, exactly as it would be without folding.
+        """
+        try:
+            values = [self._constant_values[name] for name in in_names]
+        except KeyError:
+            return None
+        try:
+            results = compute(*values)
+        except Exception:
+            return None
+        return list(chain.from_iterable(map(self._add_fixed_producer, results)))
+
+    def _hash_cons(self, key, add_node):
+        """Return the outputs of the deterministic node identified by `key`, calling `add_node` only the first time.
+
+        Nodes that are not deterministic, such as choices or calls to impure functions, have a `None` key and
+        are never shared. Random producers are never shared either because each one has its own name.
+        """
+        if key is None:
+            return add_node()
+        try:
+            outputs = self._shared_outputs.get(key)
+        except TypeError:
+            # unhashable values, such as lists, are not shared.
+            return add_node()
+        if outputs is None:
+            outputs = self._shared_outputs[key] = add_node()
+        return list(outputs)
+
     def _new_transformer_name(self) -> str:
         name = 'transformer#{}'.format(self._cur_transformer_id)
         self._cur_transformer_id += 1
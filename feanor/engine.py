@@ -12,91 +12,1097 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import csv
+import io
+import multiprocessing
+import random
+import re
+from bisect import bisect_left
+from collections import defaultdict, deque
+from contextlib import closing, ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count, islice, repeat
+from types import SimpleNamespace
+
+from .schema import (
+    SchemaError, IdentityTransformer, ProjectionTransformer, MergeTransformer, FunctionalTransformer, ChoiceTransformer,
+)
+from .checkpoint import DEFAULT_CHECKPOINT_INTERVAL, Checkpoint, Checkpointer, load_checkpoint, restore_output
+from .compression import open_compressed, SegmentedCompressedFile
+from .counter_random import is_counter_based
+from .optimizer import optimize as optimize_schema
+from .ratelimit import RateLimiter
+from .unique import DEFAULT_MEMORY_LIMIT, UniqueKeys
+from .writer import make_writer, DEFAULT_WRITE_BUFFER, DEFAULT_QUEUE_SIZE
+from .util import overloaded
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_SHARD_SIZE = 100_000
+EXACT_SIZE_SAMPLE_ROWS = 100
+# with checkpoints, the rows are generated in segments of this many rows and a checkpoint can follow each one.
+CHECKPOINT_SEGMENT_ROWS = 10_000
+CSV_SPECIAL_CHARACTERS = (',', '"', '\r', '\n')
+_SPECIAL_CHARACTERS_RE = re.compile('[,"\r\n]')
+# the transformers whose outputs are made of their inputs, hence they need quoting only when the inputs do.
+_VALUE_PRESERVING_TRANSFORMERS = (IdentityTransformer, ProjectionTransformer, MergeTransformer, ChoiceTransformer)
+
+
 class Engine:
-    def __init__(self, schema, library):
+    """Generate the rows of a schema one at a time.
+
+    When the random functions of the library are counter-based (see `feanor.counter_random`), each producer
+    uses its own stream of random numbers and the choices use another one, and the random functions are moved
+    to each row before generating it. Hence every row depends only on the seed and on its position.
+
+    With `unique_keys` (see `feanor.unique.UniqueKeys`) the rows whose unique keys were already generated are
+    discarded and generated again.
+
+    """
+
+    # the lines are checked for values that must be quoted in batches of this many rows.
+    _batch_size = DEFAULT_BATCH_SIZE
+
+    def __init__(self, schema, library, *, unique_keys=None):
         self._schema = schema
         self._library = library
-        self._generator = self._schema_to_generator(schema)
+        self._unique_keys = unique_keys
+        self._counter_based = is_counter_based(library.random_funcs)
+        self._next_row = 0
+        self._producers = self._make_producers(schema)
+        self._generator = self._schema_to_generator(schema, schema.columns)
+        self._line_template, self._constants, variable_columns = self._make_line_template(schema)
+        self._variable_columns = variable_columns
+        self._line_generator = self._schema_to_generator(schema, variable_columns)
+        self._quoted_columns = self._find_quoted_columns(schema, variable_columns)
+        empty_line = self._line_template % (('',) * len(variable_columns))
+        self._special_character_counts = _count_special_characters(empty_line)
+
+    def _schema_to_generator(self, schema, columns):
+        choice_random = self._library.random_funcs.stream('choices').random if self._counter_based else random.random
+        return DataGenerator(columns, self._producers, schema.transformers, schema.aliases,
+                             choice_random=choice_random)
+
+    def _make_line_template(self, schema):
+        """Return the template of the CSV lines, with the constant columns already rendered, the values of the
+        constant columns by name and the other columns.
+
+        """
+        plan = ExecutionPlan(schema.columns, self._producers, schema.transformers, schema.aliases)
+        constants = {}
+        for i, (node_id, _) in enumerate(plan.columns):
+            producer = plan.nodes[node_id].producer
+            if producer is not None and producer.is_constant:
+                constants[i] = producer()
+        variable_columns = [name for i, name in enumerate(schema.columns) if i not in constants]
+        constants_by_name = {schema.columns[i]: value for i, value in constants.items()}
+        return make_line_template(constants, len(schema.columns)), constants_by_name, variable_columns
 
-    def _schema_to_generator(self, schema):
+    def _find_quoted_columns(self, schema, columns):
+        """Return the indexes of the `columns` whose values can need quoting.
+
+        The quoting is decided by the producers that actually generate the values, which can differ from the
+        type of the column, as in `%int:cycle`. The values of a column never need quoting only when they all come
+        from producers of the unquoted types of the library, through transformers that do not create new values.
+
+        """
+        producer_types = {id(self._producers[producer.name]): producer.type for producer in schema.producers}
+        plan = ExecutionPlan(columns, self._producers, schema.transformers, schema.aliases)
+        unquoted = []
+        for node in plan.nodes:
+            if node.producer is not None:
+                unquoted.append(not self._library.needs_quoting(producer_types[id(node.producer)]))
+            else:
+                unquoted.append(isinstance(node.transformer, _VALUE_PRESERVING_TRANSFORMERS)
+                                and all(unquoted[node_id] for node_id, _ in node.inputs))
+        return [i for i, (node_id, _) in enumerate(plan.columns) if not unquoted[node_id]]
+
+    def _make_producers(self, schema):
         factory = self._library.make_producer
-        producers = {producer.name: factory(producer.type, producer.config) for producer in schema.producers}
-        return DataGenerator(schema.columns, producers, schema.transformers)
+        if not self._counter_based:
+            return {producer.name: factory(producer.type, producer.config) for producer in schema.producers}
+        stream = self._library.random_funcs.stream
+        return {
+            producer.name: factory(producer.type, producer.config, random_funcs=stream('producer:' + producer.name))
+            for producer in schema.producers
+        }
+
+    @property
+    def schema(self):
+        return self._schema
 
     @property
     def number_of_columns(self):
         return len(self._generator._columns)
 
+    def reseed(self, seed):
+        """Re-seed the random functions and the producers that keep their own random state."""
+        self._library.random_funcs.seed(seed)
+        # the choice transformers always use the random module.
+        random.seed(seed)
+        for producer in self._producers.values():
+            producer.reseed()
+
+    def seek(self, row):
+        """Inform the producers that the next row generated will be the `row`-th row of the data."""
+        self._next_row = row
+        for producer in self._producers.values():
+            producer.seek(row)
+
+    def get_state(self):
+        """Return the state of the generation, which can be restored with `set_state`.
+
+        The state contains the state of the random functions, of the `random` module used by the choices and of
+        the producers (see `Producer.get_state`), hence the random functions must have a `getstate` function.
+
+        """
+        return {
+            'random_funcs': self._library.random_funcs.getstate(),
+            'random': random.getstate(),
+            'producers': {name: producer.get_state() for name, producer in self._producers.items()},
+            'next_row': self._next_row,
+        }
+
+    def set_state(self, state):
+        """Restore the `state` returned by `get_state`.
+
+        :raises ValueError: when the `state` was returned by the engine of a different schema.
+
+        """
+        if state['producers'].keys() != self._producers.keys():
+            raise ValueError('The state was not saved by an engine of this schema.')
+        self._library.random_funcs.setstate(state['random_funcs'])
+        random.setstate(state['random'])
+        for name, producer_state in state['producers'].items():
+            self._producers[name].set_state(producer_state)
+        self._next_row = state['next_row']
+
+    def skip(self, number_of_rows):
+        """Skip the next `number_of_rows` rows.
+
+        With counter-based random functions this takes constant time, otherwise the rows are generated and
+        discarded. With unique keys the rows are always generated, so that their keys are remembered and the
+        positions taken by the rows generated again are the same as without skipping.
+
+        """
+        if self._counter_based and self._unique_keys is None:
+            self.seek(self._next_row + number_of_rows)
+        else:
+            deque(self.generate_data(number_of_rows), maxlen=0)
+
+    def _positioned(self, row_function):
+        """Return `row_function` moving the counter-based random functions to each row before generating it."""
+        if not self._counter_based:
+            return row_function
+        seek = self._library.random_funcs.seek
+
+        def positioned_row_function():
+            row = self._next_row
+            self._next_row = row + 1
+            seek(row)
+            return row_function()
+
+        return positioned_row_function
+
     def generate_data(self, number_of_rows=float('+inf')):
+        row_function = self._positioned(self._generator.row_function)
+        if self._unique_keys is not None:
+            row_function = self._unique_keys.row_function(row_function, self._schema.columns)
         while number_of_rows > 0:
-            yield self._generator()
+            yield row_function()
             number_of_rows -= 1
 
+    def generate_lines(self, number_of_rows=float('+inf')):
+        """Generate the data as CSV lines.
+
+        The values of the constant columns are rendered only once, in the template of the lines, and only the
+        other columns are generated for every row.
+
+        The columns whose type never needs quoting are written as they are. When there are other columns, the
+        rows are generated in batches and each batch is checked as a whole for values that must be quoted.
+
+        """
+        row_function = self._positioned(self._line_generator.row_function)
+        if self._unique_keys is not None:
+            row_function = self._unique_keys.row_function(row_function, self._variable_columns, self._constants)
+        template = self._line_template
+        if not self._quoted_columns:
+            while number_of_rows > 0:
+                yield template % row_function()
+                number_of_rows -= 1
+            return
+
+        for batch_size in self._batch_sizes(number_of_rows):
+            rows = [row_function() for _ in repeat(None, batch_size)]
+            lines = list(map(template.__mod__, rows))
+            if self._needs_quoting(lines):
+                lines = [template % self._quote_row(row) for row in rows]
+            yield from lines
+
+    def _batch_sizes(self, number_of_rows):
+        while number_of_rows > 0:
+            batch_size = min(self._batch_size, number_of_rows)
+            yield batch_size
+            number_of_rows -= batch_size
+
+    def _needs_quoting(self, lines):
+        """Whether some value in `lines` contains one of the characters that must be quoted.
+
+        The lines are checked all at once: when no value contains them, each line contains exactly the
+        special characters of the separators, of the newline and of the constant columns.
+
+        """
+        text = ''.join(lines)
+        number_of_lines = len(lines)
+        return any(
+            text.count(character) != number_of_lines * line_count
+            for character, line_count in zip(CSV_SPECIAL_CHARACTERS, self._special_character_counts)
+        )
+
+    def _quote_row(self, row):
+        values = list(row)
+        for i in self._quoted_columns:
+            values[i] = quote_field(str(values[i]))
+        return tuple(values)
+
+
+class ColumnarEngine(Engine):
+    """An engine that generates the data in batches of `batch_size` rows.
+
+    Each producer generates a whole column of values at a time and the transformers are applied to the
+    columns instead of the single rows. The columns are transposed into rows only when they are consumed.
+
+    """
+
+    def __init__(self, schema, library, *, batch_size=DEFAULT_BATCH_SIZE, unique_keys=None):
+        if batch_size <= 0:
+            raise ValueError('The batch size must be positive. Got {} instead.'.format(batch_size))
+        if is_counter_based(library.random_funcs):
+            raise ValueError('The columnar engine does not support counter-based random functions.')
+        self._batch_size = batch_size
+        super().__init__(schema, library, unique_keys=unique_keys)
+
+    def _schema_to_generator(self, schema, columns):
+        return ColumnarDataGenerator(columns, self._producers, schema.transformers, schema.aliases)
+
+    @property
+    def batch_size(self):
+        return self._batch_size
+
+    def generate_batches(self, number_of_rows=float('+inf')):
+        """Generate the data as a sequence of batches, each one being a list of columns."""
+        generator = self._generator
+        if self._unique_keys is not None:
+            generator = self._unique_keys.batch_function(generator, self._schema.columns)
+        for batch_size in self._batch_sizes(number_of_rows):
+            yield generator(batch_size)
+
+    def generate_data(self, number_of_rows=float('+inf')):
+        for columns in self.generate_batches(number_of_rows):
+            yield from zip(*columns)
+
+    def generate_lines(self, number_of_rows=float('+inf')):
+        format_line = self._line_template.__mod__
+        line_generator = self._line_generator
+        if self._unique_keys is not None:
+            line_generator = self._unique_keys.batch_function(line_generator, self._variable_columns, self._constants)
+        for batch_size in self._batch_sizes(number_of_rows):
+            columns = line_generator(batch_size)
+            if not columns:
+                yield from repeat(format_line(()), batch_size)
+                continue
+            formatted_columns = list(map(format_column, columns))
+            lines = list(map(format_line, zip(*formatted_columns)))
+            if self._quoted_columns and self._needs_quoting(lines):
+                for i in self._quoted_columns:
+                    formatted_columns[i] = list(map(quote_field, formatted_columns[i]))
+                lines = list(map(format_line, zip(*formatted_columns)))
+            yield from lines
+
+
+def make_line_template(constants, number_of_columns):
+    """Return the %-format string of a CSV line whose `i`-th column is the constant `constants[i]`, if present.
+
+    The other columns are filled in order with the string values of a tuple:
+
+        >>> template = make_line_template({1: '100%'}, 3)
+        >>> template
+        '%s,100%%,%s\\n'
+        >>> template % (1, (2, 3))
+        '1,100%,(2, 3)\\n'
+
+    """
+    fields = []
+    for i in range(number_of_columns):
+        if i in constants:
+            fields.append(quote_field(str(constants[i])).replace('%', '%%'))
+        else:
+            fields.append('%s')
+    return ','.join(fields) + '\n'
+
+
+def quote_field(value):
+    """Return the CSV field of the string `value`, which is quoted only if it contains special characters.
+
+        >>> quote_field('1,5'), quote_field('a "b" c')
+        ('"1,5"', '"a ""b"" c"')
+        >>> quote_field('ab')
+        'ab'
+
+    """
+    if _SPECIAL_CHARACTERS_RE.search(value) is None:
+        return value
+    return '"{}"'.format(value.replace('"', '""'))
+
+
+def _count_special_characters(text):
+    return tuple(map(text.count, CSV_SPECIAL_CHARACTERS))
+
+
+@overloaded
+def format_column(values):
+    """Convert a column of values into a list of strings.
+
+        >>> format_column([1, 'a', None])
+        ['1', 'a', 'None']
+
+    Libraries can register more efficient implementations for their own column types.
+
+    """
+    return list(map(str, values))
+
+
+class ExecutionPlan:
+    """The order and the scope in which the producers and transformers of a schema are evaluated.
+
+    Every producer and transformer becomes a node of the plan and every input refers to the output of
+    a previous node as a pair `(node_id, output_index)`. The nodes are kept in schema order, which is
+    always a valid evaluation order.
+
+    The choice transformers open a scope for each of their branches: a node whose outputs are only needed
+    by one branch of a choice is placed in that scope and evaluated only when the branch is selected. A
+    scope is the tuple of `(choice_node_id, branch)` pairs leading to it, the empty tuple being the top
+    level scope which is always evaluated.
+
+    The producers of constants that are never used have a `None` scope and are never evaluated.
+
+    The `aliases` map names to the names whose values they refer to.
+
+        >>> from feanor.schema import ChoiceTransformer
+        >>> from types import SimpleNamespace
+        >>> choice = SimpleNamespace(transformer=ChoiceTransformer(2, 0.5, 0.5), inputs=['a', 'b'], outputs=['c'])
+        >>> plan = ExecutionPlan(['c'], {'a': None, 'b': None}, [choice])
+        >>> [node.scope for node in plan.nodes]
+        [((2, 0),), ((2, 1),), ()]
+
+    """
+
+    def __init__(self, columns, producers, transformers, aliases=None):
+        self.nodes = []
+        self._aliases = aliases or {}
+        definitions = {}
+        for name, producer in producers.items():
+            node = self._add_node(producer=producer, transformer=None, inputs=[], num_outputs=1)
+            definitions[name] = (node.id, 0)
+        for transformer in transformers:
+            inputs = [self._resolve(definitions, name) for name in transformer.inputs]
+            node = self._add_node(
+                producer=None, transformer=transformer.transformer, inputs=inputs,
+                num_outputs=len(transformer.outputs),
+            )
+            definitions.update((name, (node.id, i)) for i, name in enumerate(transformer.outputs))
+        self.columns = [self._resolve(definitions, name) for name in columns]
+        self._place_nodes()
+
+    def _add_node(self, **attributes):
+        node = SimpleNamespace(id=len(self.nodes), scope=(), **attributes)
+        self.nodes.append(node)
+        return node
+
+    def _resolve(self, definitions, name):
+        while name not in definitions and name in self._aliases:
+            name = self._aliases[name]
+        try:
+            return definitions[name]
+        except KeyError:
+            raise SchemaError('Name {!r} is not defined in the schema.'.format(name)) from None
+
+    def _place_nodes(self):
+        # every node is placed in the innermost scope shared by all of its uses. The uses of a node
+        # always come after it, so a single backward pass places all of them.
+        uses = defaultdict(list)
+        for node_id, _ in self.columns:
+            uses[node_id].append(())
+        for node in reversed(self.nodes):
+            if not uses[node.id] and node.producer is not None and node.producer.is_constant:
+                # unused constants have no effect, so they are never evaluated.
+                node.scope = None
+                continue
+            node.scope = _common_prefix(uses[node.id])
+            for i, (input_id, _) in enumerate(node.inputs):
+                use_scope = self.branch_scope(node, self.branch_of(node, i)) if is_choice(node) else node.scope
+                uses[input_id].append(use_scope)
+        self._scopes = defaultdict(list)
+        for node in self.nodes:
+            if node.scope is not None:
+                self._scopes[node.scope].append(node)
+
+    @staticmethod
+    def branch_of(node, input_index):
+        """The branch of the choice `node` that uses its `input_index`-th input."""
+        return input_index // node.num_outputs
+
+    @staticmethod
+    def branch_inputs(node, branch):
+        """The inputs of the choice `node` that are the outputs of the given branch."""
+        return node.inputs[branch * node.num_outputs:(branch + 1) * node.num_outputs]
+
+    @staticmethod
+    def branch_scope(node, branch):
+        return node.scope + ((node.id, branch),)
+
+    def nodes_in_scope(self, scope):
+        """The nodes to evaluate, in order, when `scope` is entered."""
+        return self._scopes.get(scope, [])
+
+
+def is_choice(node):
+    return isinstance(node.transformer, ChoiceTransformer)
+
+
+def _common_prefix(scopes):
+    if not scopes:
+        return ()
+    prefix = scopes[0]
+    for scope in scopes[1:]:
+        length = 0
+        for a, b in zip(prefix, scope):
+            if a != b:
+                break
+            length += 1
+        prefix = prefix[:length]
+    return prefix
+
 
 class DataGenerator:
-    def __init__(self, columns, producers, transformers):
+    """Generate the rows of a schema.
+
+    The producers and transformers are compiled once into a python function (see `RowFunctionCompiler`)
+    which is then called for every row.
+    """
+
+    def __init__(self, columns, producers, transformers, aliases=None, *, choice_random=random.random):
         self._transformers = tuple(transformers)
         self._producers = producers
         self._columns = tuple(columns)
+        compiler = RowFunctionCompiler(self._columns, self._producers, self._transformers, aliases,
+                                       choice_random=choice_random)
+        self._row_function = compiler.compile()
+
+    @property
+    def row_function(self):
+        return self._row_function
 
     def __call__(self):
-        env = {name: producer() for name, producer in self._producers.items()}
-        for transformer in self._transformers:
-            output_values = transformer.transformer([env[input_name] for input_name in transformer.inputs])
-            for name, value in zip(transformer.outputs, output_values):
-                env[name] = value
+        return self._row_function()
+
 
-        return tuple(env[name] for name in self._columns)
+class ColumnarDataGenerator:
+    """Generate the columns of a schema for a given number of rows.
 
+    The branches of the choices are evaluated only for the rows that selected them (see `ExecutionPlan`):
+    the values computed outside of a branch are gathered for its rows when needed and the values of the
+    branches are scattered back into the output columns of the choice.
 
-def generate_data(schema, library, output_file, *, number_of_rows=None, byte_count=None, stream_mode=False):
+    """
+
+    def __init__(self, columns, producers, transformers, aliases=None):
+        self._transformers = tuple(transformers)
+        self._producers = producers
+        self._columns = tuple(columns)
+        self._plan = ExecutionPlan(self._columns, self._producers, self._transformers, aliases)
+
+    def __call__(self, number_of_rows):
+        values = {}
+        self._evaluate_scope((), number_of_rows, values)
+        return [values[node_id][index] for node_id, index in self._plan.columns]
+
+    def _evaluate_scope(self, scope, number_of_rows, values):
+        for node in self._plan.nodes_in_scope(scope):
+            if node.producer is not None:
+                values[node.id] = [node.producer.produce_batch(number_of_rows)]
+            elif is_choice(node):
+                values[node.id] = self._evaluate_choice(node, number_of_rows, values)
+            else:
+                values[node.id] = node.transformer.transform_batch([values[i][k] for i, k in node.inputs])
+
+    def _evaluate_choice(self, node, number_of_rows, values):
+        thresholds = node.transformer.thresholds
+        # the last list collects the rows that chose no branch, whose outputs are `None`.
+        rows_by_branch = [[] for _ in range(len(thresholds) + 1)]
+        for row, value in enumerate([random.random() for _ in range(number_of_rows)]):
+            rows_by_branch[bisect_left(thresholds, value)].append(row)
+        del rows_by_branch[-1]
+
+        outputs = [[None] * number_of_rows for _ in range(node.num_outputs)]
+        for branch, rows in enumerate(rows_by_branch):
+            if not rows:
+                continue
+            branch_values = _GatheredValues(values, rows)
+            self._evaluate_scope(self._plan.branch_scope(node, branch), len(rows), branch_values)
+            for output, (input_id, index) in zip(outputs, self._plan.branch_inputs(node, branch)):
+                for row, value in zip(rows, branch_values[input_id][index]):
+                    output[row] = value
+        return outputs
+
+
+class _GatheredValues(dict):
+    """The values of the nodes for a subset of the rows of `outer_values`.
+
+    The values computed in an outer scope are gathered only when they are first accessed.
+    """
+
+    def __init__(self, outer_values, rows):
+        super().__init__()
+        self._outer_values = outer_values
+        self._rows = rows
+
+    def __missing__(self, node_id):
+        rows = self._rows
+        columns = [[column[row] for row in rows] for column in self._outer_values[node_id]]
+        self[node_id] = columns
+        return columns
+
+
+class RowFunctionCompiler:
+    """Compile the producers and transformers of a schema into a python function that generates a row.
+
+    The producers and transformers are evaluated following the `ExecutionPlan` and the tuple of the
+    columns is returned. The intermediate values are kept in local variables and the producers and
+    transformers are bound as default arguments, thus avoiding all the dictionary lookups and temporary
+    lists.
+
+    The simplest transformers (identity, projection, merge and functional) are inlined and the choices select
+    their branch using `choice_random`.
+
+        >>> from feanor.schema import MergeTransformer
+        >>> from types import SimpleNamespace
+        >>> merge = SimpleNamespace(transformer=MergeTransformer(2), inputs=['a', 'b'], outputs=['c'])
+        >>> compiler = RowFunctionCompiler(['c', 'a'], {'a': lambda: 1, 'b': lambda: 2}, [merge])
+        >>> print(compiler.source())
+        def row_function(_p0=_p0, _p1=_p1):
+            _v0 = _p0()
+            _v1 = _p1()
+            _v2 = _v0 + _v1
+            return (_v2, _v0)
+        >>> compiler.compile()()
+        (3, 1)
+
+    The choices become `if` statements and the producers and transformers used only by one of their
+    branches are evaluated inside it:
+
+        >>> from feanor.schema import ChoiceTransformer
+        >>> choice = SimpleNamespace(transformer=ChoiceTransformer(2, 0.5, 0.5), inputs=['a', 'b'], outputs=['c'])
+        >>> print(RowFunctionCompiler(['c'], {'a': lambda: 1, 'b': lambda: 2}, [choice]).source())
+        def row_function(_random=_random, _p0=_p0, _p1=_p1):
+            _r2 = _random()
+            if _r2 <= 0.5:
+                _v0 = _p0()
+                _v1 = _v0
+            elif _r2 <= 1.0:
+                _v2 = _p1()
+                _v1 = _v2
+            else:
+                _v1 = None
+            return (_v1,)
+
+    """
+
+    def __init__(self, columns, producers, transformers, aliases=None, *, choice_random=random.random):
+        self._plan = ExecutionPlan(columns, producers, transformers, aliases)
+        self._choice_random = choice_random
+        self._namespace = {}
+        self._variables = {}
+        self._lines = []
+        self._cur_variable_id = 0
+        self._generate_body()
+
+    def source(self):
+        arguments = ', '.join('{0}={0}'.format(name) for name in self._namespace)
+        header = 'def row_function({}):'.format(arguments)
+        return '\n'.join([header] + self._lines)
+
+    def compile(self):
+        namespace = dict(self._namespace)
+        exec(compile(self.source(), '<feanor row function>', 'exec'), namespace)
+        return namespace['row_function']
+
+    def _generate_body(self):
+        self._emit_scope((), 1)
+        columns = [self._variables[output] for output in self._plan.columns]
+        self._emit('return ({}{})'.format(', '.join(columns), ',' if len(columns) == 1 else ''), 1)
+
+    def _emit_scope(self, scope, indent):
+        for node in self._plan.nodes_in_scope(scope):
+            if node.producer is not None:
+                producer_name = self._bind('_p{}'.format(node.id), node.producer)
+                self._emit('{} = {}()'.format(self._new_variable((node.id, 0)), producer_name), indent)
+            elif is_choice(node):
+                self._emit_choice(node, indent)
+            else:
+                inputs = [self._variables[output] for output in node.inputs]
+                outputs = [(node.id, i) for i in range(node.num_outputs)]
+                self._emit_transformer(node.transformer, node.id, inputs, outputs, indent)
+
+    def _emit_choice(self, node, indent):
+        random_name = self._bind('_random', self._choice_random)
+        selector = '_r{}'.format(node.id)
+        self._emit('{} = {}()'.format(selector, random_name), indent)
+        outputs = [(node.id, i) for i in range(node.num_outputs)]
+        for branch, threshold in enumerate(node.transformer.thresholds):
+            self._emit('{} {} <= {!r}:'.format('elif' if branch else 'if', selector, threshold), indent)
+            self._emit_scope(self._plan.branch_scope(node, branch), indent + 1)
+            branch_inputs = [self._variables[output] for output in self._plan.branch_inputs(node, branch)]
+            for output, value in zip(outputs, branch_inputs):
+                self._emit('{} = {}'.format(self._new_variable(output), value), indent + 1)
+        self._emit('else:', indent)
+        for output in outputs:
+            self._emit('{} = None'.format(self._new_variable(output)), indent + 1)
+
+    @overloaded
+    def _emit_transformer(self, transformer, index, inputs, outputs, indent):
+        transformer_name = self._bind('_t{}'.format(index), transformer)
+        outputs = [self._new_variable(output) for output in outputs]
+        self._emit('{}, = {}([{}])'.format(', '.join(outputs), transformer_name, ', '.join(inputs)), indent)
+
+    @_emit_transformer.register(IdentityTransformer)
+    def _(self, transformer, index, inputs, outputs, indent):
+        for output, value in zip(outputs, inputs):
+            self._emit('{} = {}'.format(self._new_variable(output), value), indent)
+
+    @_emit_transformer.register(ProjectionTransformer)
+    def _(self, transformer, index, inputs, outputs, indent):
+        self._emit('{} = {}'.format(self._new_variable(outputs[0]), inputs[transformer.index]), indent)
+
+    @_emit_transformer.register(MergeTransformer)
+    def _(self, transformer, index, inputs, outputs, indent):
+        left_inputs, right_inputs = inputs[:transformer.num_outputs], inputs[transformer.num_outputs:]
+        for output, left, right in zip(outputs, left_inputs, right_inputs):
+            self._emit('{} = {} + {}'.format(self._new_variable(output), left, right), indent)
+
+    @_emit_transformer.register(FunctionalTransformer)
+    def _(self, transformer, index, inputs, outputs, indent):
+        function_name = self._bind('_f{}'.format(index), transformer.function)
+        outputs = [self._new_variable(output) for output in outputs]
+        targets = outputs[0] if transformer.num_outputs == 1 else ', '.join(outputs) + ','
+        self._emit('{} = {}({})'.format(targets, function_name, ', '.join(inputs)), indent)
+
+    def _bind(self, name, value):
+        self._namespace[name] = value
+        return name
+
+    def _emit(self, line, indent):
+        self._lines.append('    ' * indent + line)
+
+    def _new_variable(self, output):
+        # all the assignments to the outputs of a choice must use the same variable.
+        if output in self._variables and is_choice(self._plan.nodes[output[0]]):
+            return self._variables[output]
+        variable = '_v{}'.format(self._cur_variable_id)
+        self._cur_variable_id += 1
+        self._variables[output] = variable
+        return variable
+
+
+def make_engine(schema, library, engine='row', *, batch_size=DEFAULT_BATCH_SIZE, unique_keys=None):
+    """Create the engine called `engine` for the given schema."""
+    if engine == 'row':
+        return Engine(schema, library, unique_keys=unique_keys)
+    elif engine == 'columnar':
+        return ColumnarEngine(schema, library, batch_size=batch_size, unique_keys=unique_keys)
+    raise ValueError('Invalid engine {!r}'.format(engine))
+
+
+def generate_data(schema, library, output_file, *, number_of_rows=None, byte_count=None, stream_mode=False,
+                  engine='row', batch_size=DEFAULT_BATCH_SIZE, jobs=1, shard_size=DEFAULT_SHARD_SIZE, optimize=True,
+                  report_file=None, write_buffer=DEFAULT_WRITE_BUFFER, queue_size=DEFAULT_QUEUE_SIZE, exact_size=False,
+                  compress=None, compress_threads=1, rate=None, rate_unit='rows', burst=None, ramp_up=0.0, skip=0,
+                  checkpoint=None, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL, resume=False, unique=None,
+                  unique_memory_limit=DEFAULT_MEMORY_LIMIT):
+    """Write the data generated by `schema` into `output_file`.
+
+    When `optimize` is true the schema is simplified before generating the data (see `feanor.optimizer`). The
+    reports about the generation are written into `report_file`, if given. The lines are written in chunks of
+    `write_buffer` characters by a separate thread that receives them through a queue of `queue_size` chunks,
+    or by the generating thread itself when `queue_size` is zero (see `feanor.writer`).
+
+    The `byte_count` is approximate: the lines are counted in characters and the last line can exceed it. With
+    `exact_size` the output has exactly `byte_count` bytes once encoded, the final row being trimmed
+    to fit outside of its quoted fields.
+
+    When `compress` is given, the output is compressed with that method using `compress_threads` threads (see
+    `feanor.compression`). The size given by `byte_count` refers to the uncompressed data.
+
+    When `rate` is given, the data is written at `rate` rows per second, or bytes per second when `rate_unit`
+    is `'bytes'`, allowing bursts of `burst` rows or bytes and reaching the rate linearly in `ramp_up` seconds
+    (see `feanor.ratelimit`). The achieved rate is written into `report_file`.
+
+    The first `skip` rows are not written, the header excluded. With counter-based random functions (see
+    `feanor.counter_random`) they are not even generated, unless there are `unique` keys, and the parallel
+    generation writes the same rows as the serial one.
+
+    When `checkpoint` is the path of a file, the progress of the generation is saved into it at most once every
+    `checkpoint_interval` seconds and at the end (see `feanor.checkpoint`). With `resume` the generation continues
+    from the checkpoint saved in that file, if any, and the data written after it is removed from `output_file`,
+    so the output is the same as the one of an uninterrupted generation. Resuming requires the same schema and
+    options, and a parallel generation must be resumed with more than one job.
+
+    The `unique` keys are sequences of names of columns whose values must be unique in the data: the rows whose
+    keys were already generated are generated again, remembering at most `unique_memory_limit` keys in memory
+    for each key and the others on disk (see `feanor.unique`). The collisions are reported into `report_file`.
+    The keys of all the rows must be remembered, hence they cannot be used with many jobs or with checkpoints.
+
+    """
     if number_of_rows is None is byte_count and not stream_mode:
         raise TypeError('You must specify the size either by number of rows or byte count or use stream mode')
     elif number_of_rows is not None is not byte_count:
         raise TypeError('You cannot specify both a number of rows and a byte count.')
+    elif exact_size and byte_count is None:
+        raise TypeError('The exact size can only be used with a byte count.')
+    elif skip < 0:
+        raise ValueError('The number of rows to skip cannot be negative. Got {} instead.'.format(skip))
+    elif resume and checkpoint is None:
+        raise TypeError('You must specify the checkpoint to resume from.')
+    elif checkpoint is not None and byte_count is not None:
+        raise TypeError('Checkpoints cannot be used with a byte count.')
+    elif unique and jobs != 1:
+        raise TypeError('Unique keys cannot be used with many jobs.')
+    elif unique and checkpoint is not None:
+        raise TypeError('Unique keys cannot be used with checkpoints.')
+
+    rate_limiter = RateLimiter(rate, unit=rate_unit, burst=burst, ramp_up=ramp_up) if rate is not None else None
 
+    if optimize:
+        schema, report = optimize_schema(schema)
+        if report_file is not None:
+            report_file.write('{}\n'.format(report))
+
+    start = Checkpoint(schema.columns)
+    if resume:
+        start = load_checkpoint(checkpoint, schema.columns)
+        restore_output(output_file, start)
     if number_of_rows is not None:
-        _generate_data_by_number_of_rows(schema, library, output_file, number_of_rows)
-    elif byte_count is not None:
-        _generate_data_by_byte_count(schema, library, output_file, byte_count)
+        number_of_rows -= start.rows
+
+    unique_keys = UniqueKeys(unique, memory_limit=unique_memory_limit) if unique else None
+
+    if jobs == 1:
+        engine = make_engine(schema, library, engine, batch_size=batch_size, unique_keys=unique_keys)
+        if start.state is not None:
+            _check_resumed_state(start.state, parallel=False)
+            engine.set_state(start.state)
+            skip = 0
     else:
-        _generate_data_stream(schema, library, output_file)
+        engine_options = {'engine': engine, 'batch_size': batch_size}
+        if start.state is not None:
+            _check_resumed_state(start.state, parallel=True)
+            base_seed, skip = start.state['base_seed'], start.state['next_row']
+        else:
+            base_seed = _make_base_seed(library)
+
+    with ExitStack() as stack:
+        output = output_file
+        compressed_file = None
+        if compress is not None and checkpoint is not None:
+            output = compressed_file = stack.enter_context(
+                SegmentedCompressedFile(output_file, compress, threads=compress_threads),
+            )
+        elif compress is not None:
+            output = stack.enter_context(open_compressed(output_file, compress, threads=compress_threads))
+        writer = make_writer(output, buffer_size=write_buffer, queue_size=queue_size,
+                             binary=True if compress is not None else None, rate_limiter=rate_limiter)
+        if unique_keys is not None:
+            stack.callback(unique_keys.close)
+        if report_file is not None:
+            # the reports are written even when the output fails, which is how the stream mode ends.
+            stack.callback(_write_reports, report_file, [writer, rate_limiter, output_file, unique_keys])
+
+        checkpointer = None
+        if checkpoint is not None:
+            checkpointer = Checkpointer(checkpoint, output_file, schema.columns, interval=checkpoint_interval,
+                                        compressed_file=compressed_file)
+        progress = {'header': start.state is None, 'checkpointer': checkpointer, 'rows_written': start.rows}
+        if jobs == 1:
+            lines = _make_stream_of_lines(engine, number_of_rows, skip, **progress)
+        else:
+            lines = _make_parallel_stream_of_lines(schema, library, engine_options, number_of_rows, jobs, shard_size,
+                                                   base_seed, skip, **progress)
+
+        if number_of_rows is not None:
+            _generate_data_by_number_of_rows(lines, writer)
+        elif byte_count is not None:
+            _generate_data_by_byte_count(lines, writer, byte_count, exact_size)
+        else:
+            _generate_data_stream(lines, writer)
+
+
+def _check_resumed_state(state, *, parallel):
+    if parallel and 'base_seed' not in state:
+        raise ValueError('The checkpoint was saved by a serial generation, it cannot be resumed with many jobs.')
+    elif not parallel and 'base_seed' in state:
+        raise ValueError('The checkpoint was saved by a parallel generation, it must be resumed with many jobs.')
+
+
+def _write_reports(report_file, sources):
+    """Write the reports of the `sources` that have one, such as the sinks of `feanor.sinks`."""
+    for source in sources:
+        report = getattr(source, 'report', None)
+        if report is not None:
+            report_file.write('{}\n'.format(report))
+
+
+def _generate_data_by_number_of_rows(lines, writer):
+    writer.write_lines(lines)
+
+
+def _generate_data_by_byte_count(lines, writer, byte_count, exact_size=False):
+    with closing(lines):
+        if exact_size:
+            chunk_size = writer.buffer_size or DEFAULT_WRITE_BUFFER
+            writer.write_lines(_take_exact_bytes(lines, byte_count, writer.encoding, chunk_size))
+        else:
+            writer.write_lines(_take_characters(lines, byte_count))
+
+
+def _take_characters(lines, count):
+    """Yield the lines until at least `count` characters have been yielded."""
+    num_characters = 0
+    for line in lines:
+        if num_characters >= count:
+            return
+        yield line
+        num_characters += len(line)
+
+
+def _take_exact_bytes(lines, byte_count, encoding, chunk_size):
+    """Yield chunks of lines whose total size, once encoded with `encoding`, is exactly `byte_count` bytes.
+
+    The first chunk is a sample of `EXACT_SIZE_SAMPLE_ROWS` rows used to estimate the size of the rows. Then the
+    rows are taken in chunks of about `chunk_size` bytes, or of the remaining bytes when they are fewer. The
+    rows of a chunk that does not fit are taken one at a time and the last one is trimmed to fit exactly
+    (see `_fit_line`).
+
+    """
+    ascii_compatible = 'a'.encode(encoding) == b'a'
+    remaining = byte_count
+    num_rows = EXACT_SIZE_SAMPLE_ROWS
+    while remaining > 0:
+        chunk_lines = list(islice(lines, num_rows))
+        if not chunk_lines:
+            return
+        chunk = ''.join(chunk_lines)
+        size = len(chunk) if ascii_compatible and chunk.isascii() else len(chunk.encode(encoding))
+        if size <= remaining:
+            yield chunk
+            remaining -= size
+            num_rows = max(1, int(min(remaining, chunk_size) * len(chunk_lines) / max(size, 1)))
+            continue
+        for line in chunk_lines:
+            line_size = len(line.encode(encoding))
+            if line_size >= remaining:
+                yield line if line_size == remaining else _fit_line(line, remaining, encoding)
+                return
+            yield line
+            remaining -= line_size
+
+
+def _fit_line(line, size, encoding):
+    """Trim the CSV row `line` so that it is exactly `size` bytes once encoded, padding it with spaces if needed.
+
+    Only the field that crosses the size is changed: its longest prefix without special characters is trimmed or
+    padded so that the field is not quoted, while the fields before it are kept whole and those after it dropped.
+
+        >>> _fit_line('abcd\\n', 3, 'utf-8')
+        'ab\\n'
+        >>> _fit_line('a€\\n', 3, 'utf-8')
+        'a \\n'
+        >>> _fit_line('"a,b",cd,e\\n', 8, 'utf-8')
+        '"a,b",c\\n'
+        >>> _fit_line('"a,b",cd\\n', 6, 'utf-8')
+        '"a,b"\\n'
+        >>> _fit_line('"a,b",cd\\n', 4, 'utf-8')
+        'a  \\n'
+
+    :raises ValueError: if `encoding` cannot reach exactly `size` bytes by padding with spaces.
+
+    """
+    values = next(csv.reader(io.StringIO(line, newline='')), [])
+    budget = size - 1
+    kept = []
+    for value in values:
+        field = quote_field(value)
+        field_size = len(field.encode(encoding))
+        if field_size > budget:
+            break
+        kept.append(field)
+        budget -= field_size + 1
+    else:
+        raise ValueError('The line {!r} is not longer than {} bytes.'.format(line, size))
+    if budget < 0:
+        # the fields kept fill the size exactly, only the comma before the next one does not fit.
+        fitted = ','.join(kept) + '\n'
+    else:
+        prefix = _SPECIAL_CHARACTERS_RE.split(value, 1)[0]
+        text = prefix.encode(encoding)[:budget].decode(encoding, 'ignore')
+        text += ' ' * (budget - len(text.encode(encoding)))
+        fitted = ','.join(kept + [text]) + '\n'
+    if len(fitted.encode(encoding)) != size:
+        raise ValueError('Cannot fit a row in exactly {} bytes with the encoding {!r}.'.format(size, encoding))
+    return fitted
+
+
+def _generate_data_stream(lines, writer):
+    writer.write_lines(lines)
+
+
+def _make_stream_of_lines(engine, number_of_rows=None, skip=0, *, header=True, checkpointer=None, rows_written=0):
+    """Generate the lines of the data, preceded by the header if `header` is true.
+
+    With a `checkpointer` the rows are generated in segments of `CHECKPOINT_SEGMENT_ROWS` rows, and the
+    barriers that save the checkpoints are placed after them. The `rows_written` before are counted in them.
+
+    """
+    if header and engine.schema.show_header:
+        yield ','.join(map(quote_field, engine.schema.columns)) + '\n'
+
+    if skip:
+        engine.skip(skip)
+    number_of_rows = number_of_rows if number_of_rows is not None else float('+inf')
+    if checkpointer is None:
+        yield from engine.generate_lines(number_of_rows)
+        return
+
+    while number_of_rows > 0:
+        segment_rows = min(CHECKPOINT_SEGMENT_ROWS, number_of_rows)
+        yield from engine.generate_lines(segment_rows)
+        number_of_rows -= segment_rows
+        rows_written += segment_rows
+        if number_of_rows > 0 and checkpointer.is_due():
+            yield checkpointer.barrier(rows_written, engine.get_state())
+    yield checkpointer.barrier(rows_written, engine.get_state())
+
+
+def _make_base_seed(library):
+    """The seed from which the seeds of the shards are derived, or `None` for counter-based random functions.
+
+    Counter-based random functions are not re-seeded, since each row already depends only on its position:
+    the output is the same as the serial one.
+    """
+    if is_counter_based(library.random_funcs):
+        return None
+    return library.random_funcs.randint(0, 2 ** 64 - 1)
+
+
+def _make_parallel_stream_of_lines(schema, library, engine_options, number_of_rows, jobs, shard_size, base_seed,
+                                   skip=0, *, header=True, checkpointer=None, rows_written=0):
+    """Generate the lines splitting the rows in shards of `shard_size` rows, which are generated in parallel.
+
+    Each shard uses a seed derived from `base_seed` (see `_make_base_seed`), hence the output is reproducible
+    when using a random seed and it is the same for any number of `jobs`. It differs from the output of the
+    serial generation used with a single job, which does not split the rows in shards. The first `skip` rows
+    are skipped, keeping the shards of the whole data.
+
+    With a `checkpointer` the barriers that save the checkpoints are placed after the shards, and the
+    `rows_written` before are counted in them.
+
+    """
+    if jobs <= 0:
+        raise ValueError('The number of jobs must be positive. Got {} instead.'.format(jobs))
+    if shard_size <= 0:
+        raise ValueError('The shard size must be positive. Got {} instead.'.format(shard_size))
+    if 'fork' not in multiprocessing.get_all_start_methods():  # pragma: no cover
+        raise ValueError('Parallel generation is not supported on this platform.')
+
+    if header and schema.show_header:
+        yield ','.join(map(quote_field, schema.columns)) + '\n'
+
+    shards = _make_shards(base_seed, number_of_rows, shard_size, skip)
+    # NOTE: the schema and library are passed to the workers by forking the process, since libraries
+    # may contain objects that cannot be pickled, such as the random module.
+    executor = ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('fork'),
+                                   initializer=_initialize_worker,
+                                   initargs=(schema, library, engine_options, base_seed))
+    pending = deque()
+    next_row = skip
+
+    def shard_lines(future, rows):
+        nonlocal rows_written, next_row
+        yield from future.result()
+        rows_written += rows
+        next_row += rows
+        if checkpointer is not None and checkpointer.is_due():
+            yield checkpointer.barrier(rows_written, {'base_seed': base_seed, 'next_row': next_row})
 
+    try:
+        for shard in shards:
+            pending.append((executor.submit(_generate_shard, shard), shard[-1]))
+            if len(pending) >= 2 * jobs:
+                yield from shard_lines(*pending.popleft())
+        while pending:
+            yield from shard_lines(*pending.popleft())
+    finally:
+        for future, _ in pending:
+            future.cancel()
+        executor.shutdown()
+    if checkpointer is not None:
+        yield checkpointer.barrier(rows_written, {'base_seed': base_seed, 'next_row': next_row})
 
-def _generate_data_by_number_of_rows(schema, library, output_file, number_of_rows):
-    generator = _make_stream_of_data(schema, library, number_of_rows)
 
-    for data in generator:
-        output_file.write(','.join(map(str, data)) + '\n')
+def _make_shards(base_seed, number_of_rows, shard_size, skip=0):
+    """Split the rows after the first `skip` ones into shards.
 
+    Each shard is returned as its seed, its first row, the number of its rows to skip and the number of rows to
+    generate. The seed is `None` when `base_seed` is `None`.
 
-def _generate_data_by_byte_count(schema, library, output_file, byte_count):
-    generator = _make_stream_of_data(schema, library)
-    num_bytes = 0
+        >>> list(_make_shards(7, 5, 2))
+        [('7:0', 0, 0, 2), ('7:1', 2, 0, 2), ('7:2', 4, 0, 1)]
+        >>> list(_make_shards(None, 3, 2, skip=3))
+        [(None, 2, 1, 1), (None, 4, 0, 2)]
 
-    def write_to_file(seq):
-        nonlocal num_bytes
-        line = ','.join(map(str, seq)) + '\n'
-        num_bytes += len(line)
-        output_file.write(line)
+    """
+    end = None if number_of_rows is None else skip + number_of_rows
+    for index in count(skip // shard_size):
+        first_row = index * shard_size
+        skipped_rows = max(0, skip - first_row)
+        rows = shard_size - skipped_rows if end is None else min(first_row + shard_size, end) - first_row - skipped_rows
+        if rows <= 0:
+            return
+        seed = None if base_seed is None else '{}:{}'.format(base_seed, index)
+        yield seed, first_row, skipped_rows, rows
 
-    while num_bytes < byte_count:
-        write_to_file(next(generator))
 
+_worker_engine = None
 
-def _generate_data_stream(schema, library, output_file):
-    generator = _make_stream_of_data(schema, library)
 
-    def write_to_file(seq):
-        output_file.write(','.join(map(str, seq)) + '\n')
+def _initialize_worker(schema, library, engine_options, base_seed):
+    """Create the engine of a worker process.
 
-    for data in generator:  # pragma: no cover
-        write_to_file(data)
+    The producers can draw random values when they are created, such as the keys of `unique_int`, which must
+    be the same in all the workers. Since the random module is re-seeded when the process is forked, the random
+    functions are seeded from `base_seed` first, with a seed that differs from those of the shards.
 
+    """
+    global _worker_engine
+    if base_seed is not None:
+        library.random_funcs.seed('{}:producers'.format(base_seed))
+    _worker_engine = make_engine(schema, library, **engine_options)
 
-def _make_stream_of_data(schema, library, number_of_rows=float('+inf')):
-    engine = Engine(schema, library)
-    if schema.show_header:
-        yield schema.columns
 
-    yield from engine.generate_data(number_of_rows)
+def _generate_shard(shard):
+    seed, first_row, skipped_rows, number_of_rows = shard
+    if seed is not None:
+        _worker_engine.reseed(seed)
+    _worker_engine.seek(first_row)
+    if skipped_rows:
+        _worker_engine.skip(skipped_rows)
+    # the lines are returned one by one, since the quoted values can contain newlines.
+    return list(_worker_engine.generate_lines(number_of_rows))
@@ -25,7 +25,8 @@ class Library(metaclass=ABCMeta):
         self._factories = {}
         self.definitions = {}
 
-    def make_producer(self, name, config):
+    def make_producer(self, name, config, *, random_funcs=None):
+        """Create the producer called `name`, using `random_funcs` instead of those of the library if given."""
         name_chain = self._name_config_chain(name)
         factory = self._get_producer_factory(name_chain)
         the_config = {}
@@ -33,7 +34,7 @@ class Library(metaclass=ABCMeta):
             the_config.update(ancestor_config)
             the_config.update(self.global_configuration.get(ancestor_name, {}))
         the_config.update(config)
-        return factory(self.random_funcs, the_config)
+        return factory(random_funcs if random_funcs is not None else self.random_funcs, the_config)
 
     def _name_config_chain(self, name):
         name_chain = []
@@ -76,6 +77,22 @@ class Library(metaclass=ABCMeta):
         elif name in self.definitions:
             raise ValueError('A definition called {!r} already exists'.format(name))
 
+    def unquoted_types(self):
+        """The names of the producers whose values never contain the characters that must be quoted in a CSV file."""
+        return set()
+
+    def needs_quoting(self, type_name):
+        """Whether the values of the type `type_name` can need quoting in a CSV file.
+
+        The values of an unknown type, when `type_name` is `None`, always can. The type aliases are resolved
+        to the producer that they refer to.
+
+        """
+        if type_name is None:
+            return True
+        producer_name = self._name_config_chain(type_name)[0][0]
+        return producer_name not in self.unquoted_types()
+
     @abstractmethod
     def compatibility(self):
         raise NotImplementedError
@@ -108,10 +125,12 @@ class MockLibrary(Library):
     def func_env(self):
         return self._func_env
 
-    def register_function(self, name, func, arg_types, ret_type):
+    def register_function(self, name, func, arg_types, ret_type, *, pure=False):
         self._func_env[name] = func
         func_env_types = self._func_env.setdefault('::types::', {})
         func_env_types[name] = (arg_types, ret_type)
+        if pure:
+            self._func_env.setdefault('::pure::', set()).add(name)
 
     def register_variable(self, name, value, type):
         self._env[name] = value
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import io
+import os
 import ast
 import csv
 import re
@@ -24,7 +25,9 @@ from . import __version__
 from .util import load_python_module, cls_name
 from .dsl import get_parser as dsl_get_parser
 from .dsl.compiler import Compiler
+from .compression import COMPRESSION_METHODS
 from .engine import generate_data
+from .sinks import is_sink_uri, open_sink
 
 
 def main():  # pragma: no cover
@@ -38,18 +41,24 @@ def parse_arguments(args=None):
     args = parser.parse_args(args=args)
     try:
         schema, library, size_dict = get_schema_size_and_library_params(args)
-    except (ValueError, TypeError) as e:  # pragma: no cover
+        # the output file is opened only now, since resuming must not truncate it.
+        output_file = _open_output_file(args.output_file, resume=bool(args.resume))
+    except (ValueError, TypeError, argparse.ArgumentTypeError) as e:  # pragma: no cover
         parser.print_usage(sys.stderr)
         sys.stderr.write('{}: error: {}\n'.format(parser.prog, str(e)))
         sys.exit(2)
     else:
-        return schema, library, args.output_file, size_dict
+        size_dict.update(get_generation_options(args))
+        return schema, library, output_file, size_dict
 
 
 def get_schema_size_and_library_params(args):
+    if args.backend == 'numpy' and args.engine != 'columnar':
+        raise ValueError('The numpy backend generates batches of values, hence it requires the columnar engine.')
     if args.random_seed is not None:
         args.random_module.seed(args.random_seed)
-    library = get_library(args.library, args.global_configuration, args.define, args.random_module)
+    library = get_library(args.library, args.global_configuration, args.define, args.random_module,
+                          backend=args.backend)
     if args.schema_definition_type in ('cmdline', 'options', 'opts'):
         schema = make_schema_cmdline(args.columns, args.expressions_defined, args.show_header, library)
     elif args.schema_definition_type == 'expr':
@@ -67,6 +76,49 @@ def get_schema_size_and_library_params(args):
     return schema, library, size_dict
 
 
+def get_generation_options(args):
+    options = {}
+    if args.engine is not None:
+        options['engine'] = args.engine
+    if args.batch_size is not None:
+        options['batch_size'] = args.batch_size
+    if args.jobs is not None:
+        options['jobs'] = args.jobs
+    if args.optimize is not None:
+        options['optimize'] = args.optimize
+    if args.report:
+        options['report_file'] = sys.stderr
+    if args.write_buffer is not None:
+        options['write_buffer'] = args.write_buffer
+    if args.queue_size is not None:
+        options['queue_size'] = args.queue_size
+    if args.exact_size is not None:
+        options['exact_size'] = args.exact_size
+    if args.compress is not None:
+        options['compress'] = args.compress
+    if args.compress_threads is not None:
+        options['compress_threads'] = args.compress_threads
+    if args.rate is not None:
+        options['rate'], options['rate_unit'] = args.rate
+    if args.burst is not None:
+        options['burst'] = args.burst
+    if args.ramp_up is not None:
+        options['ramp_up'] = args.ramp_up
+    if args.skip is not None:
+        options['skip'] = args.skip
+    if args.checkpoint is not None:
+        options['checkpoint'] = args.checkpoint
+    if args.checkpoint_interval is not None:
+        options['checkpoint_interval'] = args.checkpoint_interval
+    if args.resume is not None:
+        options['resume'] = args.resume
+    if args.unique is not None:
+        options['unique'] = args.unique
+    if args.unique_memory_limit is not None:
+        options['unique_memory_limit'] = args.unique_memory_limit
+    return options
+
+
 def get_parser():
     parser = argparse.ArgumentParser()
     parser.add_argument('--no-header', action='store_false', help='Do not add header to the output.',
@@ -80,15 +132,59 @@ def get_parser():
                         help='The random module to be used to generate random data.')
     parser.add_argument('-s', '--random-seed', type=ast.literal_eval, help='The random seed to use for this run.')
     parser.add_argument('--version', action='version', version='%(prog)s {}'.format(__version__))
+    parser.add_argument('--engine', choices=['row', 'columnar'],
+                        help='The engine used to generate the data. The columnar engine generates batches of rows.')
+    parser.add_argument('--batch-size', type=_positive_int, help='The number of rows of a batch.', metavar='N')
+    parser.add_argument('-j', '--jobs', type=_positive_int, metavar='N',
+                        help='The number of processes used to generate the data.')
+    parser.add_argument('--backend', choices=['python', 'numpy'],
+                        help='The backend used by the library to generate batches of values. '
+                             'The numpy backend requires the columnar engine.')
+    parser.add_argument('--no-optimize', action='store_const', const=False, dest='optimize',
+                        help='Do not simplify the schema before generating the data.')
+    parser.add_argument('--report', action='store_true', default=None,
+                        help='Write reports about the generation of the data to the standard error.')
+    parser.add_argument('--write-buffer', type=_non_negative_int, metavar='N',
+                        help='The number of characters collected before writing them to the output file.')
+    parser.add_argument('--queue-size', type=_non_negative_int, metavar='N',
+                        help='The number of chunks waiting to be written by the writer thread. '
+                             'With 0 the data is written without a separate thread.')
+    parser.add_argument('--compress', choices=COMPRESSION_METHODS, help='Compress the output with the given method.')
+    parser.add_argument('--compress-threads', type=_positive_int, metavar='N',
+                        help='The number of threads used to compress the output with gzip or zstd.')
+    parser.add_argument('--rate', type=_parse_rate,
+                        help='Write the data at the given rate, in rows per second such as "1000" or "1000rows/s", '
+                             'or in bytes per second such as "500B/s", "64kB/s" or "5MB/s".')
+    parser.add_argument('--burst', type=_positive_float, metavar='N',
+                        help='The number of rows or bytes that can be written at once at the start or after a pause.')
+    parser.add_argument('--ramp-up', type=_non_negative_float, metavar='SECONDS',
+                        help='Increase the rate linearly from zero up to --rate in the given number of seconds.')
+    parser.add_argument('--skip', '--offset', type=_non_negative_int, metavar='N',
+                        help='Do not write the first N rows. With "-r feanor.counter_random" they are not generated.')
+    parser.add_argument('--checkpoint', metavar='FILE',
+                        help='Save the progress of the generation into FILE, so that it can be resumed with --resume.')
+    parser.add_argument('--checkpoint-interval', type=_non_negative_float, metavar='SECONDS',
+                        help='The minimum number of seconds between two checkpoints.')
+    parser.add_argument('--resume', action='store_const', const=True,
+                        help='Continue the generation from the --checkpoint, if it exists, appending to the output.')
+    parser.add_argument('--unique', action='append', type=_parse_columns, metavar='NAMES',
+                        help='Generate again the rows whose values of the comma-separated columns were already '
+                             'generated. Can be given many times, for different keys.')
+    parser.add_argument('--unique-memory-limit', type=_positive_int, metavar='N',
+                        help='The number of values of each unique key kept in memory, the others are kept on disk.')
     size_options = parser.add_mutually_exclusive_group(required=True)
     size_options.add_argument('-n', '--num-rows', type=int, help='The number of rows of the produced CSV', metavar='N')
     size_options.add_argument('-b', '--num-bytes', type=int, help='The approximate number of bytes of the produced CSV',
                               metavar='N')
     size_options.add_argument('--stream-mode')
+    parser.add_argument('--exact-size', action='store_const', const=True,
+                        help='Produce exactly the number of bytes given with --num-bytes, trimming the last row.')
 
     common_parser = argparse.ArgumentParser(add_help=False)
-    common_parser.add_argument('output_file', nargs='?', help='The output file name.', metavar='OUTPUT-FILE',
-                               default=sys.stdout, type=argparse.FileType('w'))
+    common_parser.add_argument('output_file', nargs='?', metavar='OUTPUT-FILE',
+                               help='The output file name, or a sink such as tcp://host:port, unix:///path/to/socket '
+                                    'or fifo:///path/to/fifo.',
+                               default=None)
 
     schema_subparsers = parser.add_subparsers(title='Schema definition', help='Commands to define a CSV schema.',
                                               dest='schema_definition_type', metavar='{expr,cmdline}')
@@ -137,7 +233,7 @@ def make_schema_let_expression(definitions, col_names):
     return 'let {} in ({})'.format(definitions, '.'.join('@' + name for name in col_names))
 
 
-def get_library(library_name, global_configuration, definitions, random_funcs):
+def get_library(library_name, global_configuration, definitions, random_funcs, backend=None):
     try:
         library_module = load_python_module(library_name)
     except SystemExit as e:
@@ -150,8 +246,9 @@ def get_library(library_name, global_configuration, definitions, random_funcs):
         print(f'Fatal error while importing library {repr(library_name)}:\n{cls_name(e)}: {e}', file=sys.stderr)
         sys.exit(1)
     else:
+        library_options = {'backend': backend} if backend is not None else {}
         try:
-            return library_module.create_library(global_configuration, definitions, random_funcs)
+            return library_module.create_library(global_configuration, definitions, random_funcs, **library_options)
         except Exception as e:
             print(f'Exception while initializing library {repr(library_name)}:\n{cls_name(e)}: {e}', file=sys.stderr)
             sys.exit(1)
@@ -166,6 +263,64 @@ def _parse_columns(columns):
     return next(reader, None)
 
 
+def _open_output_file(value, *, resume=False):
+    """Open the output file or sink `value`, or return the standard output if it is `None`.
+
+    When resuming, an existing output file is opened without truncating it.
+    """
+    if value is None:
+        return getattr(sys.stdout, 'buffer', sys.stdout)
+    if is_sink_uri(value):
+        try:
+            return open_sink(value)
+        except (ValueError, OSError) as e:
+            raise argparse.ArgumentTypeError('cannot open {!r}: {}'.format(value, e))
+    if resume and value != '-' and os.path.exists(value):
+        return argparse.FileType('r+b')(value)
+    return argparse.FileType('wb')(value)
+
+
+def _positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError('{!r} is not a positive integer'.format(value))
+    return number
+
+
+def _non_negative_int(value):
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError('{!r} is not a non-negative integer'.format(value))
+    return number
+
+
+def _positive_float(value):
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError('{!r} is not a positive number'.format(value))
+    return number
+
+
+def _non_negative_float(value):
+    number = float(value)
+    if not number >= 0:
+        raise argparse.ArgumentTypeError('{!r} is not a non-negative number'.format(value))
+    return number
+
+
+_BYTE_MULTIPLIERS = {'B': 1, 'kB': 10 ** 3, 'MB': 10 ** 6, 'GB': 10 ** 9}
+
+
+def _parse_rate(value):
+    match = re.fullmatch(r'\s*(?P<number>\d+(?:\.\d*)?)\s*(?P<unit>rows|[kMG]?B)?(?:/s)?\s*', value)
+    if not match or not float(match.group('number')) > 0:
+        raise argparse.ArgumentTypeError('{!r} is not a valid rate'.format(value))
+    number, unit = float(match.group('number')), match.group('unit') or 'rows'
+    if unit == 'rows':
+        return number, 'rows'
+    return number * _BYTE_MULTIPLIERS[unit], 'bytes'
+
+
 def _parse_global_configuration(configuration):
     value = ast.literal_eval(configuration)
     if not isinstance(value, dict):
@@ -0,0 +1,168 @@
+# Copyright 2018 Giacomo Alzetta <giacomo.alzetta+feanor@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from types import SimpleNamespace
+
+from .schema import Schema, SchemaError, IdentityTransformer, ProjectionTransformer
+from .util import overloaded, to_string_list
+
+__all__ = ['optimize', 'OptimizationReport']
+
+
+class OptimizationReport:
+    """The number of producers and transformers of a schema before and after the optimization."""
+
+    def __init__(self, original, optimized):
+        self.producers_before = len(original.producers)
+        self.transformers_before = len(original.transformers)
+        self.producers_after = len(optimized.producers)
+        self.transformers_after = len(optimized.transformers)
+        self.aliases = len(optimized.aliases)
+
+    def __str__(self):
+        return 'Optimized schema: {} producers, {} transformers -> {} producers, {} transformers, {} aliases.'.format(
+            self.producers_before, self.transformers_before, self.producers_after, self.transformers_after,
+            self.aliases,
+        )
+
+
+def optimize(schema):
+    """Return a schema that generates the same data as `schema` and the report of the optimization.
+
+    The optimization:
+
+     - replaces the identity and projection transformers with aliases of their inputs,
+     - removes the producers and transformers that no column depends on,
+     - orders the remaining transformers topologically.
+
+    Note that removing producers changes the random values generated by the other ones.
+
+        >>> schema = Schema()
+        >>> schema.add_producer('a', type='int')
+        >>> schema.add_producer('unused', type='int')
+        >>> schema.add_transformer('rename', transformer=IdentityTransformer(1), inputs=['a'], outputs=['b'])
+        >>> schema.add_column('B')
+        >>> schema.add_transformer('column', transformer=IdentityTransformer(1), inputs=['b'], outputs=['B'])
+        >>> optimized, report = optimize(schema)
+        >>> [producer.name for producer in optimized.producers], optimized.transformers, optimized.aliases
+        (['a'], (), {'B': 'a'})
+        >>> print(report)
+        Optimized schema: 2 producers, 2 transformers -> 1 producers, 0 transformers, 1 aliases.
+
+    Schemas that define the same name more than once with different values are returned unchanged.
+
+    """
+    fused = _fuse_renames(schema)
+    if fused is None:
+        return schema, OptimizationReport(schema, schema)
+    aliases, transformers = fused
+
+    needed = {_resolve(aliases, column) for column in schema.columns}
+    live_transformers = []
+    for transformer in reversed(transformers):
+        if needed.intersection(transformer.outputs):
+            live_transformers.append(transformer)
+            needed.update(transformer.inputs)
+    live_transformers.reverse()
+
+    optimized = Schema(show_header=schema.show_header)
+    for producer in schema.producers:
+        if producer.name in needed:
+            optimized.add_producer(producer.name, type=producer.type, config=producer.config)
+    for transformer in _topological_sort(live_transformers):
+        optimized.add_transformer(
+            transformer.name, transformer=transformer.transformer, inputs=transformer.inputs,
+            outputs=transformer.outputs,
+        )
+    for column in schema.columns:
+        optimized.add_column(column)
+        if _resolve(aliases, column) != column:
+            optimized.add_alias(column, _resolve(aliases, column))
+
+    return optimized, OptimizationReport(schema, optimized)
+
+
+@overloaded
+def _renamed_inputs(transformer, inputs):
+    """The inputs whose values are the outputs of `transformer`, or `None` if it computes new values."""
+    return None
+
+
+@_renamed_inputs.register(IdentityTransformer)
+def _(transformer, inputs):
+    return inputs
+
+
+@_renamed_inputs.register(ProjectionTransformer)
+def _(transformer, inputs):
+    return [inputs[transformer.index]]
+
+
+def _fuse_renames(schema):
+    """Return the aliases defined by the renames of `schema` and the other transformers, using the aliased names.
+
+    Return `None` if a name is defined more than once with different values.
+    """
+    aliases = schema.aliases
+    defined_names = {producer.name for producer in schema.producers} | aliases.keys()
+
+    transformers = []
+    for transformer in schema.transformers:
+        inputs = [_resolve(aliases, name) for name in transformer.inputs]
+        renamed_inputs = _renamed_inputs(transformer.transformer, inputs)
+        if renamed_inputs is not None:
+            for output, target in zip(transformer.outputs, renamed_inputs):
+                if output in defined_names and _resolve(aliases, output) != target:
+                    return None
+                if output != target:
+                    aliases[output] = target
+        elif defined_names.intersection(transformer.outputs):
+            return None
+        else:
+            transformers.append(SimpleNamespace(
+                name=transformer.name, transformer=transformer.transformer, inputs=inputs,
+                outputs=transformer.outputs,
+            ))
+        defined_names.update(transformer.outputs)
+    return aliases, transformers
+
+
+def _resolve(aliases, name):
+    while name in aliases:
+        name = aliases[name]
+    return name
+
+
+def _topological_sort(transformers):
+    """Sort the transformers so that each one comes after the transformers that define its inputs.
+
+    Each time the first transformer whose inputs are all defined is taken, hence transformers that are
+    already sorted keep their order.
+    """
+    defined_by = {output: i for i, transformer in enumerate(transformers) for output in transformer.outputs}
+    dependencies = [
+        {defined_by[name] for name in transformer.inputs if name in defined_by} for transformer in transformers
+    ]
+    sorted_indices = []
+    done = set()
+    pending = list(range(len(transformers)))
+    while pending:
+        ready = next((i for i in pending if dependencies[i] <= done), None)
+        if ready is None:
+            names = [transformers[i].name for i in pending]
+            raise SchemaError('The transformers {} depend on each other.'.format(to_string_list(names)))
+        sorted_indices.append(ready)
+        done.add(ready)
+        pending.remove(ready)
+    return [transformers[i] for i in sorted_indices]
@@ -40,6 +40,11 @@ class Producer(metaclass=ABCMeta):
     def config(self):
         return self._config
 
+    @property
+    def is_constant(self):
+        """Whether the producer always produces the same value."""
+        return False
+
     @classmethod
     def default_config(cls):
         return {}
@@ -52,6 +57,42 @@ class Producer(metaclass=ABCMeta):
     def __call__(self):
         raise NotImplementedError
 
+    def produce_batch(self, n):
+        """Return a list of `n` values.
+
+        The default implementation simply calls the producer `n` times. Subclasses should override
+        it when they can produce many values more efficiently than one at a time.
+
+        """
+        return [self() for _ in range(n)]
+
+    def reseed(self):
+        """Called after the random functions have been re-seeded.
+
+        Producers that keep their own random state should re-initialize it using the random functions.
+
+        """
+
+    def seek(self, row):
+        """Called when the next value produced will be used for the `row`-th row of the data.
+
+        This happens, for example, when the data is split in shards that are generated independently.
+        Producers whose values depend on the position of the row should update their state.
+
+        """
+
+    def get_state(self):
+        """Return the state of the producer that is not kept by the random functions, or `None` if it has none.
+
+        The state is saved in the checkpoints of the generation and it is restored with `set_state` when the
+        generation is resumed, hence it must be picklable.
+
+        """
+        return None
+
+    def set_state(self, state):
+        """Restore the `state` returned by `get_state`."""
+
 
 class Config(SimpleNamespace):
     def __getattr__(self, item):
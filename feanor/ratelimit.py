@@ -0,0 +1,173 @@
+# Copyright 2018 Giacomo Alzetta <giacomo.alzetta+feanor@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+import time
+from functools import partial
+
+from .writer import WriteBarrier
+
+__all__ = ['RATE_UNITS', 'MIN_SLEEP', 'RateLimiter', 'RateReport']
+
+RATE_UNITS = ('rows', 'bytes')
+# the shortest sleep of the rate limiter: the lines generated in this time are written all at once.
+MIN_SLEEP = 0.01
+
+
+class RateLimiter:
+    """A token bucket that limits the lines to `rate` rows or bytes per second.
+
+    The bucket holds at most `burst` tokens, one tenth of a second of data by default, and each line takes
+    one token, or one per byte of the encoded line when the `unit` is `'bytes'`. The bucket always holds at least the tokens
+    added in twice `MIN_SLEEP` seconds, otherwise the time spent generating the lines after each sleep would
+    prevent reaching the rate. During the first `ramp_up` seconds the rate
+    grows linearly from zero to `rate`.
+
+    The limiter never sleeps for less than `MIN_SLEEP` seconds, so at high rates it sleeps once per batch of
+    lines instead of once per line. The lines generated between two sleeps are joined into a single chunk.
+    The time is measured with `clock` and the limiter waits with `sleep`, by default `time.monotonic` and
+    `time.sleep`.
+
+        >>> now = [0.0]
+        >>> limiter = RateLimiter(2, burst=1, clock=lambda: now[0], sleep=lambda s: now.__setitem__(0, now[0] + s))
+        >>> list(limiter.throttle(['a\\n', 'b\\n', 'c\\n'], max_chunk_size=100))
+        ['a\\n', 'b\\n', 'c\\n']
+        >>> print(limiter.report)
+        Rate: 3.0 rows/s achieved, target 2.0 rows/s.
+
+    """
+
+    def __init__(self, rate, *, unit='rows', burst=None, ramp_up=0.0, clock=None, sleep=None):
+        if rate <= 0:
+            raise ValueError('The rate must be positive. Got {} instead.'.format(rate))
+        if unit not in RATE_UNITS:
+            raise ValueError('Invalid rate unit {!r}. Available units are: {}.'.format(unit, ', '.join(RATE_UNITS)))
+        if burst is None:
+            burst = max(1.0, rate / 10)
+        if burst <= 0:
+            raise ValueError('The burst must be positive. Got {} instead.'.format(burst))
+        if ramp_up < 0:
+            raise ValueError('The ramp up cannot be negative. Got {} instead.'.format(ramp_up))
+        self._rate = rate
+        self._unit = unit
+        self._burst = max(burst, 2 * rate * MIN_SLEEP)
+        self._ramp_up = ramp_up
+        self._clock = clock if clock is not None else time.monotonic
+        self._sleep = sleep if sleep is not None else time.sleep
+        self._consumed = 0
+        self._start = self._end = None
+
+    @property
+    def rate(self):
+        return self._rate
+
+    @property
+    def unit(self):
+        return self._unit
+
+    @property
+    def report(self):
+        """The rate achieved by the last call to `throttle`, up to now if it did not end, and the target rate."""
+        if self._start is None:
+            return RateReport(self._rate, 0.0, self._unit)
+        elapsed = (self._end if self._end is not None else self._clock()) - self._start
+        achieved = self._consumed / elapsed if elapsed > 0 else float('inf')
+        return RateReport(self._rate, achieved, self._unit)
+
+    def throttle(self, lines, *, max_chunk_size, encoding='utf-8'):
+        """Yield the `lines` at the target rate, joined in chunks of at most about `max_chunk_size` characters.
+
+        With the `'bytes'` unit the size of the lines is the one of the lines encoded with `encoding`. The
+        `WriteBarrier`s among the lines are yielded as they are, after the chunk of the lines before them.
+        """
+        count_bytes = self._unit == 'bytes'
+        line_size = partial(_encoded_size, encoding=encoding, ascii_compatible='a'.encode(encoding) == b'a')
+        start = last = self._start = self._clock()
+        self._end = None
+        tokens = self._burst if self._ramp_up == 0 else 0.0
+        self._consumed = 0
+        chunk = []
+        size = 0
+        for line in lines:
+            if line.__class__ is WriteBarrier:
+                if chunk:
+                    yield ''.join(chunk)
+                    chunk = []
+                    size = 0
+                yield line
+                continue
+            line_cost = line_size(line) if count_bytes else 1
+            cost = min(line_cost, self._burst)
+            while tokens < cost:
+                now = self._clock()
+                tokens = min(self._burst, tokens + self._allowance(now - start) - self._allowance(last - start))
+                last = now
+                if tokens < cost:
+                    if chunk:
+                        yield ''.join(chunk)
+                        chunk = []
+                        size = 0
+                    self._sleep(self._waiting_time(cost - tokens, now - start))
+            tokens -= cost
+            self._consumed += line_cost
+            chunk.append(line)
+            size += len(line)
+            if size >= max_chunk_size:
+                yield ''.join(chunk)
+                chunk = []
+                size = 0
+        if chunk:
+            yield ''.join(chunk)
+        self._end = self._clock()
+
+    def _allowance(self, elapsed):
+        """The number of tokens added to the bucket in the first `elapsed` seconds."""
+        if elapsed < self._ramp_up:
+            return self._rate * elapsed * elapsed / (2 * self._ramp_up)
+        return self._rate * (elapsed - self._ramp_up / 2)
+
+    def _waiting_time(self, missing_tokens, elapsed):
+        """The time after `elapsed` seconds until `missing_tokens` more tokens are added to the bucket."""
+        allowance = self._allowance(elapsed) + missing_tokens
+        if allowance < self._rate * self._ramp_up / 2:
+            time_reached = math.sqrt(2 * self._ramp_up * allowance / self._rate)
+        else:
+            time_reached = allowance / self._rate + self._ramp_up / 2
+        return max(MIN_SLEEP, time_reached - elapsed)
+
+
+def _encoded_size(line, encoding, ascii_compatible):
+    """The number of bytes of `line` encoded with `encoding`.
+
+        >>> _encoded_size('a€\\n', 'utf-8', True)
+        5
+
+    """
+    if ascii_compatible and line.isascii():
+        return len(line)
+    return len(line.encode(encoding))
+
+
+class RateReport:
+    """The rate at which the data was written compared to the target rate."""
+
+    def __init__(self, target, achieved, unit):
+        self.target = target
+        self.achieved = achieved
+        self.unit = unit
+
+    def __str__(self):
+        return 'Rate: {:.1f} {unit}/s achieved, target {:.1f} {unit}/s.'.format(
+            self.achieved, self.target, unit=self.unit,
+        )
@@ -14,9 +14,11 @@
 
 import inspect
 import random
+from operator import add
 from abc import ABCMeta, abstractmethod
+from bisect import bisect_left
 from collections import Counter
-from itertools import chain
+from itertools import accumulate, chain
 from types import SimpleNamespace
 
 from .util import to_string_list
@@ -32,6 +34,7 @@ class Schema:
         self._columns = []
         self._producers = {}
         self._transformers = []
+        self._aliases = {}
 
     def __eq__(self, other):
         return isinstance(other, Schema) and self.__dict__ == other.__dict__
@@ -65,6 +68,11 @@ class Schema:
         Note: the order of the returned list is undefined."""
         return tuple(SimpleNamespace(**transformer) for transformer in self._transformers)
 
+    @property
+    def aliases(self):
+        """The names defined as aliases of other names, mapped to the name they refer to."""
+        return dict(self._aliases)
+
     @property
     def show_header(self):
         return self._show_header
@@ -117,12 +125,7 @@ class Schema:
         if len(outputs) != transformer.num_outputs:
             msg = 'Got {} outputs: {} but transformer\'s number of outputs is {.num_outputs}.'
             raise SchemaError(msg.format(len(outputs), to_string_list(outputs), transformer))
-        defined_names = (
-                self._producers.keys()
-                | set(self._columns)
-                | set(chain.from_iterable(trans['outputs'] for trans in self._transformers))
-        )
-        undefined_inputs = set(inputs) - defined_names
+        undefined_inputs = set(inputs) - self._defined_names()
         if undefined_inputs:
             raise SchemaError("Inputs: {} are not defined in the schema.".format(to_string_list(undefined_inputs)))
 
@@ -139,6 +142,43 @@ class Schema:
             'outputs': outputs,
         })
 
+    def remove_transformer(self, name):
+        """Remove the transformer called `name` from the schema.
+
+        :raises SchemaError: when there is no such transformer or its outputs are still used.
+
+        """
+        try:
+            index = next(i for i, trans in enumerate(self._transformers) if trans['name'] == name)
+        except StopIteration:
+            raise SchemaError('Transformer {!r} is not defined.'.format(name)) from None
+        used_names = set(chain.from_iterable(trans['inputs'] for trans in self._transformers))
+        used_outputs = set(self._transformers[index]['outputs']) & (
+            used_names | set(self._columns) | set(self._aliases.values())
+        )
+        if used_outputs:
+            msg = 'Cannot remove transformer {!r}: outputs {} are still used.'
+            raise SchemaError(msg.format(name, to_string_list(used_outputs)))
+        del self._transformers[index]
+
+    def add_alias(self, name, target):
+        """Make `name` refer to the same value as `target`.
+
+        :raises SchemaError: when `name` is already a value of the schema or `target` is not.
+
+        """
+        if name in self._aliases or name in self._producers or name in self._transformer_outputs():
+            raise SchemaError('Name {!r} is already defined.'.format(name))
+        if target not in self._defined_names():
+            raise SchemaError('Name {!r} is not defined in the schema.'.format(target))
+        self._aliases[name] = target
+
+    def _transformer_outputs(self):
+        return set(chain.from_iterable(trans['outputs'] for trans in self._transformers))
+
+    def _defined_names(self):
+        return self._producers.keys() | set(self._columns) | self._transformer_outputs() | self._aliases.keys()
+
 
 class Transformer(metaclass=ABCMeta):
     def __init__(self, arity, num_outputs):
@@ -158,12 +198,28 @@ class Transformer(metaclass=ABCMeta):
         if len(inputs) != self._arity:
             raise ValueError('This transformer requires {} inputs. Got {} instead.'.format(self._arity, len(inputs)))
 
+    def transform_batch(self, columns):
+        """Apply the transformer to whole columns of values.
+
+        `columns` contains a sequence of values for each input and the result contains a list of values
+        for each output. The default implementation applies the transformer row by row.
+
+        """
+        rows = [self(inputs) for inputs in zip(*columns)]
+        if not rows:
+            return [[] for _ in range(self._num_outputs)]
+        return [list(values) for values in zip(*rows)]
+
 
 class FunctionalTransformer(Transformer):
     def __init__(self, callable, *, num_outputs=1):
         super().__init__(len(inspect.signature(callable).parameters), num_outputs)
         self._callable = callable
 
+    @property
+    def function(self):
+        return self._callable
+
     def __call__(self, inputs):
         super().__call__(inputs)
         result = self._callable(*inputs)
@@ -171,6 +227,11 @@ class FunctionalTransformer(Transformer):
             return (result,)
         return result
 
+    def transform_batch(self, columns):
+        if self.num_outputs == 1:
+            return [list(map(self._callable, *columns))]
+        return super().transform_batch(columns)
+
     def __eq__(self, other):
         return isinstance(other, FunctionalTransformer) and self.__dict__ == other.__dict__
 
@@ -183,10 +244,17 @@ class ProjectionTransformer(Transformer):
         super().__init__(arity, 1)
         self._index = index
 
+    @property
+    def index(self):
+        return self._index
+
     def __call__(self, inputs):
         super().__call__(inputs)
         return (inputs[self._index],)
 
+    def transform_batch(self, columns):
+        return [columns[self._index]]
+
     def __eq__(self, other):
         return isinstance(other, ProjectionTransformer) and self.__dict__ == other.__dict__
 
@@ -194,31 +262,62 @@ class ProjectionTransformer(Transformer):
         return hash(tuple(sorted(self.__dict__.items())))
 
 
+# how much the chances of a choice can add up to more than one.
+_CHANCES_TOLERANCE = 1e-9
+
+
 class ChoiceTransformer(Transformer):
-    def __init__(self, arity, left_config, right_config):
-        super().__init__(arity, arity // 2)
-        self._left_config = left_config
-        self._right_config = right_config
-        if not isinstance(self._left_config, (int, float)) or not (0 <= self._left_config <= 1):
-            raise TypeError('Invalid configuration for choice operator: {!r}'.format(self._left_config))
-        if not isinstance(self._right_config, (int, float)) or not (0 <= self._right_config <= 1):
-            raise TypeError('Invalid configuration for choice operator: {!r}'.format(self._right_config))
-        if self._left_config + self._right_config > 1:
-            raise ValueError(
-                'Invalid configuration for choice operator: {!r} {!r}'.format(self._left_config, self._right_config))
-        self._right_config += self._left_config
+    """Choose one of its branches at random and return its values.
+
+    The inputs are split in as many branches as `chances`, each one with the same number of inputs, and the
+    `i`-th branch is chosen with probability `chances[i]`. When the chances add up to less than one the
+    outputs are `None` with the remaining probability. A choice of more than two branches is drawn with a
+    single random number.
+
+    """
+
+    def __init__(self, arity, *chances):
+        if not chances:
+            raise TypeError('The choice operator needs the chances of its branches.')
+        if arity % len(chances) != 0:
+            raise ValueError('Cannot split {} inputs in {} branches.'.format(arity, len(chances)))
+        super().__init__(arity, arity // len(chances))
+        for chance in chances:
+            if not isinstance(chance, (int, float)) or not (0 <= chance <= 1):
+                raise TypeError('Invalid configuration for choice operator: {!r}'.format(chance))
+        # the chances of the flattened choices are products of chances, hence they can add up to a little more
+        # than one because of rounding errors.
+        if sum(chances) > 1 + _CHANCES_TOLERANCE:
+            raise ValueError('Invalid configuration for choice operator: {}'.format(' '.join(map(repr, chances))))
+        self._chances = tuple(chances)
+        self._thresholds = tuple(accumulate(chances))
+
+    @property
+    def chances(self):
+        """The probabilities of the branches."""
+        return self._chances
+
+    @property
+    def thresholds(self):
+        """The cumulative chances: the `i`-th branch is chosen when `thresholds[i - 1] < random() <= thresholds[i]`,
+        otherwise the outputs are `None`.
+        """
+        return self._thresholds
 
     def __call__(self, inputs):
         super().__call__(inputs)
-        left_inputs = inputs[:self.num_outputs]
-        right_inputs = inputs[self.num_outputs:]
-        value = random.random()
-        if value <= self._left_config:
-            return left_inputs
-        elif value <= self._right_config:
-            return right_inputs
-        else:
+        branch = bisect_left(self._thresholds, random.random())
+        if branch == len(self._thresholds):
             return (None,) * self.num_outputs
+        return inputs[branch * self.num_outputs:(branch + 1) * self.num_outputs]
+
+    def transform_batch(self, columns):
+        thresholds, num_branches = self._thresholds, len(self._thresholds)
+        branches = [bisect_left(thresholds, random.random()) for _ in range(len(columns[0]))]
+        return [
+            [alternatives[branch][row] if branch < num_branches else None for row, branch in enumerate(branches)]
+            for alternatives in (columns[index::self.num_outputs] for index in range(self.num_outputs))
+        ]
 
     def __eq__(self, other):
         return isinstance(other, ChoiceTransformer) and self.__dict__ == other.__dict__
@@ -237,6 +336,10 @@ class MergeTransformer(Transformer):
         right_inputs = inputs[self.num_outputs:]
         return tuple(x + y for x, y in zip(left_inputs, right_inputs))
 
+    def transform_batch(self, columns):
+        left_columns, right_columns = columns[:self.num_outputs], columns[self.num_outputs:]
+        return [list(map(add, left, right)) for left, right in zip(left_columns, right_columns)]
+
     def __eq__(self, other):
         return isinstance(other, MergeTransformer) and self.__dict__ == other.__dict__
 
@@ -252,6 +355,9 @@ class IdentityTransformer(Transformer):
         super().__call__(inputs)
         return tuple(inputs)
 
+    def transform_batch(self, columns):
+        return list(columns)
+
     def __eq__(self, other):
         return isinstance(other, IdentityTransformer) and self.__dict__ == other.__dict__
 
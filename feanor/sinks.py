@@ -0,0 +1,207 @@
+# Copyright 2018 Giacomo Alzetta <giacomo.alzetta+feanor@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import socket
+import stat
+import time
+from abc import abstractmethod
+from urllib.parse import urlsplit
+
+__all__ = [
+    'SINK_SCHEMES', 'DEFAULT_RETRIES', 'DEFAULT_RETRY_DELAY', 'Sink', 'SocketSink', 'FifoSink', 'SinkReport',
+    'is_sink_uri', 'open_sink',
+]
+
+SINK_SCHEMES = ('tcp', 'unix', 'fifo')
+DEFAULT_RETRIES = 5
+DEFAULT_RETRY_DELAY = 0.5
+
+
+def is_sink_uri(value):
+    """Whether `value` is the URI of a sink instead of the name of a file."""
+    return urlsplit(value).scheme in SINK_SCHEMES and '://' in value
+
+
+def open_sink(uri, *, retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY):
+    """Open the sink identified by `uri`, which is one of:
+
+     - `tcp://host:port`: a TCP connection to the given address,
+     - `unix:///path/to/socket`: a connection to a UNIX stream socket,
+     - `fifo:///path/to/fifo`: a named pipe, which is created if it does not exist.
+
+    :raises ValueError: when the `uri` is not valid.
+
+    """
+    parts = urlsplit(uri)
+    if parts.scheme == 'tcp':
+        if not parts.hostname or parts.port is None:
+            raise ValueError('Invalid TCP sink {!r}: expected tcp://host:port.'.format(uri))
+        return SocketSink(uri, socket.AF_INET6 if ':' in parts.hostname else socket.AF_INET,
+                          (parts.hostname, parts.port), retries=retries, retry_delay=retry_delay)
+    elif parts.scheme == 'unix':
+        if not parts.path:
+            raise ValueError('Invalid UNIX socket sink {!r}: expected unix:///path.'.format(uri))
+        return SocketSink(uri, socket.AF_UNIX, parts.path, retries=retries, retry_delay=retry_delay)
+    elif parts.scheme == 'fifo':
+        if not parts.path:
+            raise ValueError('Invalid named pipe sink {!r}: expected fifo:///path.'.format(uri))
+        return FifoSink(uri, parts.path, retries=retries, retry_delay=retry_delay)
+    raise ValueError('Invalid sink {!r}. The available schemes are: {}.'.format(uri, ', '.join(SINK_SCHEMES)))
+
+
+class Sink(io.RawIOBase):
+    """A binary output that reconnects when writing fails.
+
+    Each call to `write` sends the whole data. When sending fails the sink reconnects, waiting `retry_delay`
+    seconds before the first attempt and doubling the delay after each failed attempt, and it sends the rest of
+    the data, the part that was not accepted by the previous connection. Hence no data is sent twice, but the
+    new connection can start in the middle of a line, and the data accepted by the previous connection that its
+    reader did not receive is lost. After `retries` failed attempts, or when sending fails again right after
+    reconnecting, the error is raised.
+
+    """
+
+    def __init__(self, uri, *, retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY):
+        self._uri = uri
+        self._retries = retries
+        self._retry_delay = retry_delay
+        self._reconnections = 0
+        self._connect_with_retries()
+
+    @property
+    def uri(self):
+        return self._uri
+
+    @property
+    def report(self):
+        return SinkReport(self._uri, self._reconnections)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        view = memoryview(data).cast('B')
+        reconnected = False
+        while view:
+            try:
+                sent = self._send(view)
+            except OSError:
+                if reconnected:
+                    raise
+                self._disconnect()
+                self._connect_with_retries(after_failure=True)
+                self._reconnections += 1
+                reconnected = True
+                continue
+            reconnected = False
+            view = view[sent:]
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._disconnect()
+        super().close()
+
+    def _connect_with_retries(self, *, after_failure=False):
+        delay = self._retry_delay
+        for attempt in range(self._retries + 1):
+            if after_failure or attempt > 0:
+                time.sleep(delay)
+                delay *= 2
+            try:
+                self._connect()
+                return
+            except OSError:
+                if attempt == self._retries:
+                    raise
+
+    @abstractmethod
+    def _connect(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _disconnect(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _send(self, data):
+        """Send some of the `data` and return the number of bytes sent."""
+        raise NotImplementedError
+
+
+class SocketSink(Sink):
+    """A sink that sends the data through a stream socket of the given `family` connected to `address`."""
+
+    def __init__(self, uri, family, address, **kwargs):
+        self._family = family
+        self._address = address
+        self._socket = None
+        super().__init__(uri, **kwargs)
+
+    def _connect(self):
+        sock = socket.socket(self._family, socket.SOCK_STREAM)
+        try:
+            sock.connect(self._address)
+        except OSError:
+            sock.close()
+            raise
+        self._socket = sock
+
+    def _disconnect(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def _send(self, data):
+        return self._socket.send(data)
+
+
+class FifoSink(Sink):
+    """A sink that writes the data into the named pipe at `path`.
+
+    Opening the pipe waits for a reader, hence when the reader goes away the sink waits for the next one.
+    """
+
+    def __init__(self, uri, path, **kwargs):
+        self._path = path
+        self._fd = None
+        if not os.path.exists(path):
+            os.mkfifo(path)
+        elif not stat.S_ISFIFO(os.stat(path).st_mode):
+            raise ValueError('{!r} is not a named pipe.'.format(path))
+        super().__init__(uri, **kwargs)
+
+    def _connect(self):
+        self._fd = os.open(self._path, os.O_WRONLY)
+
+    def _disconnect(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _send(self, data):
+        return os.write(self._fd, data)
+
+
+class SinkReport:
+    """The number of times a sink had to reconnect."""
+
+    def __init__(self, uri, reconnections):
+        self.uri = uri
+        self.reconnections = reconnections
+
+    def __str__(self):
+        return 'Sink {}: {} reconnections.'.format(self.uri, self.reconnections)
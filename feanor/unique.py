@@ -0,0 +1,255 @@
+# Copyright 2018 Giacomo Alzetta <giacomo.alzetta+feanor@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sqlite3
+from hashlib import blake2b
+from itertools import repeat
+
+__all__ = [
+    'DEFAULT_MEMORY_LIMIT', 'DEFAULT_MAX_ATTEMPTS', 'UniqueKeyError', 'UniqueKeys', 'UniqueKeysReport',
+    'FingerprintStore', 'fingerprint',
+]
+
+DEFAULT_MEMORY_LIMIT = 1_000_000
+DEFAULT_MAX_ATTEMPTS = 100
+
+
+class UniqueKeyError(ValueError):
+    """Raised when no row with new keys could be generated, because the key space is (almost) exhausted."""
+
+
+class UniqueKeys:
+    """The constraint that the values of each key, a sequence of column names, are unique in the data.
+
+    The rows whose keys were already generated are discarded and generated again, up to `max_attempts` times.
+    The keys already generated are remembered as fingerprints in a `FingerprintStore` for each key, which keeps at
+    most `memory_limit` of them in memory. The number of discarded rows is given by the `report`.
+
+    Since the fingerprints have 64 bits, two different keys can have the same fingerprint: in that case a valid
+    row is discarded, but a repeated key is never written. With a billion keys this happens a few times.
+
+    """
+
+    def __init__(self, keys, *, memory_limit=DEFAULT_MEMORY_LIMIT, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self._keys = [tuple(key) for key in keys]
+        if not self._keys or not all(self._keys):
+            raise ValueError('The unique keys must contain at least one column. Got {!r} instead.'.format(keys))
+        if max_attempts <= 0:
+            raise ValueError('The maximum number of attempts must be positive. Got {} instead.'.format(max_attempts))
+        self._max_attempts = max_attempts
+        self._stores = [FingerprintStore(memory_limit) for _ in self._keys]
+        self._rows = 0
+        self._collisions = 0
+
+    @property
+    def keys(self):
+        return self._keys
+
+    @property
+    def report(self):
+        spilled = sum(store.spilled for store in self._stores)
+        return UniqueKeysReport(self._rows, self._collisions, spilled)
+
+    def row_function(self, row_function, columns, constants=None):
+        """Return `row_function` generating rows again until their keys are new.
+
+        The rows contain the values of the `columns`, while the `constants` map the names of the columns that are
+        not in the rows to their value.
+
+        """
+        accept, max_attempts = self._make_checker(columns, constants), self._max_attempts
+
+        def unique_row_function():
+            for _ in repeat(None, max_attempts):
+                row = row_function()
+                if accept(row):
+                    return row
+            raise self._exhausted()
+
+        return unique_row_function
+
+    def batch_function(self, batch_function, columns, constants=None):
+        """Return `batch_function` generating again the rows of the batches whose keys are not new.
+
+        The `batch_function` takes a number of rows and returns the list of the `columns` of a batch, while the
+        `constants` map the names of the columns that are not in the batches to their value. The discarded rows
+        are replaced by those of a batch with as many rows.
+
+        """
+        accept, max_attempts = self._make_checker(columns, constants), self._max_attempts
+
+        def unique_batch_function(number_of_rows):
+            batch = batch_function(number_of_rows)
+            rows = _transpose(batch, number_of_rows)
+            rejected = [index for index, row in enumerate(rows) if not accept(row)]
+            if not rejected:
+                return batch
+            for _ in repeat(None, max_attempts - 1):
+                new_rows = _transpose(batch_function(len(rejected)), len(rejected))
+                still_rejected = []
+                for index, row in zip(rejected, new_rows):
+                    rows[index] = row
+                    if not accept(row):
+                        still_rejected.append(index)
+                rejected = still_rejected
+                if not rejected:
+                    return [list(column) for column in zip(*rows)]
+            raise self._exhausted()
+
+        return unique_batch_function
+
+    def close(self):
+        for store in self._stores:
+            store.close()
+
+    def _make_checker(self, columns, constants):
+        """Return a function that tells whether the keys of a row are new, remembering them when they are."""
+        constants = constants or {}
+        getters = [_make_key_getter(key, columns, constants) for key in self._keys]
+        stores = self._stores
+
+        def accept(row):
+            fingerprints = [fingerprint(get_key(row)) for get_key in getters]
+            if any(value in store for value, store in zip(fingerprints, stores)):
+                self._collisions += 1
+                return False
+            for value, store in zip(fingerprints, stores):
+                store.add(value)
+            self._rows += 1
+            return True
+
+        return accept
+
+    def _exhausted(self):
+        msg = ('Could not generate a row with new unique keys in {} attempts, after {} rows. '
+               'The values of the keys {} are too few.')
+        return UniqueKeyError(msg.format(self._max_attempts, self._rows, ', '.join(map(str, self._keys))))
+
+
+def _make_key_getter(key, columns, constants):
+    """Return a function that takes the values of the `key` from a row of the `columns`.
+
+        >>> get_key = _make_key_getter(('b', 'c'), ['a', 'b'], {'c': 0})
+        >>> get_key((1, 2))
+        (2, 0)
+
+    """
+    sources = []
+    for name in key:
+        if name in constants:
+            sources.append((None, constants[name]))
+        elif name in columns:
+            sources.append((columns.index(name), None))
+        else:
+            raise ValueError('The unique key {} contains the column {!r}, which is not in the schema.'.format(
+                key, name))
+    return lambda row: tuple(value if index is None else row[index] for index, value in sources)
+
+
+def _transpose(columns, number_of_rows):
+    # without columns, the rows are all empty.
+    return list(zip(*columns)) if columns else [()] * number_of_rows
+
+
+def fingerprint(values):
+    """Return the 64 bits fingerprint of the string representations of the `values`, as a signed integer.
+
+        >>> fingerprint((1, 'a')) == fingerprint(('1', 'a'))
+        True
+        >>> fingerprint(('a,b',)) == fingerprint(('a', 'b'))
+        False
+
+    """
+    text = repr(tuple(map(str, values))).encode('utf-8', 'surrogatepass')
+    return int.from_bytes(blake2b(text, digest_size=8).digest(), 'little', signed=True)
+
+
+class FingerprintStore:
+    """A set of 64 bits fingerprints which keeps at most `memory_limit` of them in memory.
+
+    When the fingerprints in memory reach the limit, they are moved in a temporary SQLite database on disk, which
+    is looked up for each fingerprint that is not in memory.
+
+    """
+
+    def __init__(self, memory_limit=DEFAULT_MEMORY_LIMIT):
+        if memory_limit <= 0:
+            raise ValueError('The memory limit must be positive. Got {} instead.'.format(memory_limit))
+        self._memory_limit = memory_limit
+        self._fingerprints = set()
+        self._database = None
+        self._spilled = 0
+
+    @property
+    def spilled(self):
+        """The number of fingerprints moved to disk."""
+        return self._spilled
+
+    def __len__(self):
+        return len(self._fingerprints) + self._spilled
+
+    def __contains__(self, value):
+        if value in self._fingerprints:
+            return True
+        if self._database is None:
+            return False
+        cursor = self._database.execute('SELECT 1 FROM fingerprints WHERE value = ?', (value,))
+        return cursor.fetchone() is not None
+
+    def add(self, value):
+        self._fingerprints.add(value)
+        if len(self._fingerprints) >= self._memory_limit:
+            self._spill()
+
+    def close(self):
+        if self._database is not None:
+            self._database.close()
+            self._database = None
+
+    def _spill(self):
+        if self._database is None:
+            # an empty name opens a temporary database on disk, which is deleted when it is closed.
+            self._database = sqlite3.connect('')
+            self._database.execute('PRAGMA journal_mode = OFF')
+            self._database.execute('PRAGMA synchronous = OFF')
+            self._database.execute('CREATE TABLE fingerprints (value INTEGER PRIMARY KEY)')
+        with self._database:
+            # the fingerprints are inserted in order, which is faster for the index.
+            self._database.executemany('INSERT INTO fingerprints VALUES (?)',
+                                       ((value,) for value in sorted(self._fingerprints)))
+        self._spilled += len(self._fingerprints)
+        self._fingerprints.clear()
+
+
+class UniqueKeysReport:
+    """The number of `rows` with new unique keys and of the `collisions`, the rows discarded since their keys
+    were not new, together with the number of fingerprints `spilled` to disk.
+
+    """
+
+    def __init__(self, rows, collisions, spilled):
+        self.rows = rows
+        self.collisions = collisions
+        self.spilled = spilled
+
+    @property
+    def retry_rate(self):
+        """The fraction of the rows generated that were discarded."""
+        generated = self.rows + self.collisions
+        return self.collisions / generated if generated else 0.0
+
+    def __str__(self):
+        return 'Unique keys: {} collisions in {} rows generated, {:.2%} retried, {} fingerprints on disk.'.format(
+            self.collisions, self.rows + self.collisions, self.retry_rate, self.spilled,
+        )
@@ -0,0 +1,237 @@
+# Copyright 2018 Giacomo Alzetta <giacomo.alzetta+feanor@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import queue
+import threading
+from time import perf_counter
+
+__all__ = [
+    'DEFAULT_WRITE_BUFFER', 'DEFAULT_QUEUE_SIZE', 'ChunkWriter', 'ThreadedChunkWriter', 'OutputStageReport',
+    'WriteBarrier', 'make_chunks', 'make_writer',
+]
+
+DEFAULT_WRITE_BUFFER = 1 << 20
+DEFAULT_QUEUE_SIZE = 8
+
+
+def make_writer(output_file, *, buffer_size=DEFAULT_WRITE_BUFFER, queue_size=DEFAULT_QUEUE_SIZE, binary=None,
+                rate_limiter=None):
+    """Return the writer for `output_file`, which uses a separate thread unless `queue_size` is zero."""
+    options = {'buffer_size': buffer_size, 'binary': binary, 'rate_limiter': rate_limiter}
+    if queue_size == 0:
+        return ChunkWriter(output_file, **options)
+    return ThreadedChunkWriter(output_file, queue_size=queue_size, **options)
+
+
+class WriteBarrier:
+    """An item of the lines that is not written: `callback` is called once the lines before it have been written.
+
+    The output file is flushed before calling `callback`.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+
+def make_chunks(lines, buffer_size):
+    """Join consecutive lines into chunks of at least `buffer_size` characters.
+
+    Only the last chunk can be smaller than `buffer_size`, or the one before a `WriteBarrier`:
+
+        >>> list(make_chunks(['ab\\n', 'c\\n', 'd\\n'], 4))
+        ['ab\\nc\\n', 'd\\n']
+
+    """
+    chunk = []
+    size = 0
+    for line in lines:
+        if line.__class__ is WriteBarrier:
+            if chunk:
+                yield ''.join(chunk)
+                chunk = []
+                size = 0
+            yield line
+            continue
+        chunk.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+class ChunkWriter:
+    """Write lines into `output_file` with one call to `write` per chunk of `buffer_size` characters.
+
+    Binary files receive each chunk encoded with `encoding`, any other file receives the text. Whether
+    `output_file` is binary is detected from its type unless `binary` is given.
+
+    The lines can contain `WriteBarrier`s, whose callback is called by the thread that writes the data.
+
+    With a `rate_limiter` the lines are written at its rate (see `feanor.ratelimit`) and the output file is
+    flushed after each chunk, so that the data reaches the reader when it is meant to.
+    """
+
+    def __init__(self, output_file, *, buffer_size=DEFAULT_WRITE_BUFFER, encoding='utf-8', binary=None,
+                 rate_limiter=None):
+        if buffer_size < 0:
+            raise ValueError('The size of the write buffer cannot be negative. Got {} instead.'.format(buffer_size))
+        self._output_file = output_file
+        self._buffer_size = buffer_size
+        self._encoding = encoding
+        if binary is None:
+            binary = isinstance(output_file, (io.BufferedIOBase, io.RawIOBase))
+        self._binary = binary
+        self._rate_limiter = rate_limiter
+
+    @property
+    def buffer_size(self):
+        return self._buffer_size
+
+    @property
+    def binary(self):
+        return self._binary
+
+    @property
+    def encoding(self):
+        return self._encoding
+
+    def write_lines(self, lines):
+        for chunk in self._make_chunks(lines):
+            if chunk.__class__ is WriteBarrier:
+                self._pass_barrier(chunk)
+                continue
+            self.write_chunk(chunk)
+            if self._rate_limiter is not None:
+                self.flush()
+        self.flush()
+
+    def _pass_barrier(self, barrier):
+        self.flush()
+        barrier.callback()
+
+    def _make_chunks(self, lines):
+        if self._rate_limiter is not None:
+            return self._rate_limiter.throttle(lines, max_chunk_size=self._buffer_size, encoding=self._encoding)
+        return make_chunks(lines, self._buffer_size)
+
+    def write_chunk(self, chunk):
+        if self._binary:
+            self._output_file.write(chunk.encode(self._encoding))
+        else:
+            self._output_file.write(chunk)
+
+    @property
+    def report(self):
+        """The report about the writing of the data, or `None` if there is nothing to report."""
+        return None
+
+    def flush(self):
+        flush = getattr(self._output_file, 'flush', None)
+        if flush is not None:
+            flush()
+
+
+class ThreadedChunkWriter(ChunkWriter):
+    """A `ChunkWriter` that writes the chunks in a dedicated thread.
+
+    The chunks are passed to the thread through a queue of at most `queue_size` chunks, so the lines can be
+    generated while the previous chunks are being written. Writing into a file releases the GIL, hence this
+    gives back most of the time spent waiting on slow outputs.
+
+    The time that each side spent waiting for the other one is available in the `report`.
+
+    """
+
+    _END = object()
+
+    def __init__(self, output_file, *, buffer_size=DEFAULT_WRITE_BUFFER, encoding='utf-8', binary=None,
+                 rate_limiter=None, queue_size=DEFAULT_QUEUE_SIZE):
+        if queue_size <= 0:
+            raise ValueError('The size of the queue must be positive. Got {} instead.'.format(queue_size))
+        super().__init__(output_file, buffer_size=buffer_size, encoding=encoding, binary=binary,
+                         rate_limiter=rate_limiter)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._generator_blocked_time = 0.0
+        self._writer_blocked_time = 0.0
+
+    @property
+    def report(self):
+        return OutputStageReport(self._generator_blocked_time, self._writer_blocked_time)
+
+    def write_lines(self, lines):
+        thread = threading.Thread(target=self._write_chunks, name='feanor-writer', daemon=True)
+        thread.start()
+        try:
+            for chunk in self._make_chunks(lines):
+                if self._error is not None:
+                    break
+                self._put(chunk)
+        finally:
+            self._put(self._END)
+            thread.join()
+        if self._error is not None:
+            raise self._error
+        self.flush()
+
+    def _put(self, chunk):
+        try:
+            self._queue.put_nowait(chunk)
+        except queue.Full:
+            start = perf_counter()
+            self._queue.put(chunk)
+            self._generator_blocked_time += perf_counter() - start
+
+    def _get(self):
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            start = perf_counter()
+            chunk = self._queue.get()
+            self._writer_blocked_time += perf_counter() - start
+            return chunk
+
+    def _write_chunks(self):
+        while True:
+            chunk = self._get()
+            if chunk is self._END:
+                return
+            if self._error is None:
+                try:
+                    if chunk.__class__ is WriteBarrier:
+                        self._pass_barrier(chunk)
+                        continue
+                    self.write_chunk(chunk)
+                    if self._rate_limiter is not None:
+                        self.flush()
+                except BaseException as e:
+                    # the remaining chunks are discarded, so that the generating thread never blocks.
+                    self._error = e
+
+
+class OutputStageReport:
+    """The time spent by the generating thread and by the writer thread waiting for each other."""
+
+    def __init__(self, generator_blocked_time, writer_blocked_time):
+        self.generator_blocked_time = generator_blocked_time
+        self.writer_blocked_time = writer_blocked_time
+
+    def __str__(self):
+        return 'Output stage: generation blocked for {:.3f}s, writer blocked for {:.3f}s.'.format(
+            self.generator_blocked_time, self.writer_blocked_time,
+        )
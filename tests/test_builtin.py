@@ -1,12 +1,15 @@
+import math
 import random
 import time
 import unittest
 from calendar import timegm
+from collections import Counter
 from datetime import datetime, timezone
 from itertools import cycle, islice
+from unittest import mock
 
 from feanor.builtin import *
-from feanor.builtin import fmt_function
+from feanor.builtin import fmt_function, numpy, _DateFormatter
 from feanor.producer import Config
 
 
@@ -48,6 +51,11 @@ class TestIntProducer(unittest.TestCase):
         got.add(producer())
         self.assertEqual(set(range(11)), got)
 
+    def test_batch_generates_same_values_as_single_calls(self):
+        producer = IntProducer(random_funcs=self.rand, config={'min': 5, 'max': 100})
+        expected = [self.rand_copy.randint(5, 100) for _ in range(50)]
+        self.assertEqual(expected, producer.produce_batch(50))
+
 
 class TestFloatProducer(unittest.TestCase):
     def setUp(self):
@@ -82,18 +90,47 @@ class TestFloatProducer(unittest.TestCase):
         with self.assertRaises(ValueError):
             FloatProducer(random_funcs=self.rand, config={'distribution': 'invalid'})
 
+    def test_batch_generates_same_values_as_single_calls(self):
+        producer = FloatProducer(random_funcs=self.rand, config={'distribution': 'gauss'})
+        producer_copy = FloatProducer(random_funcs=random.Random(0), config={'distribution': 'gauss'})
+        self.assertEqual([producer_copy() for _ in range(50)], producer.produce_batch(50))
+
 
 class TestFixedProducer(unittest.TestCase):
     def test_always_returns_same_value(self):
         producer = FixedProducer(random.Random(0), config={'value': 5})
         self.assertEqual([5] * 10, [producer() for _ in range(10)])
 
+    def test_batch_returns_same_value(self):
+        producer = FixedProducer(random.Random(0), config={'value': 5})
+        self.assertEqual([5] * 10, producer.produce_batch(10))
+
 
 class TestCyclingProducer(unittest.TestCase):
     def test_always_returns_same_value(self):
         producer = CyclingProducer(random.Random(0), config={'values': range(5)})
         self.assertEqual(list(islice(cycle(range(5)), 20)), [producer() for _ in range(20)])
 
+    def test_batch_continues_the_cycle(self):
+        producer = CyclingProducer(random.Random(0), config={'values': range(5)})
+        self.assertEqual(0, producer())
+        self.assertEqual([1, 2, 3, 4, 0, 1, 2], producer.produce_batch(7))
+        self.assertEqual(3, producer())
+
+    def test_seek_moves_to_the_value_of_the_row(self):
+        producer = CyclingProducer(random.Random(0), config={'values': range(5)})
+        producer.seek(13)
+        self.assertEqual([3, 4, 0], [producer() for _ in range(3)])
+
+    def test_state_can_be_restored(self):
+        producer = CyclingProducer(random.Random(0), config={'values': range(5)})
+        producer()
+        producer.produce_batch(5)
+        state = producer.get_state()
+        other = CyclingProducer(random.Random(0), config={'values': range(5)})
+        other.set_state(state)
+        self.assertEqual([producer() for _ in range(7)], [other() for _ in range(7)])
+
 
 class TestRepeaterProducer(unittest.TestCase):
     def test_can_repeat_value(self):
@@ -101,6 +138,186 @@ class TestRepeaterProducer(unittest.TestCase):
         producer = RepeaterProducer(random.Random(0), orig_producer, {'num_repeats': 3})
         self.assertEqual([0, 0, 0, 1, 1, 1, 2, 2, 2], [producer() for _ in range(9)])
 
+    def test_seek_moves_the_wrapped_producer(self):
+        orig_producer = CyclingProducer(random.Random(0), {'values': range(3)})
+        producer = RepeaterProducer(random.Random(0), orig_producer, {'num_repeats': 3})
+        producer.seek(6)
+        self.assertEqual([2, 2, 2, 0], [producer() for _ in range(4)])
+
+    def test_state_can_be_restored(self):
+        producer = RepeaterProducer(random.Random(0), CyclingProducer(random.Random(0), {'values': range(3)}),
+                                    {'num_repeats': 3})
+        [producer() for _ in range(4)]
+        state = producer.get_state()
+        other = RepeaterProducer(random.Random(0), CyclingProducer(random.Random(0), {'values': range(3)}),
+                                 {'num_repeats': 3})
+        other.set_state(state)
+        self.assertEqual([1, 1, 2, 2, 2], [other() for _ in range(5)])
+
+
+class TestCategoricalProducer(unittest.TestCase):
+    def setUp(self):
+        self.rand = random.Random(0)
+        self.rand_copy = random.Random(0)
+
+    def test_values_are_drawn_with_the_given_weights(self):
+        producer = CategoricalProducer(self.rand, {'values': ['A', 'B', 'C'], 'weights': [70, 20, 10]})
+        counts = Counter(producer() for _ in range(100_000))
+        for value, probability in [('A', 0.7), ('B', 0.2), ('C', 0.1)]:
+            self.assertAlmostEqual(probability, counts[value] / 100_000, delta=0.01)
+
+    def test_values_are_equally_likely_without_weights(self):
+        producer = CategoricalProducer(self.rand, {'values': range(4)})
+        counts = Counter(producer.produce_batch(100_000))
+        self.assertEqual({0, 1, 2, 3}, set(counts))
+        self.assertTrue(all(abs(count / 100_000 - 0.25) < 0.01 for count in counts.values()))
+
+    def test_never_draws_values_with_zero_weight(self):
+        producer = CategoricalProducer(self.rand, {'values': ['a', 'b', 'c'], 'weights': [0, 3, 0.5]})
+        self.assertEqual({'b', 'c'}, set(producer.produce_batch(10_000)))
+
+    def test_can_draw_from_many_values(self):
+        weights = [self.rand.random() for _ in range(5000)]
+        producer = CategoricalProducer(self.rand, {'values': range(5000), 'weights': weights})
+        counts = Counter(producer.produce_batch(200_000))
+        top = max(range(5000), key=weights.__getitem__)
+        self.assertAlmostEqual(weights[top] / sum(weights), counts[top] / 200_000, delta=0.0005)
+
+    def test_batch_generates_same_values_as_single_calls(self):
+        config = {'values': ['x', 'y', 'z'], 'weights': [1, 2, 3]}
+        producer = CategoricalProducer(self.rand, config)
+        producer_copy = CategoricalProducer(self.rand_copy, config)
+        self.assertEqual([producer_copy() for _ in range(50)], producer.produce_batch(50))
+
+    def test_raises_error_if_weights_are_invalid(self):
+        for config in ({'values': []}, {'values': [1, 2], 'weights': [1]}, {'values': [1, 2], 'weights': [0, 0]},
+                       {'values': [1, 2], 'weights': [1, -1]}, {'values': [1], 'weights': [math.nan]}):
+            with self.subTest(config=config), self.assertRaises(ValueError):
+                CategoricalProducer(self.rand, config)
+
+    def test_is_available_in_the_library(self):
+        library = BuiltInLibrary({}, self.rand)
+        producer = library.make_producer('categorical', {'values': ['a'], 'weights': [1]})
+        self.assertIsInstance(producer, CategoricalProducer)
+        self.assertEqual('a', producer())
+
+
+class TestPowerLawProducer(unittest.TestCase):
+    def setUp(self):
+        self.rand = random.Random(0)
+        self.rand_copy = random.Random(0)
+
+    def assertFollowsPowerLaw(self, producer, n, s, q, draws=200_000):
+        counts = Counter(producer.produce_batch(draws))
+        total = sum((rank + q) ** -s for rank in range(1, n + 1))
+        for rank in range(1, 6):
+            self.assertAlmostEqual((rank + q) ** -s / total, counts[rank] / draws, delta=0.005)
+
+    def test_ranks_follow_the_power_law(self):
+        producer = PowerLawProducer(self.rand, {'n': 1000, 's': 1.5, 'q': 2.5})
+        self.assertFollowsPowerLaw(producer, 1000, 1.5, 2.5)
+
+    def test_ranks_follow_the_power_law_without_a_table(self):
+        n = 200_000
+        producer = PowerLawProducer(self.rand, {'n': n, 's': 0.8, 'q': 1})
+        self.assertIsNone(producer._cum_weights)
+        self.assertFollowsPowerLaw(producer, n, 0.8, 1)
+
+    def test_can_draw_from_a_billion_ranks(self):
+        producer = ZipfProducer(self.rand, {'n': 10 ** 9})
+        ranks = producer.produce_batch(10_000)
+        self.assertTrue(all(1 <= rank <= 10 ** 9 for rank in ranks))
+        self.assertGreater(max(ranks), 10 ** 6)
+        self.assertAlmostEqual(1 / (math.log(10 ** 9) + 0.5772), ranks.count(1) / 10_000, delta=0.01)
+
+    def test_maps_the_ranks_to_the_values(self):
+        producer = ZipfProducer(self.rand, {'values': ['hot', 'warm', 'cold'], 's': 2})
+        counts = Counter(producer.produce_batch(100_000))
+        self.assertEqual({'hot', 'warm', 'cold'}, set(counts))
+        self.assertAlmostEqual(36 / 49, counts['hot'] / 100_000, delta=0.01)
+
+    def test_batch_generates_same_values_as_single_calls(self):
+        for n in (100, 100_000):
+            with self.subTest(n=n):
+                producer = ZipfProducer(self.rand, {'n': n})
+                producer_copy = ZipfProducer(self.rand_copy, {'n': n})
+                self.assertEqual([producer_copy() for _ in range(50)], producer.produce_batch(50))
+
+    def test_zipf_ignores_the_offset(self):
+        producer = ZipfProducer(self.rand, {'n': 10, 'q': 100})
+        self.assertEqual(0, producer.config.q)
+
+    def test_raises_error_if_config_is_invalid(self):
+        for config in ({'s': 1}, {'n': 0, 's': 1}, {'n': 2.5, 's': 1}, {'n': 2, 'values': [1], 's': 1},
+                       {'n': 2, 's': -1}, {'n': 2, 's': math.inf}, {'n': 2, 's': 1, 'q': -0.5}, {'n': 2}):
+            with self.subTest(config=config), self.assertRaises(ValueError):
+                PowerLawProducer(self.rand, config)
+
+    def test_is_available_in_the_library(self):
+        library = BuiltInLibrary({}, self.rand)
+        self.assertIsInstance(library.make_producer('zipf', {'n': 10}), ZipfProducer)
+        self.assertIsInstance(library.make_producer('powerlaw', {'n': 10, 's': 2}), PowerLawProducer)
+
+
+class TestUniqueIntProducer(unittest.TestCase):
+    def setUp(self):
+        self.rand = random.Random(0)
+        self.rand_copy = random.Random(0)
+
+    def test_produces_every_integer_of_the_range_once(self):
+        producer = UniqueIntProducer(self.rand, {'min': -50, 'max': 1000})
+        values = producer.produce_batch(1051)
+        self.assertEqual(list(range(-50, 1001)), sorted(values))
+        self.assertNotEqual(sorted(values), values)
+
+    def test_values_are_unique_in_huge_ranges(self):
+        producer = UniqueIntProducer(self.rand, {'min': 1, 'max': 10 ** 12})
+        values = [producer() for _ in range(10_000)]
+        self.assertEqual(10_000, len(set(values)))
+        self.assertTrue(all(1 <= value <= 10 ** 12 for value in values))
+
+    def test_is_reproducible(self):
+        producer = UniqueIntProducer(self.rand, {'max': 10 ** 9})
+        producer_copy = UniqueIntProducer(self.rand_copy, {'max': 10 ** 9})
+        self.assertEqual([producer_copy() for _ in range(50)], producer.produce_batch(50))
+
+    def test_shards_produce_disjoint_parts_of_the_same_permutation(self):
+        producer = UniqueIntProducer(self.rand, {'max': 999})
+        expected = producer.produce_batch(1000)
+        shard = UniqueIntProducer(self.rand_copy, {'max': 999})
+        shard.reseed()
+        shard.seek(600)
+        self.assertEqual(expected[600:700], shard.produce_batch(100))
+
+    def test_can_restore_the_state(self):
+        producer = UniqueIntProducer(self.rand, {'max': 999})
+        producer.produce_batch(10)
+        state = producer.get_state()
+        expected = producer.produce_batch(10)
+        other = UniqueIntProducer(random.Random(1), {'max': 999})
+        other.set_state(state)
+        self.assertEqual(expected, other.produce_batch(10))
+
+    def test_raises_error_when_out_of_values(self):
+        producer = UniqueIntProducer(self.rand, {'min': 1, 'max': 3})
+        producer.produce_batch(2)
+        with self.assertRaises(ValueError):
+            producer.produce_batch(2)
+        self.assertIn(producer(), {1, 2, 3})
+        with self.assertRaises(ValueError):
+            producer()
+
+    def test_raises_error_if_config_is_invalid(self):
+        for config in ({'min': 10, 'max': 9}, {'min': 0.5, 'max': 9}, {'min': 0, 'max': 2 ** 64}):
+            with self.subTest(config=config), self.assertRaises(ValueError):
+                UniqueIntProducer(self.rand, config)
+
+    def test_is_available_in_the_library(self):
+        library = BuiltInLibrary({}, self.rand)
+        producer = library.make_producer('unique_int', {'min': 5, 'max': 5})
+        self.assertIsInstance(producer, UniqueIntProducer)
+        self.assertEqual(5, producer())
+
 
 class TestStringProducer(unittest.TestCase):
     def setUp(self):
@@ -133,6 +350,47 @@ class TestStringProducer(unittest.TestCase):
         got = {len(producer()) for _ in range(20)}
         self.assertEqual(set(range(1, 6)), got)
 
+    def test_batch_is_reproducible(self):
+        producer = StringProducer(random_funcs=self.rand, config={'min_len': 1, 'max_len': 5, 'characters': 'ab'})
+        producer_copy = StringProducer(random_funcs=self.rand_copy,
+                                       config={'min_len': 1, 'max_len': 5, 'characters': 'ab'})
+        self.assertEqual(producer_copy.produce_batch(30), producer.produce_batch(30))
+
+    def test_batch_contains_strings_of_the_selected_characters_and_lengths(self):
+        producer = StringProducer(random_funcs=self.rand, config={'min_len': 1, 'max_len': 5, 'characters': 'abc'})
+        values = producer.produce_batch(300)
+        self.assertEqual(300, len(values))
+        self.assertEqual(set(range(1, 6)), set(map(len, values)))
+        self.assertEqual({'a', 'b', 'c'}, set(''.join(values)))
+
+    def test_batch_of_fixed_length_strings(self):
+        producer = StringProducer(random_funcs=self.rand, config={'len': 7})
+        self.assertTrue(all(len(value) == 7 for value in producer.produce_batch(100)))
+        self.assertEqual([''] * 3, StringProducer(random_funcs=self.rand, config={'len': 0}).produce_batch(3))
+        self.assertEqual([], producer.produce_batch(0))
+
+    def test_batch_can_contain_any_character(self):
+        characters = 'αβγ,"' + ''.join(map(chr, range(0x4e00, 0x4f00)))
+        for config in ({'len': 10, 'characters': 'αβγ'}, {'len': 10, 'characters': characters}):
+            with self.subTest(characters=len(config['characters'])):
+                values = StringProducer(random_funcs=self.rand, config=config).produce_batch(1000)
+                self.assertEqual(set(config['characters']), set(''.join(values)))
+
+    def test_batch_respects_the_weights(self):
+        for weights in ([3, 1], [0.75, 0.25], [750, 250]):
+            with self.subTest(weights=weights):
+                producer = StringProducer(random_funcs=self.rand,
+                                          config={'len': 100, 'characters': 'ab', 'weights': weights})
+                text = ''.join(producer.produce_batch(1000))
+                self.assertAlmostEqual(0.75, text.count('a') / len(text), delta=0.01)
+        producer = StringProducer(random_funcs=self.rand, config={'len': 10, 'characters': 'ab', 'weights': [1, 0]})
+        self.assertEqual(['a' * 10] * 10, producer.produce_batch(10))
+
+    def test_batch_falls_back_to_single_values_without_weights(self):
+        producer = StringProducer(random_funcs=self.rand, config={'len': 10, 'characters': 'ab', 'weights': [0, 0]})
+        with self.assertRaises(ValueError):
+            producer.produce_batch(10)
+
 
 class TestAlphaProducer(unittest.TestCase):
     def setUp(self):
@@ -256,10 +514,184 @@ class TestDateProducer(unittest.TestCase):
 
 
 
+    def test_batch_generates_same_values_as_single_calls(self):
+        config = {'min_ts': self.start_ts, 'max_ts': self.end_ts}
+        producer = DateProducer(random_funcs=self.rand, config=config)
+        producer_copy = DateProducer(random_funcs=self.rand_copy, config=config)
+        self.assertEqual([producer_copy() for _ in range(30)], producer.produce_batch(30))
+
+    def test_batch_generates_same_values_as_single_calls_with_slice(self):
+        config = {'min_year': 2018, 'max_year': 2018, 'mode': 'slice'}
+        producer = DateProducer(random_funcs=self.rand, config=config)
+        producer_copy = DateProducer(random_funcs=self.rand_copy, config=config)
+        self.assertEqual([producer_copy() for _ in range(30)], producer.produce_batch(30))
+
     def test_raises_error_if_mode_is_invalid(self):
         with self.assertRaises(ValueError):
             DateProducer(random_funcs=self.rand, config={'mode': 'invalid'})
 
+    def test_can_format_the_dates(self):
+        for date_format, strftime_format in [('iso', '%Y-%m-%dT%H:%M:%S'), ('iso_date', '%Y-%m-%d'),
+                                             ('%d/%m/%Y %H.%M', '%d/%m/%Y %H.%M'), ('%I:%M %p', '%I:%M %p')]:
+            for mode in ('interval', 'slice'):
+                with self.subTest(format=date_format, mode=mode):
+                    config = {'min_ts': self.start_ts, 'max_ts': self.end_ts, 'mode': mode}
+                    producer = DateProducer(random_funcs=random.Random(0), config=dict(config, format=date_format))
+                    producer_copy = DateProducer(random_funcs=random.Random(0), config=config)
+                    expected = [producer_copy().strftime(strftime_format) for _ in range(100)]
+                    self.assertEqual(expected, [producer() for _ in range(100)])
+
+    def test_batch_of_formatted_dates_generates_same_values_as_single_calls(self):
+        config = {'min_ts': self.start_ts, 'max_ts': self.end_ts, 'format': 'iso'}
+        producer = DateProducer(random_funcs=self.rand, config=config)
+        producer_copy = DateProducer(random_funcs=self.rand_copy, config=config)
+        self.assertEqual([producer_copy() for _ in range(30)], producer.produce_batch(30))
+
+    def test_raises_error_if_format_needs_quoting(self):
+        for date_format in ('%d,%m', '"%Y"', '%Y\n'):
+            with self.subTest(format=date_format), self.assertRaises(ValueError):
+                DateProducer(random_funcs=self.rand, config={'format': date_format})
+
+
+class TestDateFormatter(unittest.TestCase):
+    def test_renders_timestamps_as_strftime(self):
+        rand = random.Random(0)
+        timestamps = [rand.randint(-62135596800, 253402300799) for _ in range(1000)] + [-1, 0, 86399, 86400]
+        for date_format in ('%Y-%m-%dT%H:%M:%S', '%S%M%H {%j} 100%%', '%Y%m%d', '%H%H %a', '%c'):
+            with self.subTest(format=date_format):
+                formatter = _DateFormatter(date_format)
+                expected = [datetime.fromtimestamp(ts, timezone.utc).strftime(date_format) for ts in timestamps]
+                self.assertEqual(expected, formatter.format_timestamps(timestamps))
+
+    def test_keeps_a_bounded_number_of_days(self):
+        formatter = _DateFormatter('%Y-%m-%d %H')
+        formatter._max_cached_days = 10
+        self.assertEqual(['1970-01-01 00', '1970-01-31 01'], formatter.format_timestamps([0, 30 * 86400 + 3600]))
+        formatter.format_timestamps(range(0, 100 * 86400, 86400))
+        self.assertLessEqual(len(formatter._templates), 10)
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not available')
+class TestNumpyBackend(unittest.TestCase):
+    def setUp(self):
+        self.rand = random.Random(0)
+
+    def test_int_batch_respects_bounds(self):
+        producer = NumpyIntProducer(random_funcs=self.rand, config={'min': 3, 'max': 7})
+        self.assertEqual({3, 4, 5, 6, 7}, set(producer.produce_batch(1000)))
+
+    def test_state_can_be_restored(self):
+        producer = NumpyIntProducer(random_funcs=self.rand)
+        producer.produce_batch(10)
+        state = producer.get_state()
+        values = producer.produce_batch(10)
+        other = NumpyIntProducer(random_funcs=random.Random(1))
+        other.set_state(state)
+        self.assertEqual(values, other.produce_batch(10))
+
+    def test_int_batch_is_reproducible(self):
+        producer = NumpyIntProducer(random_funcs=self.rand)
+        other_producer = NumpyIntProducer(random_funcs=random.Random(0))
+        self.assertEqual(producer.produce_batch(100), other_producer.produce_batch(100))
+
+    def test_int_and_float_batches_contain_python_values(self):
+        self.assertEqual({int}, set(map(type, NumpyIntProducer(random_funcs=self.rand).produce_batch(10))))
+        self.assertEqual({float}, set(map(type, NumpyFloatProducer(random_funcs=self.rand).produce_batch(10))))
+
+    def test_int_batch_falls_back_to_python_for_huge_bounds(self):
+        producer = NumpyIntProducer(random_funcs=self.rand, config={'min': 0, 'max': 2 ** 100})
+        got = producer.produce_batch(10)
+        self.assertIsInstance(got, list)
+        self.assertTrue(all(0 <= value <= 2 ** 100 for value in got))
+
+    def test_int_single_values_use_python_producer(self):
+        producer = NumpyIntProducer(random_funcs=self.rand)
+        self.assertIsInstance(producer(), int)
+
+    def test_float_batch_supports_all_distributions(self):
+        configs = {
+            'random': {},
+            'uniform': {'min': 5, 'max': 10},
+            'betavariate': {'alpha': 2.0, 'beta': 3.0},
+            'expovariate': {'lambda': 2.0},
+            'gammavariate': {'alpha': 2.0, 'beta': 3.0},
+            'gauss': {},
+            'lognormvariate': {},
+            'normalvariate': {},
+            'vonmisesvariate': {},
+            'paretovariate': {'alpha': 3.0},
+            'weibullvariate': {'alpha': 2.0, 'beta': 3.0},
+        }
+        for distribution, config in configs.items():
+            producer = NumpyFloatProducer(random_funcs=self.rand, config=dict(config, distribution=distribution))
+            got = producer.produce_batch(100)
+            self.assertEqual(100, len(got), distribution)
+        uniform = NumpyFloatProducer(self.rand, {'distribution': 'uniform', 'min': 5, 'max': 10})
+        self.assertTrue(all(5 <= value <= 10 for value in uniform.produce_batch(100)))
+        von_mises = NumpyFloatProducer(self.rand, {'distribution': 'vonmisesvariate'})
+        self.assertTrue(all(0 <= value < 2 * math.pi for value in von_mises.produce_batch(100)))
+        pareto = NumpyFloatProducer(self.rand, {'distribution': 'paretovariate', 'alpha': 3.0})
+        self.assertTrue(all(value >= 1 for value in pareto.produce_batch(100)))
+
+    def test_string_batch_respects_lengths_and_characters(self):
+        producer = NumpyStringProducer(random_funcs=self.rand, config={'min_len': 1, 'max_len': 5, 'characters': 'ab'})
+        got = producer.produce_batch(200)
+        self.assertEqual(set(range(1, 6)), {len(value) for value in got})
+        self.assertEqual({'a', 'b'}, set(''.join(got)))
+
+    def test_string_batch_respects_weights(self):
+        producer = NumpyStringProducer(random_funcs=self.rand, config={'characters': 'ab', 'weights': [1, 0]})
+        self.assertEqual({'a' * 10}, set(producer.produce_batch(20)))
+
+    def test_alpha_and_alnum_batches(self):
+        self.assertTrue(all(value.isalpha() for value in NumpyAlphaProducer(self.rand).produce_batch(50)))
+        self.assertTrue(all(value.isalnum() for value in NumpyAlphaNumericProducer(self.rand).produce_batch(50)))
+
+    def test_date_batch_generates_aware_datetimes_in_range(self):
+        producer = NumpyDateProducer(random_funcs=self.rand, config={'min_year': 2018, 'max_year': 2018})
+        got = producer.produce_batch(100)
+        self.assertTrue(all(isinstance(value, datetime) for value in got))
+        self.assertEqual({2018}, {value.year for value in got})
+        self.assertEqual({timezone.utc}, {value.tzinfo for value in got})
+
+    def test_numpy_date_producer_can_format_the_dates(self):
+        producer = NumpyDateProducer(random_funcs=self.rand, config={'min_year': 2018, 'max_year': 2018,
+                                                                     'format': 'iso_date'})
+        got = producer.produce_batch(100)
+        self.assertTrue(all(isinstance(value, str) and value.startswith('2018-') for value in got))
+
+    def test_reseed_reinitializes_the_generator(self):
+        producer = NumpyIntProducer(random_funcs=self.rand)
+        self.rand.seed(1)
+        producer.reseed()
+        first = producer.produce_batch(10)
+        self.rand.seed(1)
+        producer.reseed()
+        self.assertEqual(first, producer.produce_batch(10))
+
+    def test_library_uses_numpy_producers(self):
+        library = BuiltInLibrary({}, self.rand, backend='numpy')
+        self.assertEqual('numpy', library.backend)
+        self.assertIsInstance(library.make_producer('int', {}), NumpyIntProducer)
+        self.assertIsInstance(library.make_producer('fixed', {'value': 1}), FixedProducer)
+
+
+class TestBackendSelection(unittest.TestCase):
+    def test_library_uses_python_producers_by_default(self):
+        library = BuiltInLibrary({}, random.Random(0))
+        self.assertEqual('python', library.backend)
+        self.assertIs(IntProducer, type(library.make_producer('int', {})))
+
+    def test_raises_error_if_backend_is_invalid(self):
+        with self.assertRaises(ValueError):
+            BuiltInLibrary({}, random.Random(0), backend='invalid')
+
+    def test_falls_back_to_python_backend_if_numpy_is_missing(self):
+        with mock.patch('feanor.builtin.numpy', None), self.assertWarns(UserWarning):
+            library = BuiltInLibrary({}, random.Random(0), backend='numpy')
+        self.assertEqual('python', library.backend)
+        self.assertIs(IntProducer, type(library.make_producer('int', {})))
+
 
 class TestBuiltinFunction(unittest.TestCase):
     def test_can_format_a_value(self):
@@ -278,3 +710,11 @@ class TestCreateLibrary(unittest.TestCase):
         got = library.make_producer('perc', {'min': 10})
         self.assertIsInstance(got, IntProducer)
         self.assertEqual(Config(min=10, max=100), got.config)
+
+    def test_numeric_and_date_types_do_not_need_quoting(self):
+        library = create_library({}, {'perc': {'producer': 'int', 'config': {'max': 100}}}, random)
+        for type_name in ('int', 'float', 'date', 'alpha', 'alnum', 'perc'):
+            with self.subTest(type=type_name):
+                self.assertFalse(library.needs_quoting(type_name))
+        self.assertTrue(library.needs_quoting('string'))
+        self.assertTrue(library.needs_quoting('fixed'))
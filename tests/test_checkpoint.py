@@ -0,0 +1,113 @@
+import io
+import os
+import tempfile
+import unittest
+
+from feanor.checkpoint import Checkpoint, Checkpointer, load_checkpoint, restore_output, save_checkpoint
+from feanor.compression import SegmentedCompressedFile
+
+
+class TestCheckpointFile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'checkpoint')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_can_save_and_load_a_checkpoint(self):
+        checkpoint = Checkpoint(['A', 'B'], rows=10, offset=100, state={'next_row': 10})
+        save_checkpoint(self.path, checkpoint)
+        self.assertEqual(checkpoint, load_checkpoint(self.path, ['A', 'B']))
+        self.assertEqual(['checkpoint'], os.listdir(self.directory.name))
+
+    def test_saving_replaces_the_previous_checkpoint(self):
+        save_checkpoint(self.path, Checkpoint(['A'], rows=10))
+        save_checkpoint(self.path, Checkpoint(['A'], rows=20))
+        self.assertEqual(20, load_checkpoint(self.path, ['A']).rows)
+
+    def test_missing_checkpoint_is_the_start_of_the_generation(self):
+        self.assertEqual(Checkpoint(['A']), load_checkpoint(self.path, ['A']))
+
+    def test_raises_error_if_columns_are_different(self):
+        save_checkpoint(self.path, Checkpoint(['A', 'B']))
+        with self.assertRaises(ValueError):
+            load_checkpoint(self.path, ['A', 'C'])
+
+    def test_raises_error_if_file_is_not_a_checkpoint(self):
+        with open(self.path, 'wb') as checkpoint_file:
+            checkpoint_file.write(b'a,b\n1,2\n')
+        with self.assertRaises(ValueError):
+            load_checkpoint(self.path, ['A'])
+
+
+class TestRestoreOutput(unittest.TestCase):
+    def test_truncates_the_output_at_the_offset(self):
+        with tempfile.TemporaryFile() as output_file:
+            output_file.write(b'a,b\n1,2\n3,')
+            restore_output(output_file, Checkpoint(['a', 'b'], rows=1, offset=8))
+            output_file.write(b'5,6\n')
+            output_file.seek(0)
+            self.assertEqual(b'a,b\n1,2\n5,6\n', output_file.read())
+
+    def test_raises_error_if_the_output_is_shorter_than_the_offset(self):
+        with tempfile.TemporaryFile() as output_file:
+            output_file.write(b'a,b\n')
+            with self.assertRaises(ValueError):
+                restore_output(output_file, Checkpoint(['a', 'b'], rows=1, offset=8))
+            output_file.seek(0)
+            self.assertEqual(b'a,b\n', output_file.read())
+
+    def test_does_nothing_if_the_output_cannot_seek(self):
+        output_file = io.StringIO('a,b\n')
+        restore_output(output_file, Checkpoint(['a', 'b'], rows=1, offset=0))
+        self.assertEqual('a,b\n', output_file.getvalue())
+
+
+class TestCheckpointer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'checkpoint')
+        self.now = 0.0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _make_checkpointer(self, output_file, **kwargs):
+        return Checkpointer(self.path, output_file, ['A'], clock=lambda: self.now, **kwargs)
+
+    def test_is_due_after_the_interval(self):
+        checkpointer = self._make_checkpointer(io.BytesIO(), interval=10)
+        self.assertFalse(checkpointer.is_due())
+        self.now = 10.0
+        self.assertTrue(checkpointer.is_due())
+        checkpointer.barrier(5, None)
+        self.assertFalse(checkpointer.is_due())
+
+    def test_barrier_saves_the_state_at_the_time_it_was_created(self):
+        with tempfile.TemporaryFile() as output_file:
+            checkpointer = self._make_checkpointer(output_file)
+            state = {'next_row': 1}
+            barrier = checkpointer.barrier(1, state)
+            state['next_row'] = 2
+            output_file.write(b'A\n1\n')
+            barrier.callback()
+        self.assertEqual(Checkpoint(['A'], 1, 4, {'next_row': 1}), load_checkpoint(self.path, ['A']))
+
+    def test_offset_is_none_if_the_output_cannot_seek(self):
+        self._make_checkpointer(io.StringIO()).barrier(1, None).callback()
+        self.assertIsNone(load_checkpoint(self.path, ['A']).offset)
+
+    def test_ends_the_compressed_stream_before_saving(self):
+        with tempfile.TemporaryFile() as output_file:
+            compressed = SegmentedCompressedFile(output_file, 'gzip')
+            checkpointer = self._make_checkpointer(output_file, compressed_file=compressed)
+            compressed.write(b'A\n1\n')
+            checkpointer.barrier(1, None).callback()
+            self.assertEqual(output_file.tell(), load_checkpoint(self.path, ['A']).offset)
+            self.assertGreater(output_file.tell(), 0)
+            compressed.close()
+
+    def test_raises_error_if_interval_is_negative(self):
+        with self.assertRaises(ValueError):
+            self._make_checkpointer(io.BytesIO(), interval=-1)
@@ -1,4 +1,6 @@
 import os
+import sys
+import tempfile
 import unittest
 from types import SimpleNamespace
 from unittest.mock import patch
@@ -231,3 +233,102 @@ class TestCommandLine(unittest.TestCase):
         self.assertEqual(expected_transformer_B, schema.transformers[1])
         self.assertEqual(expected_transformer_merge, schema.transformers[2])
         self.assertEqual(expected_transformer_C, schema.transformers[3])
+
+    @patch('sys.exit')
+    def test_can_select_columnar_engine(self, _):
+        _, _, _, size_dict = parse_arguments(
+            ['-n', '5', '--engine', 'columnar', '--batch-size', '100', 'expr', '--columns', 'A', '%int'])
+        self.assertEqual({'number_of_rows': 5, 'engine': 'columnar', 'batch_size': 100}, size_dict)
+
+    @patch('sys.exit')
+    def test_batch_size_must_be_positive(self, mock_sys_exit):
+        try:
+            parse_arguments(['-n', '5', '--batch-size', '0', 'expr', '--columns', 'A', '%int'])
+        except TypeError:
+            # unfortunately argparse relies on sys.exit to "exit" a function, so when it
+            # is mocked the function returns without an issue with None and causes a TypeError.
+            pass
+        mock_sys_exit.assert_called_with(2)
+
+    @patch('sys.exit')
+    def test_can_specify_number_of_jobs(self, _):
+        _, _, _, size_dict = parse_arguments(['-n', '5', '-j', '4', 'expr', '--columns', 'A', '%int'])
+        self.assertEqual({'number_of_rows': 5, 'jobs': 4}, size_dict)
+
+    @patch('sys.exit')
+    def test_can_disable_optimization_and_enable_reports(self, _):
+        _, _, _, size_dict = parse_arguments(['-n', '5', '--no-optimize', '--report', 'expr', '--columns', 'A', '%int'])
+        self.assertEqual({'number_of_rows': 5, 'optimize': False, 'report_file': sys.stderr}, size_dict)
+
+    @patch('sys.exit')
+    def test_can_specify_write_buffer(self, _):
+        _, _, _, size_dict = parse_arguments(['-n', '5', '--write-buffer', '0', 'expr', '--columns', 'A', '%int'])
+        self.assertEqual({'number_of_rows': 5, 'write_buffer': 0}, size_dict)
+
+    @patch('sys.exit')
+    def test_can_specify_queue_size(self, _):
+        _, _, _, size_dict = parse_arguments(['-n', '5', '--queue-size', '0', 'expr', '--columns', 'A', '%int'])
+        self.assertEqual({'number_of_rows': 5, 'queue_size': 0}, size_dict)
+
+    @patch('sys.exit')
+    def test_can_request_exact_size(self, _):
+        _, _, _, size_dict = parse_arguments(['-b', '100', '--exact-size', 'expr', '--columns', 'A', '%int'])
+        self.assertEqual({'byte_count': 100, 'exact_size': True}, size_dict)
+
+    @patch('sys.exit')
+    def test_can_compress_the_output(self, _):
+        args = ['-n', '5', '--compress', 'gzip', '--compress-threads', '4', 'expr', '--columns', 'A', '%int']
+        _, _, _, size_dict = parse_arguments(args)
+        self.assertEqual({'number_of_rows': 5, 'compress': 'gzip', 'compress_threads': 4}, size_dict)
+
+    @patch('sys.exit')
+    def test_can_limit_the_rate(self, _):
+        args = ['--stream-mode', 'x', '--rate', '5MB/s', '--burst', '1e6', '--ramp-up', '2', 'expr', '%int']
+        _, _, _, size_dict = parse_arguments(args)
+        self.assertEqual(
+            {'stream_mode': True, 'rate': 5e6, 'rate_unit': 'bytes', 'burst': 1e6, 'ramp_up': 2.0}, size_dict,
+        )
+
+    @patch('sys.exit')
+    def test_rate_is_in_rows_per_second_by_default(self, _):
+        _, _, _, size_dict = parse_arguments(['-n', '5', '--rate', '100/s', 'expr', '%int'])
+        self.assertEqual({'number_of_rows': 5, 'rate': 100.0, 'rate_unit': 'rows'}, size_dict)
+
+    @patch('sys.exit')
+    def test_can_skip_rows(self, _):
+        _, _, _, size_dict = parse_arguments(['-n', '5', '--skip', '100', 'expr', '%int'])
+        self.assertEqual({'number_of_rows': 5, 'skip': 100}, size_dict)
+        _, _, _, size_dict = parse_arguments(['-n', '5', '--offset', '100', 'expr', '%int'])
+        self.assertEqual({'number_of_rows': 5, 'skip': 100}, size_dict)
+
+    @patch('sys.exit')
+    def test_can_write_into_a_sink(self, _):
+        with patch('feanor.main.open_sink') as open_sink:
+            _, _, output_file, _ = parse_arguments(['-n', '5', 'expr', 'tcp://localhost:9000', '%int'])
+        open_sink.assert_called_once_with('tcp://localhost:9000')
+        self.assertIs(open_sink.return_value, output_file)
+
+    @patch('sys.exit')
+    def test_can_checkpoint_and_resume(self, _):
+        args = ['-n', '5', '--checkpoint', 'progress', '--checkpoint-interval', '10', '--resume', 'expr', '%int']
+        _, _, _, size_dict = parse_arguments(args)
+        self.assertEqual(
+            {'number_of_rows': 5, 'checkpoint': 'progress', 'checkpoint_interval': 10.0, 'resume': True}, size_dict,
+        )
+
+    @patch('sys.exit')
+    def test_resuming_does_not_truncate_the_output(self, _):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'output.csv')
+            with open(path, 'wb') as f:
+                f.write(b'A\n1\n')
+            args = ['-n', '5', '--checkpoint', os.path.join(directory, 'progress'), '--resume', 'expr', path, '%int']
+            _, _, output_file, _ = parse_arguments(args)
+            with output_file:
+                self.assertEqual(b'A\n1\n', output_file.read())
+
+    @patch('sys.exit')
+    def test_can_specify_unique_keys(self, _):
+        args = ['-n', '5', '--unique', 'A', '--unique', 'A,B', '--unique-memory-limit', '100', 'expr', '%int . %int']
+        _, _, _, size_dict = parse_arguments(args)
+        self.assertEqual({'number_of_rows': 5, 'unique': [['A'], ['A', 'B']], 'unique_memory_limit': 100}, size_dict)
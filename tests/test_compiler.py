@@ -740,6 +740,55 @@ class TestCompiler(unittest.TestCase):
         got = self.compiler.compile(BinaryOpNode.of('|', TypeNameNode.of('int'), TypeNameNode.of('int')))
         self.assertEqual(schema, got)
 
+    def test_can_compile_choice_with_only_one_chance(self):
+        for left_config, right_config, expected in [(0.3, None, (0.3, 1.0)), (None, 0.25, (0.75, 1.0))]:
+            with self.subTest(left_config=left_config, right_config=right_config):
+                tree = BinaryOpNode.of('|', TypeNameNode.of('int'), TypeNameNode.of('int'), left_config, right_config)
+                schema = Compiler(MockLibrary()).compile(tree)
+                self.assertEqual(expected, schema.transformers[0].transformer.thresholds)
+
+    def _choice_transformers(self, schema):
+        return [trans for trans in schema.transformers if isinstance(trans.transformer, ChoiceTransformer)]
+
+    def test_flattens_chains_of_choices(self):
+        tree = BinaryOpNode.of('|', BinaryOpNode.of('|', TypeNameNode.of('int'), TypeNameNode.of('float')),
+                               TypeNameNode.of('string'))
+        schema = self.compiler.compile(tree)
+        choice, = self._choice_transformers(schema)
+        self.assertEqual(['producer#0', 'producer#1', 'producer#2'], choice.inputs)
+        self.assertEqual((0.25, 0.25, 0.5), choice.transformer.chances)
+        self.assertEqual(2, len(schema.transformers))
+
+    def test_flattens_choices_on_both_sides_multiplying_their_chances(self):
+        left = BinaryOpNode.of('|', TypeNameNode.of('int'), TypeNameNode.of('float'), 0.5, 0.3)
+        right = BinaryOpNode.of('|', TypeNameNode.of('int'), TypeNameNode.of('string'))
+        schema = self.compiler.compile(BinaryOpNode.of('|', left, right, 0.6, 0.4))
+        choice, = self._choice_transformers(schema)
+        self.assertEqual(4, choice.transformer.arity)
+        for expected, chance in zip((0.3, 0.18, 0.2, 0.2), choice.transformer.chances):
+            self.assertAlmostEqual(expected, chance)
+
+    def test_does_not_flatten_named_choices(self):
+        inner = BinaryOpNode.of('|', TypeNameNode.of('int'), TypeNameNode.of('float'))
+        tree = LetNode.of([('x', inner)], BinaryOpNode.of(
+            '.', BinaryOpNode.of('|', ReferenceNode.of('x'), TypeNameNode.of('int')), ReferenceNode.of('x')
+        ))
+        schema = self.compiler.compile(tree, column_names=['A', 'B'])
+        self.assertEqual([(0.5, 0.5), (0.5, 0.5)],
+                         [choice.transformer.chances for choice in self._choice_transformers(schema)])
+
+    def test_can_compile_choice_of_many_values(self):
+        pair = lambda type_name: BinaryOpNode.of('.', TypeNameNode.of(type_name), TypeNameNode.of(type_name))
+        schema = self.compiler.compile(BinaryOpNode.of('|', pair('int'), pair('float')), column_names=['A', 'B'])
+        choice, = self._choice_transformers(schema)
+        self.assertEqual(['transformer#0#0', 'transformer#0#1'], choice.outputs)
+        self.assertEqual(2, choice.transformer.num_outputs)
+
+    def test_raises_error_if_alternatives_have_different_number_of_values(self):
+        pair = BinaryOpNode.of('.', TypeNameNode.of('int'), TypeNameNode.of('int'))
+        with self.assertRaises(ValueError):
+            self.compiler.compile(BinaryOpNode.of('|', TypeNameNode.of('int'), pair))
+
     def test_compiling_choice_of_two_type_names_sets_info_value(self):
         tree = BinaryOpNode.of('|', TypeNameNode.of('int'), TypeNameNode.of('int'))
         self.compiler.compile(tree)
@@ -1142,3 +1191,85 @@ class TestCompiler(unittest.TestCase):
         with self.assertRaises(KeyError) as ctx:
             self.compiler.compile(ReferenceNode.of('@non_existent'), column_names=['A'])
         self.assertEqual("'@non_existent'", str(ctx.exception))
+
+    def _make_call_library(self, pure):
+        library = MockLibrary()
+        library.register_function('f', lambda x, y: '{}{}'.format(x, y), [AnyType(), SimpleType('string')],
+                                  SimpleType('string'), pure=pure)
+        return library
+
+    def _make_repeated_call(self):
+        call = lambda: CallNode.of('f', [ReferenceNode.of('x'), SimpleExprNode.of(LiteralNode.of('-'))])
+        return LetNode.of([('x', TypeNameNode.of('int'))], BinaryOpNode.of('.', call(), call()))
+
+    def test_shares_calls_to_pure_functions_with_the_same_arguments(self):
+        schema = Compiler(self._make_call_library(pure=True)).compile(self._make_repeated_call())
+        self.assertEqual(['producer#0', 'producer#1'], [producer.name for producer in schema.producers])
+        calls = [t for t in schema.transformers if isinstance(t.transformer, FunctionalTransformer)]
+        self.assertEqual(1, len(calls))
+        self.assertEqual(['producer#0', 'producer#1'], calls[0].inputs)
+        self.assertEqual(2, len(schema.columns))
+
+    def test_does_not_share_calls_to_impure_functions(self):
+        schema = Compiler(self._make_call_library(pure=False)).compile(self._make_repeated_call())
+        calls = [t for t in schema.transformers if isinstance(t.transformer, FunctionalTransformer)]
+        self.assertEqual(2, len(calls))
+
+    def test_shares_merges_of_the_same_inputs(self):
+        merge = lambda: BinaryOpNode.of('+', ReferenceNode.of('x'), ReferenceNode.of('x'))
+        tree = LetNode.of([('x', TypeNameNode.of('int'))], BinaryOpNode.of('.', merge(), merge()))
+        schema = self.compiler.compile(tree)
+        merges = [t for t in schema.transformers if isinstance(t.transformer, MergeTransformer)]
+        self.assertEqual(1, len(merges))
+
+    def test_does_not_share_random_producers_and_choices(self):
+        choice = lambda: BinaryOpNode.of('|', TypeNameNode.of('int'), TypeNameNode.of('int'))
+        schema = self.compiler.compile(BinaryOpNode.of('.', choice(), choice()))
+        self.assertEqual(4, len(schema.producers))
+        choices = [t for t in schema.transformers if isinstance(t.transformer, ChoiceTransformer)]
+        self.assertEqual(2, len(choices))
+
+    def test_shares_fixed_producers_with_the_same_value_and_type(self):
+        constants = [SimpleExprNode.of(LiteralNode.of(value)) for value in (1, 1, 1.0, [1], [1])]
+        tree = BinaryOpNode.of('.', constants[0], constants[1])
+        for constant in constants[2:]:
+            tree = BinaryOpNode.of('.', tree, constant)
+        schema = self.compiler.compile(tree)
+        self.assertEqual([1, 1.0, [1], [1]], [producer.config['value'] for producer in schema.producers])
+
+    def test_does_not_share_fixed_producers_of_zeros_with_different_signs(self):
+        tree = BinaryOpNode.of('.', SimpleExprNode.of(LiteralNode.of(0.0)), SimpleExprNode.of(LiteralNode.of(-0.0)))
+        schema = self.compiler.compile(tree)
+        self.assertEqual(['0.0', '-0.0'], [repr(producer.config['value']) for producer in schema.producers])
+
+    def test_folds_merge_of_constants(self):
+        tree = BinaryOpNode.of('+', SimpleExprNode.of(LiteralNode.of(5)), SimpleExprNode.of(LiteralNode.of(6)))
+        schema = self.compiler.compile(tree)
+        self.assertFalse(any(isinstance(t.transformer, MergeTransformer) for t in schema.transformers))
+        column_source = schema.transformers[-1].inputs[0]
+        self.assertEqual(11, next(p.config['value'] for p in schema.producers if p.name == column_source))
+
+    def test_folds_calls_to_pure_functions_on_constants(self):
+        compiler = Compiler(self._make_call_library(pure=True))
+        tree = CallNode.of('f', [SimpleExprNode.of(LiteralNode.of(5)), SimpleExprNode.of(LiteralNode.of('-'))])
+        schema = compiler.compile(tree)
+        self.assertFalse(any(isinstance(t.transformer, FunctionalTransformer) for t in schema.transformers))
+        self.assertIn('5-', [p.config['value'] for p in schema.producers])
+
+    def test_does_not_fold_calls_to_impure_functions(self):
+        compiler = Compiler(self._make_call_library(pure=False))
+        tree = CallNode.of('f', [SimpleExprNode.of(LiteralNode.of(5)), SimpleExprNode.of(LiteralNode.of('-'))])
+        schema = compiler.compile(tree)
+        self.assertTrue(any(isinstance(t.transformer, FunctionalTransformer) for t in schema.transformers))
+
+    def test_folds_constants_through_assignments(self):
+        five = SimpleExprNode.of(LiteralNode.of(5))
+        tree = LetNode.of([('x', five)], BinaryOpNode.of('+', ReferenceNode.of('x'), ReferenceNode.of('x')))
+        schema = self.compiler.compile(tree)
+        self.assertFalse(any(isinstance(t.transformer, MergeTransformer) for t in schema.transformers))
+        self.assertIn(10, [p.config['value'] for p in schema.producers])
+
+    def test_does_not_fold_merges_that_fail(self):
+        tree = BinaryOpNode.of('+', SimpleExprNode.of(LiteralNode.of(5)), SimpleExprNode.of(LiteralNode.of('a')))
+        schema = self.compiler.compile(tree)
+        self.assertTrue(any(isinstance(t.transformer, MergeTransformer) for t in schema.transformers))
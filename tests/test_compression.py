@@ -0,0 +1,122 @@
+import bz2
+import gzip
+import io
+import lzma
+import unittest
+
+from feanor.compression import (
+    COMPRESSION_METHODS, ParallelGzipFile, SegmentedCompressedFile, open_compressed, zstandard,
+)
+
+
+class TestOpenCompressed(unittest.TestCase):
+    def _compress(self, method, data, threads=1):
+        output = io.BytesIO()
+        with open_compressed(output, method, threads=threads) as compressed:
+            compressed.write(data)
+        self.assertFalse(output.closed)
+        return output.getvalue()
+
+    def test_can_compress_with_gzip(self):
+        self.assertEqual(b'a,b\n1,2\n', gzip.decompress(self._compress('gzip', b'a,b\n1,2\n')))
+
+    def test_can_compress_with_gzip_using_threads(self):
+        self.assertEqual(b'a,b\n1,2\n', gzip.decompress(self._compress('gzip', b'a,b\n1,2\n', threads=2)))
+
+    def test_can_compress_with_bz2(self):
+        self.assertEqual(b'a,b\n1,2\n', bz2.decompress(self._compress('bz2', b'a,b\n1,2\n')))
+
+    def test_can_compress_with_xz(self):
+        self.assertEqual(b'a,b\n1,2\n', lzma.decompress(self._compress('xz', b'a,b\n1,2\n')))
+
+    @unittest.skipIf(zstandard is None, 'zstandard is not available')
+    def test_can_compress_with_zstd(self):
+        data = self._compress('zstd', b'a,b\n1,2\n')
+        self.assertEqual(b'a,b\n1,2\n', zstandard.ZstdDecompressor().decompressobj().decompress(data))
+
+    def test_gzip_output_is_reproducible(self):
+        self.assertEqual(self._compress('gzip', b'a,b\n'), self._compress('gzip', b'a,b\n'))
+
+    def test_raises_error_if_method_is_invalid(self):
+        with self.assertRaises(ValueError):
+            open_compressed(io.BytesIO(), 'invalid')
+
+    def test_raises_error_if_method_does_not_support_threads(self):
+        with self.assertRaises(ValueError):
+            open_compressed(io.BytesIO(), 'bz2', threads=2)
+
+    def test_raises_error_if_number_of_threads_is_not_positive(self):
+        with self.assertRaises(ValueError):
+            open_compressed(io.BytesIO(), 'gzip', threads=0)
+
+    def test_lists_standard_library_methods(self):
+        self.assertEqual(('gzip', 'bz2', 'xz'), COMPRESSION_METHODS[:3])
+
+
+class TestParallelGzipFile(unittest.TestCase):
+    def test_writes_one_member_per_block_in_order(self):
+        data = b''.join(b'%d\n' % i for i in range(10_000))
+        output = io.BytesIO()
+        with ParallelGzipFile(output, threads=4, block_size=1000) as compressed:
+            for i in range(0, len(data), 333):
+                compressed.write(data[i:i + 333])
+        self.assertEqual(data, gzip.decompress(output.getvalue()))
+        self.assertEqual(-(-len(data) // 1000), output.getvalue().count(b'\x1f\x8b\x08'))
+
+    def test_flush_writes_the_partial_block(self):
+        output = io.BytesIO()
+        with ParallelGzipFile(output, threads=2, block_size=1000) as compressed:
+            compressed.write(b'hello')
+            self.assertEqual(b'', output.getvalue())
+            compressed.flush()
+            self.assertEqual(b'hello', gzip.decompress(output.getvalue()))
+            compressed.flush()
+            compressed.write(b' world')
+        self.assertEqual(b'hello world', gzip.decompress(output.getvalue()))
+        self.assertEqual(2, output.getvalue().count(b'\x1f\x8b\x08'))
+
+    def test_writes_nothing_without_data(self):
+        output = io.BytesIO()
+        ParallelGzipFile(output, threads=2).close()
+        self.assertEqual(b'', output.getvalue())
+
+    def test_raises_error_when_writing_to_closed_file(self):
+        compressed = ParallelGzipFile(io.BytesIO(), threads=2)
+        compressed.close()
+        with self.assertRaises(ValueError):
+            compressed.write(b'a')
+
+    def test_raises_error_if_block_size_is_not_positive(self):
+        with self.assertRaises(ValueError):
+            ParallelGzipFile(io.BytesIO(), threads=2, block_size=0)
+
+
+class TestSegmentedCompressedFile(unittest.TestCase):
+    def test_segments_can_be_decompressed_as_a_single_stream(self):
+        decompress = {'gzip': gzip.decompress, 'bz2': bz2.decompress, 'xz': lzma.decompress}
+        for method, decompress in decompress.items():
+            with self.subTest(method=method):
+                output = io.BytesIO()
+                with SegmentedCompressedFile(output, method) as compressed:
+                    compressed.write(b'a,b\n')
+                    compressed.end_segment()
+                    compressed.end_segment()
+                    compressed.write(b'1,2\n')
+                self.assertFalse(output.closed)
+                self.assertEqual(b'a,b\n1,2\n', decompress(output.getvalue()))
+
+    def test_output_can_be_cut_after_a_segment(self):
+        output = io.BytesIO()
+        compressed = SegmentedCompressedFile(output, 'gzip')
+        compressed.write(b'a,b\n')
+        compressed.end_segment()
+        size = len(output.getvalue())
+        compressed.write(b'1,2\n')
+        compressed.flush()
+        self.assertEqual(b'a,b\n', gzip.decompress(output.getvalue()[:size]))
+
+    def test_raises_error_when_writing_to_closed_file(self):
+        compressed = SegmentedCompressedFile(io.BytesIO(), 'gzip')
+        compressed.close()
+        with self.assertRaises(ValueError):
+            compressed.write(b'a')
@@ -0,0 +1,97 @@
+import pickle
+import random
+import unittest
+
+import feanor.counter_random
+from feanor.counter_random import CounterRandom, is_counter_based
+
+
+class TestCounterRandom(unittest.TestCase):
+    def test_is_reproducible(self):
+        first, second = CounterRandom(0), CounterRandom(0)
+        self.assertEqual([first.random() for _ in range(10)], [second.random() for _ in range(10)])
+        self.assertNotEqual(first.random(), CounterRandom(1).random())
+
+    def test_numbers_depend_only_on_the_row(self):
+        rand = CounterRandom(0)
+        rows = []
+        for row in range(5):
+            rand.seek(row)
+            rows.append([rand.randint(0, 1000) for _ in range(3)])
+
+        rand.seek(3)
+        self.assertEqual(rows[3], [rand.randint(0, 1000) for _ in range(3)])
+        other = CounterRandom(0)
+        other.seek(1)
+        self.assertEqual(rows[1], [other.randint(0, 1000) for _ in range(3)])
+        self.assertEqual(5, len(set(map(tuple, rows))))
+
+    def test_streams_are_independent(self):
+        rand = CounterRandom(0)
+        first, second = rand.stream('a'), rand.stream('b')
+        values = [first.random() for _ in range(3)]
+        self.assertNotEqual(values, [second.random() for _ in range(3)])
+
+        same = rand.stream('a')
+        self.assertEqual(values, [same.random() for _ in range(3)])
+
+    def test_streams_follow_seed_and_seek(self):
+        rand = CounterRandom(0)
+        stream = rand.stream('a')
+        rand.seek(7)
+        value = stream.random()
+        rand.seed(0)
+        rand.seek(7)
+        self.assertEqual(value, stream.random())
+        rand.seed(1)
+        rand.seek(7)
+        self.assertNotEqual(value, stream.random())
+
+    def test_gauss_does_not_carry_values_across_rows(self):
+        rand = CounterRandom(0)
+        rand.seek(1)
+        expected = rand.gauss()
+        rand.seek(0)
+        rand.gauss()
+        rand.seek(1)
+        self.assertEqual(expected, rand.gauss())
+
+    def test_state_can_be_restored(self):
+        rand = CounterRandom(0).stream('a')
+        rand.seek(10)
+        rand.random()
+        state = rand.getstate()
+        values = [rand.random() for _ in range(3)]
+        rand.setstate(state)
+        self.assertEqual(values, [rand.random() for _ in range(3)])
+
+    def test_can_be_pickled(self):
+        rand = CounterRandom(0)
+        rand.seek(3)
+        rand.random()
+        copy = pickle.loads(pickle.dumps(rand))
+        self.assertEqual(rand.random(), copy.random())
+
+    def test_getrandbits_has_the_requested_number_of_bits(self):
+        rand = CounterRandom(0)
+        self.assertEqual(0, rand.getrandbits(0))
+        for k in (1, 10, 64, 65, 200):
+            self.assertLess(rand.getrandbits(k), 2 ** k)
+        self.assertGreater(max(rand.getrandbits(200) for _ in range(10)), 2 ** 190)
+
+    def test_numbers_are_uniform(self):
+        rand = CounterRandom(0)
+        counts = [0] * 10
+        for row in range(10_000):
+            rand.seek(row)
+            counts[rand.randrange(10)] += 1
+        for count in counts:
+            self.assertAlmostEqual(1000, count, delta=150)
+
+
+class TestIsCounterBased(unittest.TestCase):
+    def test_detects_counter_based_random_functions(self):
+        self.assertTrue(is_counter_based(CounterRandom(0)))
+        self.assertTrue(is_counter_based(feanor.counter_random))
+        self.assertFalse(is_counter_based(random))
+        self.assertFalse(is_counter_based(random.Random(0)))
@@ -131,6 +131,14 @@ class TestLexer(unittest.TestCase):
         ]
         self.assertEqualTokens(expected_tokens, tokens)
 
+    def test_underscore_followed_by_a_letter_is_part_of_name(self):
+        tokens = tokenize('%unique_int_(1, 2)')
+        expected_tokens = [
+            ('%', '%', 1, 0), ('IDENTIFIER', 'unique_int', 1, 1), ('_', '_', 1, 11), ('(', '(', 1, 12),
+            ('INTEGER', 1, 1, 13), (',', ',', 1, 14), ('INTEGER', 2, 1, 16), (')', ')', 1, 17)
+        ]
+        self.assertEqualTokens(expected_tokens, tokens)
+
     def test_reference_assignment(self):
         tokens = tokenize('(@int)=name')
         expected_tokens = [
@@ -286,6 +294,13 @@ class TestLexer(unittest.TestCase):
         ]
         self.assertEqualTokens(expected_tokens, tokens)
 
+    def test_can_lex_non_ascii_string(self):
+        tokens = tokenize("'àé€\\''")
+        expected_tokens = [
+            ('STRING', "àé€'", 1, 0),
+        ]
+        self.assertEqualTokens(expected_tokens, tokens)
+
     def test_can_use_different_quotes_from_delimiter_without_escape_in_string(self):
         tokens = tokenize("""'''a"b'c\"\"\"'''""")
         expected_tokens = [
@@ -1,12 +1,26 @@
+import csv
+import gzip
+import io
 import itertools as it
+import os
+import re
 import random
+import tempfile
 import unittest
-from io import StringIO
+from bisect import bisect_left
+from io import BytesIO, StringIO
+from types import SimpleNamespace
 from unittest import mock
 
-from feanor.builtin import BuiltInLibrary
+from feanor.builtin import BuiltInLibrary, numpy
+from feanor.counter_random import CounterRandom
+from feanor.dsl import get_parser
+from feanor.dsl.compiler import Compiler
 from feanor.engine import *
-from feanor.schema import Schema
+from feanor.schema import (
+    Schema, SchemaError, ChoiceTransformer, MergeTransformer, FunctionalTransformer, ProjectionTransformer,
+)
+from feanor.unique import UniqueKeys, UniqueKeyError
 
 
 class TestEngine(unittest.TestCase):
@@ -86,6 +100,338 @@ class TestEngine(unittest.TestCase):
         self.assertEqual(first_col, second_col)
 
 
+class TestRowFunctionCompiler(unittest.TestCase):
+    def setUp(self):
+        self.rand = random.Random(0)
+        self.library = BuiltInLibrary({}, self.rand)
+
+    def _make_schema(self):
+        schema = Schema()
+        schema.add_producer('a', type='int')
+        schema.add_producer('b', type='int')
+        schema.add_transformer('merge', transformer=MergeTransformer(2), inputs=['a', 'b'], outputs=['sum'])
+        schema.add_transformer('fmt', transformer=FunctionalTransformer(lambda x: 'v{}'.format(x)), inputs=['a'],
+                               outputs=['text'])
+        schema.add_transformer('choice', transformer=ChoiceTransformer(2, 0.5, 0.5), inputs=['a', 'b'],
+                               outputs=['either'])
+        schema.define_column('A', producer='a')
+        schema.add_column('sum')
+        schema.add_column('text')
+        schema.add_column('either')
+        return schema
+
+    def _evaluate_by_hand(self, schema, number_of_rows):
+        producers = {p.name: self.library.make_producer(p.type, p.config) for p in schema.producers}
+        for _ in range(number_of_rows):
+            env = {name: producer() for name, producer in producers.items()}
+            for transformer in schema.transformers:
+                outputs = transformer.transformer([env[name] for name in transformer.inputs])
+                env.update(zip(transformer.outputs, outputs))
+            yield tuple(env[name] for name in schema.columns)
+
+    def test_generates_same_rows_as_evaluating_schema_by_hand(self):
+        schema = self._make_schema()
+        random.seed(0)
+        got = list(Engine(schema, self.library).generate_data(100))
+        self.rand.seed(0)
+        random.seed(0)
+        expected = list(self._evaluate_by_hand(schema, 100))
+        self.assertEqual(expected, got)
+
+    def test_inlines_simple_transformers(self):
+        schema = self._make_schema()
+        producers = {p.name: self.library.make_producer(p.type, p.config) for p in schema.producers}
+        source = RowFunctionCompiler(schema.columns, producers, schema.transformers).source()
+        self.assertIn('_v0 + _v1', source)
+        self.assertNotIn('_t0', source)
+        self.assertNotIn('_t1', source)
+        self.assertNotIn('_t2', source)
+        self.assertIn('if _r4 <= 0.5:', source)
+
+    def test_resolves_aliases(self):
+        schema = Schema()
+        schema.add_producer('a', type='int')
+        schema.add_alias('b', 'a')
+        schema.add_column('A')
+        schema.add_alias('A', 'b')
+        for engine in (Engine(schema, self.library), ColumnarEngine(schema, self.library)):
+            with self.subTest(engine=type(engine).__name__):
+                self.assertEqual(1, len(list(engine.generate_data(1))[0]))
+
+    def test_raises_error_if_a_column_has_no_value(self):
+        schema = Schema()
+        schema.add_column('A')
+        with self.assertRaises(SchemaError):
+            Engine(schema, self.library)
+
+
+class TestConstantColumns(unittest.TestCase):
+    def setUp(self):
+        self.library = BuiltInLibrary({}, random.Random(0))
+
+    def _make_schema(self):
+        schema = Schema()
+        schema.define_column('A', type='fixed', config={'value': 'tenant-%1'})
+        schema.define_column('B', type='int')
+        schema.define_column('C', type='fixed', config={'value': 3})
+        return schema
+
+    def test_renders_constant_columns_once(self):
+        for engine_type in (Engine, ColumnarEngine):
+            with self.subTest(engine=engine_type.__name__):
+                engine = engine_type(self._make_schema(), self.library)
+                with mock.patch('feanor.builtin.FixedProducer.__call__') as fixed_call:
+                    lines = list(engine.generate_lines(10))
+                fixed_call.assert_not_called()
+                self.assertEqual(10, len(lines))
+                self.assertTrue(all(re.fullmatch(r'tenant-%1,\d+,3\n', line) for line in lines))
+
+    def test_generates_lines_with_only_constant_columns(self):
+        schema = Schema()
+        schema.define_column('A', type='fixed', config={'value': 1})
+        for engine in (Engine(schema, self.library), ColumnarEngine(schema, self.library, batch_size=4)):
+            with self.subTest(engine=type(engine).__name__):
+                self.assertEqual(['1\n'] * 10, list(engine.generate_lines(10)))
+
+    def test_lines_match_generated_data(self):
+        random_copy = random.Random(0)
+        data = list(Engine(self._make_schema(), BuiltInLibrary({}, random_copy)).generate_data(10))
+        lines = list(Engine(self._make_schema(), self.library).generate_lines(10))
+        self.assertEqual([','.join(map(str, row)) + '\n' for row in data], lines)
+
+
+class TestQuoting(unittest.TestCase):
+    def setUp(self):
+        self.library = BuiltInLibrary({}, random.Random(0))
+
+    def _make_schema(self):
+        schema = Schema()
+        schema.define_column('A', type='int')
+        schema.define_column('B', type='string', config={'characters': 'a,"\n', 'len': 3})
+        schema.define_column('C', type='fixed', config={'value': 'x,y'})
+        return schema
+
+    def test_quotes_values_with_special_characters(self):
+        for engine in (Engine(self._make_schema(), self.library), ColumnarEngine(self._make_schema(), self.library)):
+            with self.subTest(engine=type(engine).__name__):
+                text = ''.join(engine.generate_lines(2500))
+                rows = list(csv.reader(StringIO(text)))
+                self.assertEqual(2500, len(rows))
+                self.assertTrue(all(len(row) == 3 and row[2] == 'x,y' for row in rows))
+                self.assertTrue(all(len(row[1]) == 3 and set(row[1]) <= set('a,"\n') for row in rows))
+
+    def test_quoted_lines_contain_the_generated_data(self):
+        random_copy = random.Random(0)
+        data = list(Engine(self._make_schema(), BuiltInLibrary({}, random_copy)).generate_data(10))
+        lines = ''.join(Engine(self._make_schema(), self.library).generate_lines(10))
+        self.assertEqual([list(map(str, row)) for row in data], list(csv.reader(StringIO(lines))))
+
+    def test_does_not_check_columns_of_unquoted_types(self):
+        schema = Schema()
+        schema.define_column('A', type='int')
+        schema.define_column('B', type='float')
+        engine = Engine(schema, self.library)
+        with mock.patch.object(Engine, '_needs_quoting') as needs_quoting:
+            self.assertEqual(10, len(list(engine.generate_lines(10))))
+        needs_quoting.assert_not_called()
+
+    def test_quoting_depends_on_the_producer_of_the_column(self):
+        schema = Schema()
+        schema.add_producer('values', type='cycle', config={'values': ['x,y', 'z']})
+        schema.add_column('A')
+        schema.add_transformer('A', transformer=ProjectionTransformer(1, 0), inputs=['values'], outputs=['A'])
+        for engine in (Engine(schema, self.library), ColumnarEngine(schema, self.library)):
+            with self.subTest(engine=type(engine).__name__):
+                lines = ''.join(engine.generate_lines(4))
+                self.assertEqual([['x,y'], ['z'], ['x,y'], ['z']], list(csv.reader(StringIO(lines))))
+
+    def test_cycle_producer_of_an_int_column_is_quoted(self):
+        schema = Compiler(self.library).compile(get_parser().parse("%int:cycle{'values': ['x,y', 'z']}"),
+                                               column_names=['A'])
+        output = StringIO()
+        generate_data(schema, self.library, output, number_of_rows=2)
+        self.assertEqual([['A'], ['x,y'], ['z']], list(csv.reader(StringIO(output.getvalue()))))
+
+    def test_does_not_check_choices_between_unquoted_types(self):
+        schema = Compiler(self.library).compile(get_parser().parse('%int | %float'), column_names=['A'])
+        engine = Engine(schema, self.library)
+        with mock.patch.object(Engine, '_needs_quoting') as needs_quoting:
+            self.assertEqual(10, len(list(engine.generate_lines(10))))
+        needs_quoting.assert_not_called()
+
+    def test_leaves_batches_without_special_characters_unchanged(self):
+        schema = Schema()
+        schema.define_column('A', type='string', config={'characters': 'ab'})
+        lines = list(ColumnarEngine(schema, self.library).generate_lines(10))
+        self.assertTrue(all(re.fullmatch(r'[ab]+\n', line) for line in lines))
+
+    def test_quotes_the_header(self):
+        schema = Schema()
+        schema.define_column('A,B', type='int')
+        output = StringIO()
+        generate_data(schema, self.library, output, number_of_rows=1)
+        self.assertEqual('"A,B"', output.getvalue().splitlines()[0])
+
+
+class TestLazyChoice(unittest.TestCase):
+    def _make_producer(self, value):
+        producer = mock.Mock(return_value=value)
+        producer.produce_batch.side_effect = lambda n: [value] * n
+        return producer
+
+    def _make_choice(self, left, right, inputs, outputs=('c',)):
+        return SimpleNamespace(transformer=ChoiceTransformer(2, left, right), inputs=list(inputs), outputs=list(outputs))
+
+    def test_places_nodes_used_by_one_branch_inside_it(self):
+        merge = SimpleNamespace(transformer=MergeTransformer(2), inputs=['a', 'b'], outputs=['ab'])
+        choice = self._make_choice(0.5, 0.5, ['ab', 'c'], outputs=['d'])
+        plan = ExecutionPlan(['d', 'b'], {'a': None, 'b': None, 'c': None}, [merge, choice])
+        self.assertEqual([((4, 0),), (), ((4, 1),), ((4, 0),), ()], [node.scope for node in plan.nodes])
+
+    def test_places_nested_choices_inside_their_branch(self):
+        inner = self._make_choice(0.5, 0.5, ['b', 'c'], outputs=['bc'])
+        outer = self._make_choice(0.5, 0.5, ['a', 'bc'], outputs=['d'])
+        plan = ExecutionPlan(['d'], {'a': None, 'b': None, 'c': None}, [inner, outer])
+        self.assertEqual(
+            [((4, 0),), ((4, 1), (3, 0)), ((4, 1), (3, 1)), ((4, 1),), ()],
+            [node.scope for node in plan.nodes],
+        )
+
+    def test_row_function_does_not_call_producers_of_the_other_branch(self):
+        producers = {'a': self._make_producer(1), 'b': self._make_producer(2)}
+        generator = DataGenerator(['c'], producers, [self._make_choice(1, 0, ['a', 'b'])])
+        self.assertEqual([(1,)] * 10, [generator() for _ in range(10)])
+        self.assertEqual(10, producers['a'].call_count)
+        producers['b'].assert_not_called()
+
+    def test_row_function_evaluates_shared_inputs_once(self):
+        producers = {'a': self._make_producer(1), 'b': self._make_producer(2)}
+        generator = DataGenerator(['c', 'a'], producers, [self._make_choice(0, 1, ['a', 'b'])])
+        self.assertEqual((2, 1), generator())
+        self.assertEqual(1, producers['a'].call_count)
+        self.assertEqual(1, producers['b'].call_count)
+
+    def test_row_function_returns_none_when_no_branch_is_selected(self):
+        producers = {'a': self._make_producer(1), 'b': self._make_producer(2)}
+        generator = DataGenerator(['c'], producers, [self._make_choice(0, 0, ['a', 'b'])])
+        self.assertEqual((None,), generator())
+        producers['a'].assert_not_called()
+        producers['b'].assert_not_called()
+
+    def test_columnar_generator_evaluates_branches_only_for_their_rows(self):
+        producers = {'a': self._make_producer(1), 'b': self._make_producer(2)}
+        generator = ColumnarDataGenerator(['c'], producers, [self._make_choice(0.5, 0.5, ['a', 'b'])])
+        random.seed(0)
+        column, = generator(100)
+        random.seed(0)
+        expected = [1 if random.random() <= 0.5 else 2 for _ in range(100)]
+        self.assertEqual(expected, column)
+        producers['a'].produce_batch.assert_called_once_with(expected.count(1))
+        producers['b'].produce_batch.assert_called_once_with(expected.count(2))
+
+    def test_columnar_generator_gathers_outer_values_for_the_branch(self):
+        counter = iter(range(1000))
+        producers = {'a': mock.Mock(**{'produce_batch.side_effect': lambda n: [next(counter) for _ in range(n)]}),
+                     'b': self._make_producer(None)}
+        merge = SimpleNamespace(transformer=MergeTransformer(2), inputs=['a', 'a'], outputs=['aa'])
+        generator = ColumnarDataGenerator(
+            ['c', 'a'], producers, [merge, self._make_choice(0.5, 0.5, ['aa', 'b'])],
+        )
+        choices, values = generator(50)
+        self.assertEqual(list(range(50)), values)
+        self.assertTrue(any(choice is not None for choice in choices))
+        self.assertTrue(all(choice in (None, 2 * value) for choice, value in zip(choices, values)))
+
+    def test_row_function_chooses_among_many_branches_with_one_draw(self):
+        producers = {name: self._make_producer(name) for name in 'abc'}
+        choice = SimpleNamespace(transformer=ChoiceTransformer(3, 0.2, 0.3, 0.4), inputs=['a', 'b', 'c'],
+                                 outputs=['d'])
+        compiler = RowFunctionCompiler(['d'], producers, [choice])
+        self.assertEqual(1, compiler.source().count('_random()'))
+        self.assertIn('elif _r3 <= 0.9:', compiler.source())
+        row_function = compiler.compile()
+        random.seed(0)
+        column = [row_function()[0] for _ in range(100)]
+        random.seed(0)
+        expected = [{0: 'a', 1: 'b', 2: 'c'}.get(bisect_left((0.2, 0.5, 0.9), random.random())) for _ in range(100)]
+        self.assertEqual(expected, column)
+        self.assertEqual(expected.count('b'), producers['b'].call_count)
+
+    def test_columnar_generator_chooses_among_many_branches(self):
+        producers = {name: self._make_producer(name) for name in 'abc'}
+        choice = SimpleNamespace(transformer=ChoiceTransformer(3, 0.2, 0.3, 0.4), inputs=['a', 'b', 'c'],
+                                 outputs=['d'])
+        random.seed(0)
+        column, = ColumnarDataGenerator(['d'], producers, [choice])(100)
+        random.seed(0)
+        expected = [{0: 'a', 1: 'b', 2: 'c'}.get(bisect_left((0.2, 0.5, 0.9), random.random())) for _ in range(100)]
+        self.assertEqual(expected, column)
+        for name in 'abc':
+            producers[name].produce_batch.assert_called_once_with(expected.count(name))
+
+    def test_columnar_generator_handles_nested_choices(self):
+        producers = {name: self._make_producer(name) for name in 'abc'}
+        inner = self._make_choice(0.5, 0.5, ['b', 'c'], outputs=['bc'])
+        outer = self._make_choice(0.5, 0.25, ['a', 'bc'], outputs=['d'])
+        column, = ColumnarDataGenerator(['d'], producers, [inner, outer])(1000)
+        self.assertEqual({'a', 'b', 'c', None}, set(column))
+        selected = sum(1 for value in column if value in ('b', 'c'))
+        self.assertEqual(selected, sum(call[0][0] for call in producers['b'].produce_batch.call_args_list)
+                         + sum(call[0][0] for call in producers['c'].produce_batch.call_args_list))
+
+
+class TestColumnarEngine(unittest.TestCase):
+    def setUp(self):
+        self.rand = random.Random(0)
+        self.rand_copy = random.Random(0)
+        self.library = BuiltInLibrary({}, self.rand)
+
+    def test_generates_columns_in_batches(self):
+        schema = Schema()
+        schema.define_column('A', type='int')
+        schema.define_column('B', type='int')
+        engine = ColumnarEngine(schema, self.library, batch_size=4)
+
+        batches = list(engine.generate_batches(10))
+        self.assertEqual([4, 4, 2], [len(columns[0]) for columns in batches])
+        expected_a = [self.rand_copy.randint(0, 1_000_000) for _ in range(4)]
+        expected_b = [self.rand_copy.randint(0, 1_000_000) for _ in range(4)]
+        self.assertEqual([expected_a, expected_b], batches[0])
+
+    def test_generates_rows(self):
+        schema = Schema()
+        schema.define_column('A', type='int')
+        schema.define_column('B', producer='A')
+        engine = ColumnarEngine(schema, self.library, batch_size=3)
+
+        rows = list(engine.generate_data(10))
+        self.assertEqual(10, len(rows))
+        self.assertTrue(all(a == b for a, b in rows))
+
+    def test_can_generate_stream_of_data(self):
+        schema = Schema()
+        schema.define_column('A', type='int')
+        engine = ColumnarEngine(schema, self.library, batch_size=7)
+        self.assertEqual(100, len(list(it.islice(engine.generate_data(), 100))))
+
+    def test_applies_transformers_to_columns(self):
+        schema = Schema()
+        schema.add_producer('a', type='int')
+        schema.add_producer('b', type='int')
+        schema.add_transformer('merge', transformer=MergeTransformer(2), inputs=['a', 'b'], outputs=['C'])
+        schema.define_column('A', producer='a')
+        schema.define_column('B', producer='b')
+        schema.add_column('C')
+        engine = ColumnarEngine(schema, self.library, batch_size=8)
+
+        for a, b, c in engine.generate_data(20):
+            self.assertEqual(a + b, c)
+
+    def test_raises_error_if_batch_size_is_not_positive(self):
+        with self.assertRaises(ValueError):
+            ColumnarEngine(Schema(), self.library, batch_size=0)
+
+
 class TestFacade(unittest.TestCase):
     def setUp(self):
         self.rand = random.Random(0)
@@ -96,6 +442,21 @@ class TestFacade(unittest.TestCase):
         with self.assertRaises(TypeError):
             generate_data(Schema(), self.library, mock.MagicMock())
 
+    def test_generate_data_writes_optimization_report(self):
+        schema = Schema()
+        schema.add_producer('unused', type='int')
+        schema.define_column('A', type='int')
+        output, report = StringIO(), StringIO()
+        generate_data(schema, self.library, output, number_of_rows=2, report_file=report)
+        self.assertEqual(3, len(output.getvalue().splitlines()))
+        optimization_report, output_report = report.getvalue().splitlines()
+        self.assertEqual(
+            'Optimized schema: 2 producers, 0 transformers -> 1 producers, 0 transformers, 0 aliases.',
+            optimization_report,
+        )
+        self.assertRegex(output_report, r'^Output stage: generation blocked for \d+\.\d{3}s, writer blocked for '
+                                        r'\d+\.\d{3}s\.$')
+
     def test_generate_data_raises_if_both_num_rows_and_num_bytes_are_specified(self):
         with self.assertRaises(TypeError):
             generate_data(Schema(), self.library, mock.MagicMock(), number_of_rows=10, byte_count=100)
@@ -112,6 +473,78 @@ class TestFacade(unittest.TestCase):
         self.assertEqual(2, len(lines.splitlines()))
         self.assertEqual(['A,B,C', ','.join(map(str, expected_values))], lines.splitlines())
 
+    def test_can_generate_some_data_into_a_binary_file(self):
+        schema = Schema()
+        schema.define_column('A', type='int')
+        saved_data = BytesIO()
+        generate_data(schema, self.library, saved_data, number_of_rows=3, write_buffer=0)
+        expected_values = [str(self.rand_copy.randint(0, 1_000_000)) for _ in range(3)]
+        self.assertEqual(['A'] + expected_values, saved_data.getvalue().decode('utf-8').splitlines())
+
+    def test_can_generate_some_data_without_writer_thread(self):
+        schema = Schema()
+        schema.define_column('A', type='int')
+        saved_data, report = StringIO(), StringIO()
+        generate_data(schema, self.library, saved_data, number_of_rows=3, queue_size=0, report_file=report)
+        expected_values = [str(self.rand_copy.randint(0, 1_000_000)) for _ in range(3)]
+        self.assertEqual(['A'] + expected_values, saved_data.getvalue().splitlines())
+        self.assertNotIn('Output stage', report.getvalue())
+
+    def test_can_generate_compressed_data(self):
+        schema = Schema()
+        schema.define_column('A', type='int')
+        saved_data = BytesIO()
+        generate_data(schema, self.library, saved_data, number_of_rows=3, compress='gzip', compress_threads=2)
+        expected_values = [str(self.rand_copy.randint(0, 1_000_000)) for _ in range(3)]
+        self.assertEqual(['A'] + expected_values, gzip.decompress(saved_data.getvalue()).decode('utf-8').splitlines())
+
+    def test_can_generate_data_at_a_limited_rate(self):
+        schema = Schema()
+        schema.define_column('A', type='int')
+        saved_data, report = StringIO(), StringIO()
+        with mock.patch('feanor.ratelimit.time.sleep') as sleep:
+            generate_data(schema, self.library, saved_data, number_of_rows=100, rate=1000, burst=10,
+                          report_file=report)
+        self.assertEqual(101, len(saved_data.getvalue().splitlines()))
+        self.assertTrue(sleep.called)
+        self.assertRegex(report.getvalue().splitlines()[-1], r'^Rate: .* rows/s achieved, target 1000\.0 rows/s\.$')
+
+    def test_can_generate_some_data_with_columnar_engine(self):
+        schema = Schema()
+        schema.define_column('A', type='int')
+        schema.define_column('B', type='int')
+        saved_data = StringIO()
+        generate_data(schema, self.library, saved_data, number_of_rows=5, engine='columnar', batch_size=2)
+        lines = saved_data.getvalue().splitlines()
+        self.assertEqual(6, len(lines))
+        self.assertEqual('A,B', lines[0])
+
+    @unittest.skipIf(numpy is None, 'NumPy is not available')
+    def test_can_generate_some_data_with_columnar_engine_and_numpy_backend(self):
+        schema = Schema()
+        schema.define_column('A', type='int', config={'min': 0, 'max': 9})
+        schema.define_column('B', type='float')
+        saved_data = StringIO()
+        library = BuiltInLibrary({}, self.rand, backend='numpy')
+        generate_data(schema, library, saved_data, number_of_rows=5, engine='columnar', batch_size=2)
+        lines = saved_data.getvalue().splitlines()
+        self.assertEqual(6, len(lines))
+        self.assertTrue(all(re.fullmatch(r'\d,\d+\.\d+(e[+-]\d+)?', line) for line in lines[1:]))
+
+    @unittest.skipIf(numpy is None, 'NumPy is not available')
+    def test_numpy_backend_values_do_not_overflow_in_transformers(self):
+        library = BuiltInLibrary({}, self.rand, backend='numpy')
+        expr = "let a := %int{'min':5000000000000000000,'max':5000000000000000000} in (@a + @a) . (@a + @a + @a)"
+        schema = Compiler(library).compile(get_parser().parse(expr), column_names=['A', 'B'])
+        saved_data = StringIO()
+        generate_data(schema, library, saved_data, number_of_rows=3, engine='columnar', batch_size=2)
+        self.assertEqual(['A,B'] + ['10000000000000000000,15000000000000000000'] * 3,
+                         saved_data.getvalue().splitlines())
+
+    def test_generate_data_raises_if_engine_is_invalid(self):
+        with self.assertRaises(ValueError):
+            generate_data(Schema(), self.library, StringIO(), number_of_rows=5, engine='invalid')
+
     def test_can_generate_some_data_no_header(self):
         schema = Schema(show_header=False)
         schema.define_column('A', type='int')
@@ -150,6 +583,39 @@ class TestFacade(unittest.TestCase):
         self.assertEqual(7, len(lines.splitlines()))
         self.assertEqual(['A,B,C'] + expected_values, lines.splitlines())
 
+    def test_generate_data_raises_if_exact_size_is_used_without_byte_count(self):
+        with self.assertRaises(TypeError):
+            generate_data(Schema(), self.library, mock.MagicMock(), number_of_rows=10, exact_size=True)
+
+    def test_can_generate_exact_byte_count(self):
+        schema = Schema()
+        schema.define_column('A', type='string', config={'characters': 'aé€', 'len': 5})
+        schema.define_column('B', type='int')
+        for byte_count in (1, 2, 17, 1000, 54321):
+            with self.subTest(byte_count=byte_count):
+                saved_data = BytesIO()
+                generate_data(schema, self.library, saved_data, byte_count=byte_count, exact_size=True,
+                              write_buffer=256)
+                data = saved_data.getvalue()
+                self.assertEqual(byte_count, len(data))
+                self.assertTrue(data.endswith(b'\n'))
+                data.decode('utf-8')
+
+    def test_exact_byte_count_keeps_the_quoted_fields_valid(self):
+        schema = Schema()
+        schema.define_column('A', type='string', config={'characters': '"a,', 'len': 5})
+        schema.define_column('B', type='string', config={'characters': 'b\n', 'len': 3})
+        for byte_count in range(1, 60):
+            with self.subTest(byte_count=byte_count):
+                saved_data = BytesIO()
+                generate_data(schema, self.library, saved_data, byte_count=byte_count, exact_size=True)
+                data = saved_data.getvalue()
+                self.assertEqual(byte_count, len(data))
+                reader = csv.reader(io.StringIO(data.decode('utf-8'), newline=''), strict=True)
+                rows = list(reader)
+                self.assertTrue(all(len(row) <= 2 for row in rows))
+                self.assertTrue(data.endswith(b'\n'))
+
     def test_can_generate_some_data_no_header_stream(self):
         schema = Schema(show_header=False)
         schema.define_column('A', type='int')
@@ -180,6 +646,314 @@ class TestFacade(unittest.TestCase):
         self.assertEqual(['A,B,C'] + expected_values, lines.splitlines())
 
 
+class TestParallelGeneration(unittest.TestCase):
+    def setUp(self):
+        self.schema = Schema()
+        self.schema.define_column('A', type='int')
+        self.schema.define_column('B', type='cycle', config={'values': range(7)})
+
+    def _generate(self, seed, **size_and_options):
+        library = BuiltInLibrary({}, random.Random(seed))
+        saved_data = StringIO()
+        generate_data(self.schema, library, saved_data, **size_and_options)
+        return saved_data.getvalue()
+
+    def test_output_is_reproducible(self):
+        first = self._generate(0, number_of_rows=50, jobs=2, shard_size=7)
+        second = self._generate(0, number_of_rows=50, jobs=2, shard_size=7)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, self._generate(1, number_of_rows=50, jobs=2, shard_size=7))
+
+    def test_output_does_not_depend_on_number_of_jobs(self):
+        self.assertEqual(
+            self._generate(0, number_of_rows=50, jobs=2, shard_size=7),
+            self._generate(0, number_of_rows=50, jobs=3, shard_size=7),
+        )
+
+    def test_output_has_single_header_and_all_rows(self):
+        lines = self._generate(0, number_of_rows=50, jobs=2, shard_size=7).splitlines()
+        self.assertEqual(51, len(lines))
+        self.assertEqual('A,B', lines[0])
+        self.assertEqual([str(i % 7) for i in range(50)], [line.split(',')[1] for line in lines[1:]])
+
+    def test_can_generate_by_byte_count(self):
+        output = self._generate(0, byte_count=100, jobs=2, shard_size=7)
+        self.assertLessEqual(100, len(output))
+        self.assertGreater(100, len(output) - len(output.splitlines(True)[-1]))
+
+    def test_can_use_columnar_engine(self):
+        lines = self._generate(0, number_of_rows=30, jobs=2, shard_size=7, engine='columnar',
+                               batch_size=3).splitlines()
+        self.assertEqual(31, len(lines))
+
+    def test_raises_error_if_number_of_jobs_is_not_positive(self):
+        with self.assertRaises(ValueError):
+            self._generate(0, number_of_rows=30, jobs=0)
+
+    def test_unique_int_values_are_unique_and_reproducible_with_the_random_module(self):
+        # the random module is re-seeded in the forked workers, unlike the instances of random.Random.
+        schema = Schema(show_header=False)
+        schema.define_column('A', type='unique_int', config={'max': 10 ** 9})
+        for engine in ('row', 'columnar'):
+            outputs = []
+            for _ in range(2):
+                random.seed(0)
+                saved_data = StringIO()
+                generate_data(schema, BuiltInLibrary({}, random), saved_data, number_of_rows=3000, jobs=3,
+                              shard_size=100, engine=engine)
+                outputs.append(saved_data.getvalue())
+            with self.subTest(engine=engine):
+                self.assertEqual(3000, len(set(outputs[0].splitlines())))
+                self.assertEqual(outputs[0], outputs[1])
+
+    def test_quoted_values_can_contain_newlines(self):
+        self.schema.define_column('C', type='string', config={'characters': 'a\n', 'len': 4})
+        output = self._generate(0, number_of_rows=30, jobs=2, shard_size=7)
+        rows = list(csv.reader(StringIO(output)))
+        self.assertEqual(31, len(rows))
+        self.assertTrue(all(len(row) == 3 and len(row[2]) == 4 for row in rows[1:]))
+        for byte_count in range(20, 80, 7):
+            output = self._generate(0, byte_count=byte_count, jobs=2, shard_size=7)
+            rows = list(csv.reader(StringIO(output)))
+            self.assertTrue(all(len(row) == 3 and len(row[2]) == 4 for row in rows[1:]), rows)
+
+
+class TestSkippingRows(unittest.TestCase):
+    def setUp(self):
+        self.schema = Schema()
+        self.schema.define_column('A', type='int')
+        self.schema.define_column('B', type='cycle', config={'values': range(7)})
+        self.schema.add_column('C')
+        self.schema.add_transformer('choice', inputs=['A', 'B'], outputs=['C'],
+                                    transformer=ChoiceTransformer(2, 0.5, 0.5))
+
+    def _generate(self, random_funcs, **size_and_options):
+        library = BuiltInLibrary({}, random_funcs)
+        saved_data = StringIO()
+        random.seed(0)
+        generate_data(self.schema, library, saved_data, **size_and_options)
+        return saved_data.getvalue().splitlines()
+
+    def test_skips_the_first_rows(self):
+        lines = self._generate(random.Random(0), number_of_rows=30)
+        self.assertEqual(lines[:1] + lines[11:21], self._generate(random.Random(0), number_of_rows=10, skip=10))
+
+    def test_skips_the_first_rows_with_counter_based_random_functions(self):
+        lines = self._generate(CounterRandom(0), number_of_rows=30)
+        self.assertEqual(lines[:1] + lines[11:21], self._generate(CounterRandom(0), number_of_rows=10, skip=10))
+
+    def test_skips_the_first_rows_of_the_parallel_generation(self):
+        lines = self._generate(random.Random(0), number_of_rows=30, jobs=2, shard_size=7)
+        skipped_lines = self._generate(random.Random(0), number_of_rows=10, skip=10, jobs=2, shard_size=7)
+        self.assertEqual(lines[:1] + lines[11:21], skipped_lines)
+
+    def test_counter_based_parallel_generation_is_the_same_as_the_serial_one(self):
+        serial = self._generate(CounterRandom(0), number_of_rows=30)
+        self.assertEqual(serial, self._generate(CounterRandom(0), number_of_rows=30, jobs=2, shard_size=7))
+        self.assertEqual(serial[:1] + serial[6:26],
+                         self._generate(CounterRandom(0), number_of_rows=20, skip=5, jobs=3, shard_size=4))
+
+    def test_counter_based_rows_depend_only_on_their_position(self):
+        engine = Engine(self.schema, BuiltInLibrary({}, CounterRandom(0)))
+        rows = list(engine.generate_data(20))
+        engine.seek(13)
+        self.assertEqual(rows[13:15], list(engine.generate_data(2)))
+        engine.skip(3)
+        self.assertEqual(rows[18:19], list(engine.generate_data(1)))
+
+    def test_counter_based_producers_use_their_own_stream(self):
+        schema = Schema()
+        schema.define_column('A', type='int')
+        library = BuiltInLibrary({}, CounterRandom(0))
+        values = list(Engine(schema, library).generate_data(5))
+        schema.define_column('B', type='int')
+        self.assertEqual(values, [row[:1] for row in Engine(schema, library).generate_data(5)])
+
+    def test_raises_error_if_skip_is_negative(self):
+        with self.assertRaises(ValueError):
+            self._generate(random.Random(0), number_of_rows=10, skip=-1)
+
+    def test_columnar_engine_does_not_support_counter_based_random_functions(self):
+        with self.assertRaises(ValueError):
+            ColumnarEngine(self.schema, BuiltInLibrary({}, CounterRandom(0)))
+
+
+class TestUniqueKeys(unittest.TestCase):
+    def setUp(self):
+        self.library = BuiltInLibrary({}, random.Random(0))
+        self.schema = Schema()
+        self.schema.define_column('A', type='int', config={'max': 40})
+        self.schema.define_column('B', type='fixed', config={'value': 'x'})
+        self.schema.define_column('C', type='int', config={'max': 1})
+
+    def test_engines_generate_unique_keys(self):
+        for engine in ('row', 'columnar'):
+            with self.subTest(engine=engine):
+                unique_keys = UniqueKeys([['A', 'B']])
+                engine = make_engine(self.schema, self.library, engine, batch_size=7, unique_keys=unique_keys)
+                lines = list(engine.generate_lines(31))
+                self.assertEqual(31, len(set(line.split(',')[0] for line in lines)))
+                self.assertGreater(unique_keys.report.collisions, 0)
+
+    def test_data_and_lines_share_the_keys(self):
+        for engine in ('row', 'columnar'):
+            with self.subTest(engine=engine):
+                engine = make_engine(self.schema, self.library, engine, batch_size=7,
+                                     unique_keys=UniqueKeys([['A', 'B']]))
+                rows = list(engine.generate_data(15))
+                lines = list(engine.generate_lines(16))
+                values = [str(row[0]) for row in rows] + [line.split(',')[0] for line in lines]
+                self.assertEqual(31, len(set(values)))
+
+    def test_generate_data_writes_unique_rows_and_report(self):
+        output, report = StringIO(), StringIO()
+        generate_data(self.schema, self.library, output, number_of_rows=2, unique=[['C']], report_file=report)
+        header, *lines = output.getvalue().splitlines()
+        self.assertEqual('A,B,C', header)
+        self.assertEqual({'0', '1'}, {line.split(',')[-1] for line in lines})
+        self.assertRegex(report.getvalue().splitlines()[-1],
+                         r'^Unique keys: \d+ collisions in \d+ rows generated, \d+\.\d{2}% retried, '
+                         r'0 fingerprints on disk\.$')
+
+    def test_generate_data_raises_error_when_keys_are_exhausted(self):
+        with self.assertRaises(UniqueKeyError):
+            generate_data(self.schema, self.library, StringIO(), number_of_rows=3, unique=[['C']])
+
+    def test_skipped_rows_are_the_same_as_with_unique_keys(self):
+        for random_funcs in (random.Random, CounterRandom):
+            with self.subTest(random_funcs=random_funcs.__name__):
+                outputs = []
+                for skip in (0, 10):
+                    output = StringIO()
+                    generate_data(self.schema, BuiltInLibrary({}, random_funcs(0)), output, number_of_rows=20 - skip,
+                                  skip=skip, unique=[['A']])
+                    outputs.append(output.getvalue().splitlines()[1:])
+                self.assertEqual(outputs[0][10:], outputs[1])
+
+    def test_cannot_be_used_with_many_jobs_or_checkpoints(self):
+        for options in ({'jobs': 2}, {'checkpoint': 'progress'}):
+            with self.subTest(options=options), self.assertRaises(TypeError):
+                generate_data(self.schema, self.library, StringIO(), number_of_rows=3, unique=[['A']], **options)
+
+
+class InterruptedFile(io.RawIOBase):
+    """A binary file at `path` whose writes fail once it contains more than `max_size` bytes."""
+
+    def __init__(self, path, max_size=float('+inf')):
+        self._file = open(path, 'r+b' if os.path.exists(path) else 'wb')
+        self._max_size = max_size
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def write(self, data):
+        if self._file.tell() + len(data) > self._max_size:
+            raise OSError('interrupted')
+        return self._file.write(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def truncate(self, size=None):
+        return self._file.truncate(size)
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+class TestCheckpoints(unittest.TestCase):
+    def setUp(self):
+        self.schema = Schema()
+        self.schema.define_column('A', type='int')
+        self.schema.define_column('B', type='cycle', config={'values': ['x', 'y,z', 'w']})
+        self.schema.add_column('C')
+        self.schema.add_transformer('choice', inputs=['A', 'B'], outputs=['C'],
+                                    transformer=ChoiceTransformer(2, 0.5, 0.5))
+        self.directory = tempfile.TemporaryDirectory()
+        self.checkpoint = os.path.join(self.directory.name, 'checkpoint')
+        self.output = os.path.join(self.directory.name, 'output')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _generate(self, max_size=float('+inf'), random_funcs=None, **options):
+        library = BuiltInLibrary({}, random_funcs if random_funcs is not None else random.Random(0))
+        random.seed(0)
+        output_file = InterruptedFile(self.output, max_size)
+        try:
+            generate_data(self.schema, library, output_file, **options)
+        finally:
+            output_file.close()
+        with open(self.output, 'rb') as output_file:
+            return output_file.read()
+
+    def _generate_interrupted_and_resumed(self, max_size, **options):
+        with self.assertRaises(OSError):
+            self._generate(max_size, checkpoint=self.checkpoint, checkpoint_interval=0, **options)
+        return self._generate(checkpoint=self.checkpoint, resume=True, **options)
+
+    def _uninterrupted(self, **options):
+        data = self._generate(**options)
+        os.remove(self.output)
+        return data
+
+    def test_resumed_generation_writes_the_same_data(self):
+        expected = self._uninterrupted(number_of_rows=50_000)
+        self.assertEqual(expected, self._generate_interrupted_and_resumed(300_000, number_of_rows=50_000))
+
+    def test_resumed_parallel_generation_writes_the_same_data(self):
+        options = {'number_of_rows': 5_000, 'jobs': 2, 'shard_size': 1_000}
+        expected = self._uninterrupted(**options)
+        self.assertEqual(expected, self._generate_interrupted_and_resumed(len(expected) // 2, **options))
+
+    def test_resumed_compressed_generation_writes_the_same_data(self):
+        expected = gzip.decompress(self._uninterrupted(number_of_rows=50_000, compress='gzip'))
+        resumed = self._generate_interrupted_and_resumed(100_000, number_of_rows=50_000, compress='gzip')
+        self.assertEqual(expected, gzip.decompress(resumed))
+
+    def test_resumed_counter_based_generation_writes_the_same_data(self):
+        expected = self._uninterrupted(number_of_rows=30_000, skip=10, random_funcs=CounterRandom(0))
+        resumed = self._generate_interrupted_and_resumed(100_000, number_of_rows=30_000, skip=10,
+                                                         random_funcs=CounterRandom(0))
+        self.assertEqual(expected, resumed)
+
+    def test_resuming_without_a_checkpoint_starts_from_the_beginning(self):
+        expected = self._uninterrupted(number_of_rows=100)
+        with open(self.output, 'wb') as output_file:
+            output_file.write(b'garbage' * 1000)
+        self.assertEqual(expected, self._generate(number_of_rows=100, checkpoint=self.checkpoint, resume=True))
+
+    def test_resuming_a_completed_generation_writes_nothing_more(self):
+        expected = self._generate(number_of_rows=100, checkpoint=self.checkpoint)
+        self.assertEqual(expected, self._generate(number_of_rows=100, checkpoint=self.checkpoint, resume=True))
+
+    def test_raises_error_if_resuming_a_serial_generation_with_many_jobs(self):
+        self._generate(number_of_rows=100, checkpoint=self.checkpoint)
+        with self.assertRaises(ValueError):
+            self._generate(number_of_rows=100, checkpoint=self.checkpoint, resume=True, jobs=2)
+
+    def test_raises_error_if_resuming_without_checkpoint(self):
+        with self.assertRaises(TypeError):
+            self._generate(number_of_rows=100, resume=True)
+
+    def test_raises_error_if_checkpoint_is_used_with_byte_count(self):
+        with self.assertRaises(TypeError):
+            self._generate(byte_count=100, checkpoint=self.checkpoint)
+
+
 class MaxSizeFileIO:
     def __init__(self, maxsize):
         self.maxsize = maxsize
@@ -40,6 +40,12 @@ class TestMockLibrary(TestCase):
         library.register_definition('ciao', {'producer': 'int', 'config': {}})
         self.assertEqual(10, library.make_producer('ciao', {}))
 
+    def test_can_make_a_producer_with_other_random_funcs(self):
+        library = MockLibrary()
+        library.register_factory('ciao', lambda random_funcs, config: random_funcs)
+        self.assertIs(library.random_funcs, library.make_producer('ciao', {}))
+        self.assertEqual('other', library.make_producer('ciao', {}, random_funcs='other'))
+
     def test_raises_error_if_trying_to_register_a_factory_multiple_times(self):
         library = MockLibrary()
         factory = lambda random_funcs, config: 10
@@ -76,6 +82,15 @@ class TestMockLibrary(TestCase):
         self.assertEqual(1, library.make_producer('perc', {}))
         self.assertEqual(2.0, library.make_producer('other', {}))
 
+    def test_values_need_quoting_unless_their_type_is_unquoted(self):
+        library = MockLibrary()
+        library.unquoted_types = lambda: {'int'}
+        library.register_definition('perc', {'producer': 'int'})
+        self.assertFalse(library.needs_quoting('int'))
+        self.assertFalse(library.needs_quoting('perc'))
+        self.assertTrue(library.needs_quoting('string'))
+        self.assertTrue(library.needs_quoting(None))
+
     def test_raises_error_when_creating_library_if_name_has_multiple_definitions(self):
         with self.assertRaises(ValueError):
             MockLibrary(factories={'a': (lambda x: 1)}, definitions={'a': None})
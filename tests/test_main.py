@@ -138,6 +138,7 @@ class TestGetSchemaSizeAndLibraryParams(unittest.TestCase):
             define={},
             random_module=random,
             random_seed=None,
+            backend=None,
             schema_definition_type='cmdline',
             columns=[('A', '@bob'), ('B', '%int')],
             expressions_defined=[('bob', '%int')],
@@ -165,6 +166,7 @@ class TestGetSchemaSizeAndLibraryParams(unittest.TestCase):
             define={},
             random_module=random,
             random_seed=None,
+            backend=None,
             schema_definition_type='cmdline',
             columns=[('A', '@bob'), ('B', '%int')],
             expressions_defined=[('bob', '%int')],
@@ -192,6 +194,7 @@ class TestGetSchemaSizeAndLibraryParams(unittest.TestCase):
             define={},
             random_module=random,
             random_seed=None,
+            backend=None,
             schema_definition_type='cmdline',
             columns=[('A', '@bob'), ('B', '%int')],
             expressions_defined=[('bob', '%int')],
@@ -219,6 +222,7 @@ class TestGetSchemaSizeAndLibraryParams(unittest.TestCase):
             define={},
             random_module=random,
             random_seed=None,
+            backend=None,
             schema_definition_type='expr',
             schema='%int . %int',
             columns_names='A,B',
@@ -246,6 +250,7 @@ class TestGetSchemaSizeAndLibraryParams(unittest.TestCase):
             define={},
             random_module=random,
             random_seed=None,
+            backend=None,
             schema_definition_type='expr',
             schema='%int . %int',
             columns_names='A,B',
@@ -273,6 +278,7 @@ class TestGetSchemaSizeAndLibraryParams(unittest.TestCase):
             define={},
             random_module=random,
             random_seed=None,
+            backend=None,
             schema_definition_type='expr',
             schema='%int . %int',
             columns_names='A,B',
@@ -300,11 +306,33 @@ class TestGetSchemaSizeAndLibraryParams(unittest.TestCase):
             define={},
             random_module=random,
             random_seed=None,
+            backend=None,
             schema_definition_type='invalid',
         )
         with self.assertRaises(ValueError):
             get_schema_size_and_library_params(args)
 
+    def test_raises_error_with_numpy_backend_and_row_engine(self):
+        for engine in (None, 'row'):
+            args = SimpleNamespace(
+                library='feanor.builtin',
+                global_configuration={},
+                define={},
+                random_module=random,
+                random_seed=None,
+                backend='numpy',
+                engine=engine,
+                schema_definition_type='expr',
+                schema='%int',
+                columns_names='A',
+                show_header=True,
+                num_rows=1,
+                stream_mode=None,
+                num_bytes=None,
+            )
+            with self.subTest(engine=engine), self.assertRaises(ValueError):
+                get_schema_size_and_library_params(args)
+
     def test_can_set_random_seed(self):
         args = SimpleNamespace(
             library='feanor.builtin',
@@ -312,6 +340,7 @@ class TestGetSchemaSizeAndLibraryParams(unittest.TestCase):
             define={},
             random_module=random,
             random_seed=0,
+            backend=None,
             schema_definition_type='cmdline',
             columns=[('A', '@bob'), ('B', '%int')],
             expressions_defined=[('bob', '%int')],
@@ -332,6 +361,7 @@ class TestGetSchemaSizeAndLibraryParams(unittest.TestCase):
             define={},
             random_module=random,
             random_seed=None,
+            backend=None,
             schema_definition_type='expr',
             schema='%int . %int',
             columns_names='',
@@ -354,6 +384,10 @@ class TestGetLibrary(unittest.TestCase):
         self.assertEqual({}, library.global_configuration)
         self.assertIs(random, library.random_funcs)
 
+    def test_can_get_builtin_library_with_backend(self):
+        library = get_library('feanor.builtin', {}, {}, random, backend='python')
+        self.assertEqual('python', library.backend)
+
     def test_exits_with_code_one_error_if_invalid_name(self):
         with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit) as e:
             get_library('invalid', {}, {}, random)
@@ -0,0 +1,108 @@
+import random
+import unittest
+from types import SimpleNamespace
+
+from feanor.builtin import BuiltInLibrary
+from feanor.engine import Engine
+from feanor.optimizer import optimize, _topological_sort
+from feanor.schema import (
+    Schema, SchemaError, IdentityTransformer, ProjectionTransformer, MergeTransformer, ChoiceTransformer,
+)
+
+
+class TestOptimize(unittest.TestCase):
+    def test_replaces_renames_with_aliases(self):
+        schema = Schema()
+        schema.add_producer('a', type='int')
+        schema.add_transformer('t0', inputs=['a'], outputs=['b'], transformer=IdentityTransformer(1))
+        schema.add_column('A')
+        schema.add_transformer('t1', inputs=['b'], outputs=['A'], transformer=IdentityTransformer(1))
+        optimized, _ = optimize(schema)
+        self.assertEqual(('A',), optimized.columns)
+        self.assertEqual((), optimized.transformers)
+        self.assertEqual({'A': 'a'}, optimized.aliases)
+
+    def test_replaces_projections_with_aliases(self):
+        schema = Schema()
+        schema.add_producer('a', type='int')
+        schema.add_producer('b', type='int')
+        schema.add_transformer('t0', inputs=['a', 'b'], outputs=['c'], transformer=ProjectionTransformer(2, 1))
+        schema.add_transformer('t1', inputs=['a', 'c'], outputs=['d'], transformer=MergeTransformer(2))
+        schema.add_column('d')
+        optimized, _ = optimize(schema)
+        self.assertEqual(1, len(optimized.transformers))
+        self.assertEqual(['a', 'b'], optimized.transformers[0].inputs)
+
+    def test_removes_unreachable_producers_and_transformers(self):
+        schema = Schema()
+        schema.add_producer('a', type='int')
+        schema.add_producer('b', type='int')
+        schema.add_producer('c', type='int')
+        schema.add_transformer('t0', inputs=['b', 'c'], outputs=['d'], transformer=MergeTransformer(2))
+        schema.add_transformer('t1', inputs=['a', 'a'], outputs=['e'], transformer=MergeTransformer(2))
+        schema.add_column('e')
+        optimized, report = optimize(schema)
+        self.assertEqual(['a'], [producer.name for producer in optimized.producers])
+        self.assertEqual(['t1'], [transformer.name for transformer in optimized.transformers])
+        self.assertEqual((3, 2, 1, 1), (report.producers_before, report.transformers_before,
+                                        report.producers_after, report.transformers_after))
+
+    def test_keeps_schemas_that_redefine_names_unchanged(self):
+        schema = Schema()
+        schema.define_column('A', type='int')
+        schema.add_transformer('t0', inputs=['A', 'A'], outputs=['A'], transformer=MergeTransformer(2))
+        optimized, _ = optimize(schema)
+        self.assertIs(schema, optimized)
+
+    def test_ignores_renames_that_redefine_a_name_with_the_same_value(self):
+        schema = Schema()
+        schema.add_producer('a', type='int')
+        schema.add_column('A')
+        schema.add_transformer('t0', inputs=['a'], outputs=['A'], transformer=IdentityTransformer(1))
+        schema.add_transformer('t1', inputs=['a'], outputs=['A'], transformer=IdentityTransformer(1))
+        schema.add_transformer('t2', inputs=['A'], outputs=['A'], transformer=IdentityTransformer(1))
+        optimized, _ = optimize(schema)
+        self.assertEqual((), optimized.transformers)
+        self.assertEqual({'A': 'a'}, optimized.aliases)
+
+    def test_optimized_schema_generates_the_same_data(self):
+        schema = Schema()
+        schema.add_producer('a', type='int')
+        schema.add_producer('b', type='float')
+        schema.add_transformer('t0', inputs=['a', 'b'], outputs=['c'], transformer=ChoiceTransformer(2, 0.3, 0.3))
+        schema.add_transformer('t1', inputs=['c'], outputs=['d'], transformer=IdentityTransformer(1))
+        schema.define_column('A', producer='a')
+        schema.add_column('D')
+        schema.add_transformer('t2', inputs=['d'], outputs=['D'], transformer=IdentityTransformer(1))
+        optimized, _ = optimize(schema)
+
+        random.seed(0)
+        expected = list(Engine(schema, BuiltInLibrary({}, random.Random(0))).generate_data(100))
+        random.seed(0)
+        got = list(Engine(optimized, BuiltInLibrary({}, random.Random(0))).generate_data(100))
+        self.assertEqual(expected, got)
+        self.assertEqual(1, len(optimized.transformers))
+
+
+class TestTopologicalSort(unittest.TestCase):
+    def _make_transformer(self, name, inputs, outputs):
+        return SimpleNamespace(name=name, inputs=inputs, outputs=outputs)
+
+    def test_keeps_the_order_of_sorted_transformers(self):
+        transformers = [
+            self._make_transformer('t0', ['a'], ['b']),
+            self._make_transformer('t1', ['a'], ['c']),
+            self._make_transformer('t2', ['b', 'c'], ['d']),
+        ]
+        self.assertEqual(transformers, _topological_sort(transformers))
+
+    def test_moves_transformers_after_their_inputs(self):
+        t0 = self._make_transformer('t0', ['b'], ['c'])
+        t1 = self._make_transformer('t1', ['a'], ['b'])
+        self.assertEqual([t1, t0], _topological_sort([t0, t1]))
+
+    def test_raises_error_on_cycles(self):
+        t0 = self._make_transformer('t0', ['b'], ['a'])
+        t1 = self._make_transformer('t1', ['a'], ['b'])
+        with self.assertRaises(SchemaError):
+            _topological_sort([t0, t1])
@@ -103,3 +103,19 @@ class TestRequiredConfigNames(unittest.TestCase):
 
         producer = HasDefaultConfig(None, 'test_producer', {'a': 'A'})
         self.assertEqual(SimpleNamespace(key='value', a='A'), producer.config)
+
+
+class TestProduceBatch(unittest.TestCase):
+    def test_default_implementation_calls_producer_n_times(self):
+        class Counter(Producer):
+            def __init__(self):
+                super().__init__(None, 'counter', None)
+                self.count = 0
+
+            def __call__(self):
+                self.count += 1
+                return self.count
+
+        producer = Counter()
+        self.assertEqual([1, 2, 3, 4], producer.produce_batch(4))
+        self.assertEqual([], producer.produce_batch(0))
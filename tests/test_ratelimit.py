@@ -0,0 +1,92 @@
+import unittest
+
+from feanor.ratelimit import MIN_SLEEP, RateLimiter
+from feanor.writer import WriteBarrier
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def _make_limiter(self, rate, **kwargs):
+        return RateLimiter(rate, clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def _throttle(self, limiter, lines, max_chunk_size=1 << 20):
+        return list(limiter.throttle(lines, max_chunk_size=max_chunk_size))
+
+    def test_writes_rows_at_the_target_rate(self):
+        limiter = self._make_limiter(1000, burst=10)
+        chunks = self._throttle(limiter, ['a\n'] * 5010)
+        self.assertEqual('a\n' * 5010, ''.join(chunks))
+        self.assertAlmostEqual(5.0, self.clock.now, delta=MIN_SLEEP)
+
+    def test_writes_bytes_at_the_target_rate(self):
+        limiter = self._make_limiter(1000, unit='bytes', burst=100)
+        self._throttle(limiter, ['abcd\n'] * 1020)
+        self.assertAlmostEqual(5.0, self.clock.now, delta=MIN_SLEEP)
+
+    def test_counts_the_bytes_of_the_encoded_lines(self):
+        limiter = self._make_limiter(1000, unit='bytes', burst=100)
+        # each line is 5 bytes in UTF-8, although it has 3 characters.
+        self._throttle(limiter, ['a€\n'] * 1020)
+        self.assertAlmostEqual(5.0, self.clock.now, delta=MIN_SLEEP)
+        self.assertAlmostEqual(1000, limiter.report.achieved, delta=20)
+
+    def test_sleeps_once_per_batch_of_rows(self):
+        limiter = self._make_limiter(100_000)
+        chunks = self._throttle(limiter, ['a\n'] * 100_000)
+        self.assertTrue(all(seconds >= MIN_SLEEP for seconds in self.clock.sleeps))
+        self.assertLessEqual(len(self.clock.sleeps), 1 / MIN_SLEEP)
+        self.assertEqual(len(self.clock.sleeps) + 1, len(chunks))
+
+    def test_ramps_up_linearly(self):
+        limiter = self._make_limiter(1000, ramp_up=2)
+        self._throttle(limiter, ['a\n'] * 2000)
+        # 1000 rows are written during the ramp up and the other 1000 in the following second.
+        self.assertAlmostEqual(3.0, self.clock.now, delta=2 * MIN_SLEEP)
+
+    def test_splits_chunks_at_the_maximum_size(self):
+        limiter = self._make_limiter(1000)
+        chunks = self._throttle(limiter, ['ab\n'] * 10, max_chunk_size=6)
+        self.assertEqual(['ab\nab\n'] * 5, chunks)
+
+    def test_yields_barriers_without_consuming_tokens(self):
+        limiter = self._make_limiter(1000, burst=2)
+        barrier = WriteBarrier(lambda: None)
+        chunks = self._throttle(limiter, ['a\n', barrier, 'b\n'])
+        self.assertEqual(['a\n', barrier, 'b\n'], chunks)
+        self.assertEqual(0.0, self.clock.now)
+
+    def test_reports_the_achieved_rate(self):
+        limiter = self._make_limiter(1000, burst=10)
+        self._throttle(limiter, ['a\n'] * 5010)
+        report = limiter.report
+        self.assertEqual((1000, 'rows'), (report.target, report.unit))
+        self.assertAlmostEqual(1002, report.achieved, delta=5)
+        self.assertRegex(str(report), r'^Rate: 100\d\.\d rows/s achieved, target 1000\.0 rows/s\.$')
+
+    def test_reports_the_rate_of_interrupted_runs(self):
+        limiter = self._make_limiter(1000, burst=10)
+        chunks = limiter.throttle(iter(['a\n'] * 5000), max_chunk_size=1 << 20)
+        for _ in range(100):
+            next(chunks)
+        self.assertGreater(limiter.report.achieved, 0)
+
+    def test_raises_error_if_parameters_are_invalid(self):
+        for kwargs in ({'rate': 0}, {'rate': 1, 'unit': 'lines'}, {'rate': 1, 'burst': 0},
+                       {'rate': 1, 'ramp_up': -1}):
+            with self.subTest(**kwargs), self.assertRaises(ValueError):
+                RateLimiter(**kwargs)
@@ -186,6 +186,34 @@ class TestSchema(unittest.TestCase):
         self.assertEqual(SimpleNamespace(name='my_transformer', inputs=['A'], outputs=['A'], transformer=ret_none),
                          schema.transformers[0])
 
+    def test_can_add_an_alias(self):
+        schema = Schema()
+        schema.add_producer('a', type='int')
+        schema.add_column('A')
+        schema.add_alias('A', 'a')
+        self.assertEqual({'A': 'a'}, schema.aliases)
+
+    def test_can_use_an_alias_as_input(self):
+        schema = Schema()
+        schema.add_producer('a', type='int')
+        schema.add_alias('b', 'a')
+        schema.add_transformer('t', inputs=['b'], outputs=['c'], transformer=IdentityTransformer(1))
+        self.assertEqual(['b'], schema.transformers[0].inputs)
+
+    def test_raises_an_error_if_alias_target_does_not_exist(self):
+        schema = Schema()
+        with self.assertRaises(SchemaError) as ctx:
+            schema.add_alias('A', 'a')
+        self.assertEqual("Name 'a' is not defined in the schema.", str(ctx.exception))
+
+    def test_raises_an_error_if_alias_is_already_defined(self):
+        schema = Schema()
+        schema.add_producer('a', type='int')
+        schema.add_producer('b', type='int')
+        with self.assertRaises(SchemaError) as ctx:
+            schema.add_alias('b', 'a')
+        self.assertEqual("Name 'b' is already defined.", str(ctx.exception))
+
     def test_raises_an_error_if_inputs_do_not_exist(self):
         schema = Schema()
         schema.define_column('A', type='int')
@@ -247,6 +275,25 @@ class TestSchema(unittest.TestCase):
         self.assertEqual("Transformer 'my_transformer' is already defined.", str(ctx.exception))
 
 
+    def test_can_remove_unused_transformers(self):
+        schema = Schema()
+        schema.define_column('A', type='int')
+        schema.add_transformer('t', inputs=['A'], outputs=['B'], transformer=IdentityTransformer(1))
+        schema.remove_transformer('t')
+        self.assertEqual((), schema.transformers)
+
+    def test_raises_error_if_removing_a_transformer_that_is_used_or_undefined(self):
+        schema = Schema()
+        schema.define_column('A', type='int')
+        schema.add_transformer('t', inputs=['A'], outputs=['B'], transformer=IdentityTransformer(1))
+        schema.add_transformer('u', inputs=['B'], outputs=['C'], transformer=IdentityTransformer(1))
+        with self.assertRaises(SchemaError):
+            schema.remove_transformer('t')
+        with self.assertRaises(SchemaError):
+            schema.remove_transformer('v')
+        self.assertEqual(2, len(schema.transformers))
+
+
 class TestChoiceTransformer(TestCase):
     def test_raises_error_if_left_config_is_not_a_number(self):
         with self.assertRaises(TypeError):
@@ -301,6 +348,33 @@ class TestChoiceTransformer(TestCase):
         transformer = ChoiceTransformer(2, 0.3, 0.3)
         self.assertEqual({0, 1, None}, {transformer([0, 1])[0] for _ in range(50)})
 
+    def test_can_choose_on_whole_columns(self):
+        transformer = ChoiceTransformer(4, 0.3, 0.3)
+        first, second = transformer.transform_batch([[0] * 50, ['a'] * 50, [1] * 50, ['b'] * 50])
+        self.assertEqual({0, 1, None}, set(first))
+        self.assertEqual([{0: 'a', 1: 'b', None: None}[value] for value in first], second)
+
+    def test_can_choose_among_many_branches(self):
+        transformer = ChoiceTransformer(3, 0.2, 0.3, 0.5)
+        self.assertEqual((0.2, 0.5, 1.0), transformer.thresholds)
+        self.assertEqual({0, 1, 2}, {transformer([0, 1, 2])[0] for _ in range(100)})
+        self.assertEqual([2], ChoiceTransformer(3, 0, 0, 1)([0, 1, 2]))
+
+    def test_can_choose_among_many_branches_on_whole_columns(self):
+        transformer = ChoiceTransformer(6, 0.25, 0.25, 0.25)
+        first, second = transformer.transform_batch([[0] * 80, ['a'] * 80, [1] * 80, ['b'] * 80, [2] * 80, ['c'] * 80])
+        self.assertEqual({0, 1, 2, None}, set(first))
+        self.assertEqual([{0: 'a', 1: 'b', 2: 'c', None: None}[value] for value in first], second)
+
+    def test_chances_can_exceed_one_by_rounding_errors(self):
+        chances = (0.99 * 0.64 * 0.18, 0.99 * 0.64 * (1 - 0.18), 0.99 * (1 - 0.64), 1 - 0.99)
+        self.assertGreater(sum(chances), 1)
+        self.assertEqual(chances, ChoiceTransformer(4, *chances).chances)
+
+    def test_raises_error_if_inputs_cannot_be_split_in_branches(self):
+        with self.assertRaises(ValueError):
+            ChoiceTransformer(4, 0.2, 0.3, 0.5)
+
     def test_equal_transformer_are_equal(self):
         transformer = ChoiceTransformer(2, 0.3, 0.3)
         other_transformer = ChoiceTransformer(2, 0.3, 0.3)
@@ -326,6 +400,10 @@ class TestMergeTransformer(TestCase):
         transformer = MergeTransformer(4)
         self.assertEqual(("ac", "bd"), transformer(["a", "b", "c", "d"]))
 
+    def test_can_merge_whole_columns(self):
+        transformer = MergeTransformer(4)
+        self.assertEqual([[1, 3], ['ac', 'bd']], transformer.transform_batch([[0, 1], ['a', 'b'], [1, 2], ['c', 'd']]))
+
     def test_equal_transformers_are_equal(self):
         transformer = MergeTransformer(4)
         other_transformer = MergeTransformer(4)
@@ -351,6 +429,13 @@ class TestIdentityTransformer(TestCase):
         transformer = IdentityTransformer(3)
         self.assertEqual((0, 1, 2), transformer([0, 1, 2]))
 
+    def test_identity_of_columns_returns_same_columns(self):
+        transformer = IdentityTransformer(2)
+        columns = [[0, 1], [2, 3]]
+        got = transformer.transform_batch(columns)
+        self.assertIs(columns[0], got[0])
+        self.assertIs(columns[1], got[1])
+
     def test_equal_transformers_are_equal(self):
         transformer = IdentityTransformer(1)
         other_transformer = IdentityTransformer(1)
@@ -372,6 +457,11 @@ class TestProjectionTransformer(TestCase):
         transformer = ProjectionTransformer(2, 1)
         self.assertEqual((1,), transformer([0, 1]))
 
+    def test_projection_of_columns_returns_same_column(self):
+        transformer = ProjectionTransformer(2, 1)
+        columns = [[0, 1], [2, 3]]
+        self.assertIs(columns[1], transformer.transform_batch(columns)[0])
+
     def test_equal_transformers_are_equal(self):
         transformer = ProjectionTransformer(2, 0)
         other_transformer = ProjectionTransformer(2, 0)
@@ -405,6 +495,15 @@ class TestFunctionalTransformer(TestCase):
         transformer = FunctionalTransformer(lambda x, y: (x, x + 1, x + y, y - x), num_outputs=4)
         self.assertEqual((0, 1, 7, 7), transformer([0, 7]))
 
+    def test_can_apply_function_to_whole_columns(self):
+        transformer = FunctionalTransformer(lambda x, y: x + y)
+        self.assertEqual([[3, 5]], transformer.transform_batch([[1, 2], [2, 3]]))
+
+    def test_can_apply_function_with_more_outputs_to_whole_columns(self):
+        transformer = FunctionalTransformer(lambda x: (x, x + 1), num_outputs=2)
+        self.assertEqual([[1, 2], [2, 3]], transformer.transform_batch([[1, 2]]))
+        self.assertEqual([[], []], transformer.transform_batch([[]]))
+
     def test_can_equal_with_same_function(self):
         func = lambda x, y: (x, x + 1, x + y, y - x)
         transformer = FunctionalTransformer(func, num_outputs=4)
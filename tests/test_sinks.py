@@ -0,0 +1,149 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from feanor.sinks import FifoSink, SocketSink, is_sink_uri, open_sink
+
+
+class Receiver:
+    """A local server that accepts connections and collects the data received by each one."""
+
+    def __init__(self, family, address):
+        self.server = socket.socket(family, socket.SOCK_STREAM)
+        self.server.bind(address)
+        self.server.listen()
+        self.address = self.server.getsockname()
+        self.received = []
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            data = []
+            self.received.append(data)
+            with connection:
+                for chunk in iter(lambda: connection.recv(1 << 16), b''):
+                    data.append(chunk)
+
+    def data(self, connections=1):
+        self._wait_for(connections)
+        return [b''.join(data) for data in self.received]
+
+    def _wait_for(self, connections):
+        for _ in range(500):
+            if len(self.received) >= connections:
+                return
+            threading.Event().wait(0.01)
+
+    def close(self):
+        self.server.close()
+
+
+class TestOpenSink(unittest.TestCase):
+    def test_recognizes_sink_uris(self):
+        self.assertTrue(is_sink_uri('tcp://localhost:8000'))
+        self.assertTrue(is_sink_uri('unix:///tmp/feanor.sock'))
+        self.assertTrue(is_sink_uri('fifo:///tmp/feanor.fifo'))
+        self.assertFalse(is_sink_uri('output.csv'))
+        self.assertFalse(is_sink_uri('tcp:output.csv'))
+
+    def test_raises_error_if_uri_is_invalid(self):
+        for uri in ('tcp://localhost', 'unix://', 'fifo://', 'http://localhost:80'):
+            with self.subTest(uri=uri), self.assertRaises(ValueError):
+                open_sink(uri)
+
+
+class TestSocketSink(unittest.TestCase):
+    def setUp(self):
+        self.receiver = Receiver(socket.AF_INET, ('127.0.0.1', 0))
+        self.uri = 'tcp://127.0.0.1:{}'.format(self.receiver.address[1])
+
+    def tearDown(self):
+        self.receiver.close()
+
+    def test_sends_data_to_a_tcp_server(self):
+        with open_sink(self.uri) as sink:
+            self.assertEqual(4, sink.write(b'a,b\n'))
+            sink.write(b'1,2\n' * 100_000)
+        self.assertEqual([b'a,b\n' + b'1,2\n' * 100_000], self.receiver.data())
+
+    def test_reconnects_when_sending_fails(self):
+        with open_sink(self.uri, retry_delay=0.01) as sink:
+            sink.write(b'a\n')
+            with mock.patch.object(sink, '_socket') as broken_socket:
+                broken_socket.send.side_effect = BrokenPipeError
+                sink.write(b'b\n')
+            self.assertEqual(1, sink.report.reconnections)
+        self.assertEqual([b'a\n', b'b\n'], self.receiver.data(connections=2))
+        self.assertEqual('Sink {}: 1 reconnections.'.format(self.uri), str(sink.report))
+
+    def test_sends_only_the_rest_of_the_data_after_reconnecting(self):
+        with open_sink(self.uri, retry_delay=0.01) as sink:
+            with mock.patch.object(sink, '_socket') as broken_socket:
+                broken_socket.send.side_effect = [4, BrokenPipeError]
+                sink.write(b'a,b\n1,2\n')
+        self.assertEqual([b'', b'1,2\n'], self.receiver.data(connections=2))
+
+    def test_raises_error_if_sending_fails_after_reconnecting(self):
+        broken_socket = mock.Mock(**{'send.side_effect': BrokenPipeError})
+        with open_sink(self.uri, retry_delay=0.01) as sink:
+            sink._disconnect()
+            sink._socket = broken_socket
+            with mock.patch.object(sink, '_connect', side_effect=lambda: setattr(sink, '_socket', broken_socket)):
+                with self.assertRaises(BrokenPipeError):
+                    sink.write(b'a\n')
+        self.assertEqual(2, broken_socket.send.call_count)
+
+    def test_raises_error_after_the_last_retry(self):
+        with socket.socket() as unused:
+            unused.bind(('127.0.0.1', 0))
+            uri = 'tcp://127.0.0.1:{}'.format(unused.getsockname()[1])
+            with mock.patch('feanor.sinks.time.sleep') as sleep, self.assertRaises(ConnectionError):
+                open_sink(uri, retries=2)
+        self.assertEqual(2, sleep.call_count)
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'UNIX sockets are not available')
+    def test_sends_data_to_a_unix_socket(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'feanor.sock')
+            receiver = Receiver(socket.AF_UNIX, path)
+            try:
+                with open_sink('unix://' + path) as sink:
+                    self.assertIsInstance(sink, SocketSink)
+                    sink.write(b'a,b\n')
+                self.assertEqual([b'a,b\n'], receiver.data())
+            finally:
+                receiver.close()
+
+
+@unittest.skipUnless(hasattr(os, 'mkfifo'), 'named pipes are not available')
+class TestFifoSink(unittest.TestCase):
+    def test_creates_the_pipe_and_writes_to_the_reader(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'feanor.fifo')
+            received = []
+
+            def read():
+                while not os.path.exists(path):
+                    threading.Event().wait(0.01)
+                with open(path, 'rb') as fifo:
+                    received.append(fifo.read())
+
+            reader = threading.Thread(target=read, daemon=True)
+            reader.start()
+            with open_sink('fifo://' + path) as sink:
+                self.assertIsInstance(sink, FifoSink)
+                sink.write(b'a,b\n' * 50_000)
+            reader.join(5)
+            self.assertEqual([b'a,b\n' * 50_000], received)
+
+    def test_raises_error_if_path_is_not_a_pipe(self):
+        with tempfile.NamedTemporaryFile() as regular_file, self.assertRaises(ValueError):
+            open_sink('fifo://' + regular_file.name)
@@ -0,0 +1,100 @@
+import unittest
+
+from feanor.unique import FingerprintStore, UniqueKeyError, UniqueKeys, UniqueKeysReport, fingerprint
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_is_a_signed_64_bits_integer(self):
+        values = [fingerprint((i,)) for i in range(1000)]
+        self.assertTrue(all(-2 ** 63 <= value < 2 ** 63 for value in values))
+        self.assertEqual(1000, len(set(values)))
+
+    def test_depends_on_the_order_of_the_values(self):
+        self.assertNotEqual(fingerprint(('a', 'b')), fingerprint(('b', 'a')))
+
+
+class TestFingerprintStore(unittest.TestCase):
+    def test_contains_the_added_fingerprints(self):
+        store = FingerprintStore()
+        store.add(5)
+        store.add(-7)
+        self.assertIn(5, store)
+        self.assertIn(-7, store)
+        self.assertNotIn(6, store)
+        self.assertEqual(2, len(store))
+        self.assertEqual(0, store.spilled)
+
+    def test_spills_fingerprints_to_disk_past_the_memory_limit(self):
+        store = FingerprintStore(memory_limit=10)
+        values = [fingerprint((i,)) for i in range(25)]
+        for value in values:
+            store.add(value)
+        self.assertEqual(20, store.spilled)
+        self.assertEqual(5, len(store._fingerprints))
+        self.assertEqual(25, len(store))
+        self.assertTrue(all(value in store for value in values))
+        self.assertNotIn(fingerprint((25,)), store)
+        store.close()
+
+    def test_raises_error_if_memory_limit_is_not_positive(self):
+        with self.assertRaises(ValueError):
+            FingerprintStore(memory_limit=0)
+
+
+class TestUniqueKeys(unittest.TestCase):
+    def test_row_function_generates_rows_again_until_the_keys_are_new(self):
+        rows = iter([(1, 'a'), (1, 'b'), (2, 'a'), (1, 'a'), (3, 'c')])
+        unique_keys = UniqueKeys([['A']])
+        row_function = unique_keys.row_function(rows.__next__, ['A', 'B'])
+        self.assertEqual([(1, 'a'), (2, 'a'), (3, 'c')], [row_function() for _ in range(3)])
+        self.assertEqual(2, unique_keys.report.collisions)
+
+    def test_composite_keys_are_unique_as_a_whole(self):
+        rows = iter([(1, 'a'), (1, 'b'), (1, 'a'), (2, 'a')])
+        row_function = UniqueKeys([['A', 'B']]).row_function(rows.__next__, ['A', 'B'])
+        self.assertEqual([(1, 'a'), (1, 'b'), (2, 'a')], [row_function() for _ in range(3)])
+
+    def test_every_key_must_be_new(self):
+        rows = iter([(1, 'a'), (2, 'a'), (1, 'b'), (2, 'b')])
+        row_function = UniqueKeys([['A'], ['B']]).row_function(rows.__next__, ['A', 'B'])
+        self.assertEqual([(1, 'a'), (2, 'b')], [row_function() for _ in range(2)])
+
+    def test_keys_can_contain_constant_columns(self):
+        rows = iter([(1,), (1,), (2,)])
+        row_function = UniqueKeys([['A', 'B']]).row_function(rows.__next__, ['A'], {'B': 'x'})
+        self.assertEqual([(1,), (2,)], [row_function() for _ in range(2)])
+
+    def test_batch_function_replaces_the_rows_whose_keys_are_not_new(self):
+        batches = iter([[[1, 2, 1, 3], ['a', 'b', 'c', 'd']], [[2], ['e']], [[4], ['f']]])
+        batch_function = UniqueKeys([['A']]).batch_function(lambda n: next(batches), ['A', 'B'])
+        self.assertEqual([[1, 2, 4, 3], ['a', 'b', 'f', 'd']], batch_function(4))
+
+    def test_raises_error_when_the_keys_are_exhausted(self):
+        unique_keys = UniqueKeys([['A']], max_attempts=5)
+        row_function = unique_keys.row_function(lambda: (1,), ['A'])
+        row_function()
+        with self.assertRaises(UniqueKeyError):
+            row_function()
+        batch_function = unique_keys.batch_function(lambda n: [[1] * n], ['A'])
+        with self.assertRaises(UniqueKeyError):
+            batch_function(3)
+
+    def test_raises_error_if_a_column_is_not_in_the_schema(self):
+        with self.assertRaises(ValueError):
+            UniqueKeys([['C']]).row_function(lambda: (1,), ['A'])
+
+    def test_raises_error_if_a_key_is_empty(self):
+        for keys in ([], [[]]):
+            with self.subTest(keys=keys), self.assertRaises(ValueError):
+                UniqueKeys(keys)
+
+
+class TestUniqueKeysReport(unittest.TestCase):
+    def test_reports_the_collisions_and_the_retry_rate(self):
+        report = UniqueKeysReport(rows=750, collisions=250, spilled=10)
+        self.assertEqual(0.25, report.retry_rate)
+        self.assertEqual('Unique keys: 250 collisions in 1000 rows generated, 25.00% retried, 10 fingerprints on disk.',
+                         str(report))
+
+    def test_retry_rate_is_zero_without_rows(self):
+        self.assertEqual(0.0, UniqueKeysReport(0, 0, 0).retry_rate)
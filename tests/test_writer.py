@@ -0,0 +1,134 @@
+import io
+import threading
+import time
+import unittest
+from unittest import mock
+
+from feanor.writer import ChunkWriter, ThreadedChunkWriter, WriteBarrier, make_chunks, make_writer
+
+
+class TestMakeChunks(unittest.TestCase):
+    def test_joins_lines_in_chunks_of_at_least_buffer_size(self):
+        lines = ['{}\n'.format(i) for i in range(10)]
+        chunks = list(make_chunks(lines, 5))
+        self.assertEqual(''.join(lines), ''.join(chunks))
+        self.assertTrue(all(len(chunk) >= 5 for chunk in chunks[:-1]))
+        self.assertEqual(['0\n1\n2\n', '3\n4\n5\n', '6\n7\n8\n', '9\n'], chunks)
+
+    def test_yields_each_line_when_buffer_size_is_zero(self):
+        self.assertEqual(['a\n', 'b\n'], list(make_chunks(['a\n', 'b\n'], 0)))
+
+    def test_yields_nothing_without_lines(self):
+        self.assertEqual([], list(make_chunks([], 10)))
+
+    def test_yields_barriers_after_the_lines_before_them(self):
+        barrier = WriteBarrier(lambda: None)
+        self.assertEqual(['a\n', barrier, 'b\nc\n'], list(make_chunks(['a\n', barrier, 'b\n', 'c\n'], 10)))
+
+
+class TestChunkWriter(unittest.TestCase):
+    def test_writes_text_to_text_files(self):
+        output = io.StringIO()
+        writer = ChunkWriter(output, buffer_size=4)
+        writer.write_lines(['àé\n', '€\n'])
+        self.assertFalse(writer.binary)
+        self.assertEqual('àé\n€\n', output.getvalue())
+
+    def test_encodes_chunks_for_binary_files(self):
+        output = io.BytesIO()
+        writer = ChunkWriter(output, buffer_size=4, encoding='utf-8')
+        writer.write_lines(['àé\n', '€\n'])
+        self.assertTrue(writer.binary)
+        self.assertEqual('àé\n€\n'.encode('utf-8'), output.getvalue())
+
+    def test_issues_one_write_per_chunk(self):
+        output = mock.Mock(spec=io.BufferedWriter)
+        ChunkWriter(output, buffer_size=100).write_lines(['{}\n'.format(i) for i in range(100)])
+        self.assertEqual(3, output.write.call_count)
+        output.flush.assert_called_once_with()
+
+    def test_raises_error_if_buffer_size_is_negative(self):
+        with self.assertRaises(ValueError):
+            ChunkWriter(io.StringIO(), buffer_size=-1)
+
+
+class TestRateLimitedWriter(unittest.TestCase):
+    def _make_limiter(self):
+        return mock.Mock(throttle=lambda lines, max_chunk_size, encoding: iter(['a\n', 'b\n']))
+
+    def test_writes_and_flushes_each_throttled_chunk(self):
+        for writer_type in (ChunkWriter, ThreadedChunkWriter):
+            with self.subTest(writer=writer_type.__name__):
+                output = mock.Mock()
+                writer = writer_type(output, buffer_size=100, binary=False, rate_limiter=self._make_limiter())
+                writer.write_lines(['ignored\n'])
+                write_and_flush_calls = [call[0] for call in output.method_calls]
+                self.assertEqual(['write', 'flush', 'write', 'flush'], write_and_flush_calls[:4])
+
+
+class TestWriteBarriers(unittest.TestCase):
+    def test_callback_is_called_after_writing_the_lines_before_it(self):
+        for writer_type in (ChunkWriter, ThreadedChunkWriter):
+            with self.subTest(writer=writer_type.__name__):
+                output = io.StringIO()
+                written = []
+                writer = writer_type(output, buffer_size=100)
+                writer.write_lines(['a\n', WriteBarrier(lambda: written.append(output.getvalue())), 'b\n'])
+                self.assertEqual(['a\n'], written)
+                self.assertEqual('a\nb\n', output.getvalue())
+
+    def test_output_is_flushed_before_the_callback(self):
+        output = mock.Mock()
+        ChunkWriter(output, buffer_size=100, binary=False).write_lines(['a\n', WriteBarrier(output.callback)])
+        self.assertEqual(['write', 'flush', 'callback'], [call[0] for call in output.method_calls][:3])
+
+
+class TestThreadedChunkWriter(unittest.TestCase):
+    def test_writes_all_chunks_in_order(self):
+        output = io.BytesIO()
+        lines = ['{}\n'.format(i) for i in range(10_000)]
+        ThreadedChunkWriter(output, buffer_size=100, queue_size=2).write_lines(iter(lines))
+        self.assertEqual(''.join(lines).encode('utf-8'), output.getvalue())
+
+    def test_writes_in_a_separate_thread(self):
+        threads = set()
+        output = mock.Mock(spec=io.BufferedWriter)
+        output.write.side_effect = lambda chunk: threads.add(threading.current_thread())
+        ThreadedChunkWriter(output, buffer_size=1).write_lines(['a\n', 'b\n'])
+        self.assertEqual(2, output.write.call_count)
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_reports_blocked_time(self):
+        output = mock.Mock(spec=io.BufferedWriter)
+        output.write.side_effect = lambda chunk: time.sleep(0.01)
+        writer = ThreadedChunkWriter(output, buffer_size=1, queue_size=1)
+        writer.write_lines('{}\n'.format(i) for i in range(10))
+        self.assertGreater(writer.report.generator_blocked_time, 0)
+        self.assertRegex(str(writer.report), r'^Output stage: generation blocked for \d+\.\d{3}s')
+
+    def test_raises_errors_of_the_writer_thread_and_stops_generating(self):
+        output = mock.Mock(spec=io.BufferedWriter)
+        output.write.side_effect = IOError('disk full')
+        consumed = []
+
+        def lines():
+            for i in range(1000):
+                consumed.append(i)
+                yield 'a\n'
+
+        with self.assertRaises(IOError):
+            ThreadedChunkWriter(output, buffer_size=1, queue_size=1).write_lines(lines())
+        self.assertLess(len(consumed), 1000)
+        output.write.assert_called_once()
+
+    def test_raises_error_if_queue_size_is_not_positive(self):
+        with self.assertRaises(ValueError):
+            ThreadedChunkWriter(io.BytesIO(), queue_size=0)
+
+
+class TestMakeWriter(unittest.TestCase):
+    def test_uses_a_thread_unless_queue_size_is_zero(self):
+        self.assertIsInstance(make_writer(io.BytesIO(), queue_size=4), ThreadedChunkWriter)
+        writer = make_writer(io.BytesIO(), queue_size=0)
+        self.assertNotIsInstance(writer, ThreadedChunkWriter)
+        self.assertIsNone(writer.report)